@@ -1,12 +1,19 @@
 import pymysql
 from unidecode import unidecode
-from datetime import datetime
+from datetime import datetime, timedelta
 import re
-from PyQt5.QtCore import pyqtSignal, QObject
+from PyQt5.QtCore import pyqtSignal, QObject, QTimer, Qt
 import os
 import sys
 import configparser
 import json 
+import threading
+import time
+import heapq
+import collections
+import uuid
+import atexit
+import numpy as np
 
 # Colores para estados de pacientes
 COLORES = {
@@ -64,7 +71,90 @@ class ModeloConfiguracion:
         except Exception as e:
             print(f"Error al cargar configuración: {str(e)}")
             return 'localhost'  # Valor por defecto en caso de error
-    
+
+    @classmethod
+    def cargar_configuracion_pool(cls):
+        """
+        Carga los parámetros del pool de conexiones desde la sección [POOL] del config.ini
+
+        Returns:
+            dict: tamano (conexiones máximas por credencial), timeout (segundos de espera
+                  por una conexión libre) y reciclaje (segundos de vida de una conexión)
+        """
+        valores = {'tamano': 8, 'timeout': 10, 'reciclaje': 1800}
+        try:
+            config = configparser.ConfigParser()
+            config.read(cls.get_config_path())
+
+            valores['tamano'] = max(1, config.getint('POOL', 'tamano', fallback=valores['tamano']))
+            valores['timeout'] = max(1, config.getint('POOL', 'timeout', fallback=valores['timeout']))
+            valores['reciclaje'] = max(60, config.getint('POOL', 'reciclaje', fallback=valores['reciclaje']))
+        except Exception as e:
+            print(f"Error al cargar configuración del pool: {str(e)}")
+        return valores
+
+    @classmethod
+    def cargar_configuracion_censo(cls):
+        """
+        Carga los parámetros del censo activo desde la sección [CENSO] del config.ini
+
+        Returns:
+            dict: gracia_alta_minutos (minutos que un paciente dado de alta sigue
+                  apareciendo en las vistas en vivo; 0 lo oculta de inmediato)
+        """
+        valores = {'gracia_alta_minutos': 0}
+        try:
+            config = configparser.ConfigParser()
+            config.read(cls.get_config_path())
+
+            valores['gracia_alta_minutos'] = max(0, config.getint('CENSO', 'gracia_alta_minutos',
+                                                                  fallback=valores['gracia_alta_minutos']))
+        except Exception as e:
+            print(f"Error al cargar configuración del censo: {str(e)}")
+        return valores
+
+    @classmethod
+    def cargar_configuracion_trazabilidad(cls):
+        """
+        Carga los parámetros de la cola de trazabilidad desde la sección [TRAZABILIDAD] del config.ini
+
+        Returns:
+            dict: tamano_cola (registros máximos en memoria), tamano_lote (filas por INSERT)
+                  e intervalo_ms (espera para agrupar registros antes de escribir)
+        """
+        valores = {'tamano_cola': 1000, 'tamano_lote': 100, 'intervalo_ms': 500}
+        try:
+            config = configparser.ConfigParser()
+            config.read(cls.get_config_path())
+
+            valores['tamano_cola'] = max(1, config.getint('TRAZABILIDAD', 'tamano_cola', fallback=valores['tamano_cola']))
+            valores['tamano_lote'] = max(1, config.getint('TRAZABILIDAD', 'tamano_lote', fallback=valores['tamano_lote']))
+            valores['intervalo_ms'] = max(0, config.getint('TRAZABILIDAD', 'intervalo_ms', fallback=valores['intervalo_ms']))
+        except Exception as e:
+            print(f"Error al cargar configuración de trazabilidad: {str(e)}")
+        return valores
+
+    @classmethod
+    def cargar_configuracion_alarmas(cls):
+        """
+        Carga los umbrales de alarma desde la sección [ALARMAS] del config.ini
+
+        Returns:
+            dict: ci_triage (segundos sin CI tras el triage, por clase de triage) y
+                  observacion (segundos en observación); 0 desactiva la alarma
+        """
+        valores = {'ci_triage': {'1': 0, '2': 5, '3': 10, '4': 0, '5': 0}, 'observacion': 20}
+        try:
+            config = configparser.ConfigParser()
+            config.read(cls.get_config_path())
+
+            for clase, umbral in valores['ci_triage'].items():
+                valores['ci_triage'][clase] = max(0, config.getint('ALARMAS', f'ci_triage_{clase}', fallback=umbral))
+            valores['observacion'] = max(0, config.getint('ALARMAS', 'observacion', fallback=valores['observacion']))
+        except Exception as e:
+            print(f"Error al cargar configuración de alarmas: {str(e)}")
+        return valores
+
     @staticmethod
     def crear_archivo_config(config_path):
         """Crea un archivo de configuración con valores predeterminados"""
@@ -80,7 +170,20 @@ class ModeloConfiguracion:
             
             # Añadir sección DBA_USERS para usuarios con privilegios de administración
             config['DBA_USERS'] = {'users': 'Urgencias_1'}
-            
+
+            # Añadir sección POOL con los parámetros del pool de conexiones
+            config['POOL'] = {'tamano': '8', 'timeout': '10', 'reciclaje': '1800'}
+
+            # Añadir sección CENSO con la ventana de gracia tras el alta
+            config['CENSO'] = {'gracia_alta_minutos': '0'}
+
+            # Añadir sección TRAZABILIDAD con los parámetros de la cola de escritura diferida
+            config['TRAZABILIDAD'] = {'tamano_cola': '1000', 'tamano_lote': '100', 'intervalo_ms': '500'}
+
+            # Añadir sección ALARMAS con los umbrales en segundos por clase de triage (0 = sin alarma)
+            config['ALARMAS'] = {'ci_triage_1': '0', 'ci_triage_2': '5', 'ci_triage_3': '10',
+                                 'ci_triage_4': '0', 'ci_triage_5': '0', 'observacion': '20'}
+
             with open(config_path, 'w') as config_file:
                 config.write(config_file)
             
@@ -155,6 +258,12 @@ class ModeloAutenticacion:
             # Guardar credenciales válidas
             cls._credenciales['usuario'] = usuario
             cls._credenciales['contrasena'] = contrasena
+
+            # Cargar de una vez las identidades y roles de todos los usuarios para la sesión
+            ModeloUsuarios.cargar_identidades()
+            
+            # Con sesión abierta, la cola de trazabilidad puede escribir lo pendiente
+            ColaTrazabilidad.iniciar()
             
             return True, "Credenciales válidas"
             
@@ -164,9 +273,18 @@ class ModeloAutenticacion:
     @classmethod
     def limpiar_credenciales(cls):
         """Limpia las credenciales de usuario y contraseña"""
+        # La trazabilidad pendiente se escribe con las credenciales de la sesión que termina;
+        # lo que no alcance a escribirse queda en el spool para la próxima sesión
+        ColaTrazabilidad.vaciar()
         cls._credenciales['usuario'] = None
         cls._credenciales['contrasena'] = None
-    
+
+        # Las conexiones del pool y las cachés pertenecen a la sesión que termina
+        PoolConexiones.cerrar_todas()
+        CatalogoExamenes.invalidar()
+        from Back_end.Usuarios.ModeloUsuarios import ModeloUsuarios
+        ModeloUsuarios.invalidar_identidades()
+
     @classmethod
     def verificar_rol_admin(cls, username=None):
         """
@@ -189,36 +307,993 @@ class ModeloAutenticacion:
         return ModeloUsuarios.obtener_rol_usuario(username) == 'admin'
 
 
+class ConexionPool:
+    """
+    Envoltorio de una conexión prestada por PoolConexiones.
+    Se comporta como una conexión de pymysql, pero close() la devuelve al pool
+    en lugar de cerrar el socket. También puede usarse con 'with'.
+    """
+
+    def __init__(self, clave, conexion):
+        self._clave = clave
+        self._conexion = conexion
+        self._liberada = False
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def close(self):
+        """Devuelve la conexión al pool (se puede llamar varias veces)"""
+        if not self._liberada:
+            self._liberada = True
+            PoolConexiones.liberar(self._clave, self._conexion)
+
+    def descartar(self):
+        """Cierra la conexión física sin devolverla al pool (p. ej. tras un error de red)"""
+        if not self._liberada:
+            self._liberada = True
+            PoolConexiones.liberar(self._clave, self._conexion, descartar=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is not None and issubclass(tipo, (pymysql.err.OperationalError, pymysql.err.InterfaceError)):
+            self.descartar()
+        else:
+            self.close()
+        return False
+
+    def __del__(self):
+        # Red de seguridad para los métodos que olvidan cerrar la conexión
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones compartido por todos los modelos durante la sesión.
+    Mantiene un conjunto de conexiones abiertas por cada combinación de credenciales,
+    verifica cada conexión con ping antes de prestarla y recicla las que superan
+    el tiempo de vida configurado en config.ini (sección [POOL]).
+    """
+
+    _lock = threading.Condition()
+    _libres = {}      # clave -> lista de (conexion, creada_en)
+    _en_uso = {}      # clave -> número de conexiones prestadas
+    _creadas_en = {}  # id(conexion) -> momento de creación
+    _config = None
+    _estadisticas = {'creadas': 0, 'reutilizadas': 0, 'descartadas': 0, 'esperas': 0}
+
+    @classmethod
+    def _obtener_config(cls):
+        if cls._config is None:
+            cls._config = ModeloConfiguracion.cargar_configuracion_pool()
+        return cls._config
+
+    @classmethod
+    def obtener(cls, host, user, password, database='sistema_visualizacion'):
+        """
+        Presta una conexión del pool para las credenciales indicadas.
+
+        Returns:
+            ConexionPool: conexión lista para usar; close() la devuelve al pool
+        """
+        config = cls._obtener_config()
+        clave = (host, user, password, database)
+        limite_espera = time.monotonic() + config['timeout']
+
+        with cls._lock:
+            while True:
+                libres = cls._libres.setdefault(clave, [])
+                if libres:
+                    conexion = libres.pop()
+                    cls._en_uso[clave] = cls._en_uso.get(clave, 0) + 1
+                    break
+
+                if cls._en_uso.get(clave, 0) < config['tamano']:
+                    conexion = None
+                    cls._en_uso[clave] = cls._en_uso.get(clave, 0) + 1
+                    break
+
+                restante = limite_espera - time.monotonic()
+                if restante <= 0:
+                    raise pymysql.err.OperationalError(
+                        2013, "Tiempo de espera agotado: no hay conexiones libres en el pool"
+                    )
+                cls._estadisticas['esperas'] += 1
+                cls._lock.wait(restante)
+
+        # El ping y la conexión se hacen fuera del candado para no bloquear a otros hilos
+        try:
+            if conexion is not None:
+                if time.monotonic() - cls._creadas_en.get(id(conexion), 0) > config['reciclaje']:
+                    cls._cerrar_fisica(conexion)
+                    conexion = None
+                else:
+                    try:
+                        conexion.ping(reconnect=False)
+                        cls._contar('reutilizadas')
+                    except Exception:
+                        cls._cerrar_fisica(conexion)
+                        conexion = None
+
+            if conexion is None:
+                conexion = pymysql.connect(host=host, user=user, password=password, database=database)
+                cls._creadas_en[id(conexion)] = time.monotonic()
+                cls._contar('creadas')
+        except Exception:
+            with cls._lock:
+                cls._en_uso[clave] -= 1
+                cls._lock.notify()
+            raise
+
+        return ConexionPool(clave, conexion)
+
+    @classmethod
+    def liberar(cls, clave, conexion, descartar=False):
+        """Devuelve una conexión al pool, descartándola si está dañada o caducada"""
+        if not descartar:
+            try:
+                # Terminar la transacción implícita para que la próxima lectura vea datos frescos
+                conexion.rollback()
+            except Exception:
+                descartar = True
+
+        caducada = time.monotonic() - cls._creadas_en.get(id(conexion), 0) > cls._obtener_config()['reciclaje']
+
+        with cls._lock:
+            cls._en_uso[clave] = max(0, cls._en_uso.get(clave, 0) - 1)
+            if descartar or caducada or clave not in cls._libres:
+                cerrar = True
+            else:
+                cls._libres[clave].append(conexion)
+                cerrar = False
+            cls._lock.notify()
+
+        if cerrar:
+            cls._cerrar_fisica(conexion)
+
+    @classmethod
+    def _contar(cls, contador):
+        """Incrementa un contador de estadísticas bajo el candado (el pool se usa desde varios hilos)"""
+        with cls._lock:
+            cls._estadisticas[contador] += 1
+
+    @classmethod
+    def _cerrar_fisica(cls, conexion):
+        cls._creadas_en.pop(id(conexion), None)
+        cls._contar('descartadas')
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    @classmethod
+    def cerrar_todas(cls):
+        """Cierra todas las conexiones libres (al cerrar sesión o cambiar de servidor)"""
+        with cls._lock:
+            libres = [conexion for lista in cls._libres.values() for conexion in lista]
+            cls._libres = {}
+            cls._lock.notify_all()
+
+        for conexion in libres:
+            cls._cerrar_fisica(conexion)
+
+    @classmethod
+    def obtener_estadisticas(cls):
+        """
+        Retorna los contadores del pool
+
+        Returns:
+            dict: conexiones creadas, reutilizadas, descartadas, esperas, en uso y libres
+        """
+        with cls._lock:
+            estadisticas = dict(cls._estadisticas)
+            estadisticas['en_uso'] = sum(cls._en_uso.values())
+            estadisticas['libres'] = sum(len(lista) for lista in cls._libres.values())
+        return estadisticas
+
+
+class ConexionUnidad:
+    """
+    Préstamo de la conexión de una UnidadTrabajo activa.
+    Cada préstamo abre un SAVEPOINT propio, de modo que commit(), rollback() y close()
+    de los métodos existentes solo actúan sobre su tramo; la confirmación real la hace
+    la unidad al terminar.
+    """
+
+    def __init__(self, unidad, nombre):
+        self._unidad = unidad
+        self._nombre = nombre
+        self._cerrada = False
+        self._confirmada = False
+        self._ejecutar(f"SAVEPOINT {nombre}")
+
+    def __getattr__(self, nombre):
+        return getattr(self._unidad.conexion, nombre)
+
+    def _ejecutar(self, sentencia):
+        if self._unidad.terminada:
+            return
+        try:
+            with self._unidad.conexion.cursor() as cursor:
+                cursor.execute(sentencia)
+        except pymysql.err.OperationalError as e:
+            # 1305: el savepoint ya fue liberado por un préstamo exterior
+            if e.args and e.args[0] == 1305:
+                return
+            raise
+
+    def commit(self):
+        if not self._cerrada and not self._confirmada:
+            self._confirmada = True
+            self._ejecutar(f"RELEASE SAVEPOINT {self._nombre}")
+
+    def rollback(self):
+        if not self._cerrada and not self._confirmada:
+            self._ejecutar(f"ROLLBACK TO SAVEPOINT {self._nombre}")
+
+    def close(self):
+        """Descarta lo no confirmado del tramo; la conexión sigue en manos de la unidad"""
+        if not self._cerrada:
+            if not self._confirmada:
+                self.rollback()
+                self._ejecutar(f"RELEASE SAVEPOINT {self._nombre}")
+            self._cerrada = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.close()
+        return False
+
+
+class UnidadTrabajo:
+    """
+    Agrupa todas las escrituras de una edición de paciente en una sola conexión y una
+    sola transacción. Mientras está activa en un hilo, ModeloPaciente.conectar() y
+    ModeloTrazabilidad.conectar() prestan su conexión, el recálculo de métricas se
+    difiere hasta justo antes del commit y la señal datos_actualizados del modelo se
+    emite una única vez al confirmar.
+    """
+
+    _locales = threading.local()
+
+    def __init__(self, modelo=None):
+        self.modelo = modelo
+        self.conexion = None
+        self.terminada = False
+        self.metricas_pendientes = []
+        self.trazabilidad_pendiente = []
+        self._difiere_metricas = True
+        self._prestamos = 0
+        self._senales_bloqueadas = False
+
+    @classmethod
+    def actual(cls):
+        """Devuelve la unidad activa en el hilo actual, o None"""
+        return getattr(cls._locales, 'unidad', None)
+
+    def prestar(self):
+        """Entrega un tramo (SAVEPOINT) de la conexión de la unidad"""
+        self._prestamos += 1
+        return ConexionUnidad(self, f"unidad_{self._prestamos}")
+
+    def diferir_metricas(self, paciente_id):
+        """
+        Anota un paciente cuyas métricas se recalcularán una sola vez antes del commit.
+        
+        Returns:
+            bool: False si la unidad ya está confirmando y el cálculo debe hacerse ahora
+        """
+        if not self._difiere_metricas:
+            return False
+        if paciente_id not in self.metricas_pendientes:
+            self.metricas_pendientes.append(paciente_id)
+        return True
+
+    def diferir_trazabilidad(self, registro):
+        """Guarda un registro de trazabilidad para encolarlo solo si la unidad se confirma"""
+        self.trazabilidad_pendiente.append(registro)
+
+    def __enter__(self):
+        if UnidadTrabajo.actual() is not None:
+            raise RuntimeError("Ya hay una unidad de trabajo activa en este hilo")
+        credenciales = ModeloAutenticacion.obtener_credenciales()
+        self.conexion = PoolConexiones.obtener(
+            host=credenciales['equipo_trabajo'],
+            user=credenciales['usuario'],
+            password=credenciales['contrasena'],
+            database='sistema_visualizacion'
+        )
+        self.conexion.begin()
+        if self.modelo is not None:
+            self._senales_bloqueadas = self.modelo.blockSignals(True)
+        UnidadTrabajo._locales.unidad = self
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        confirmada = False
+        try:
+            if tipo is None:
+                # Métricas diferidas: una sola pasada por paciente, sobre la conexión de la unidad
+                self._difiere_metricas = False
+                for paciente_id in self.metricas_pendientes:
+                    ModeloTrazabilidad.calcular_y_almacenar_metricas(paciente_id)
+                self.conexion.commit()
+                confirmada = True
+                print(f"✅ Unidad de trabajo confirmada ({self._prestamos} operaciones, 1 commit)")
+            else:
+                self.conexion.rollback()
+                print(f"⚠️ Unidad de trabajo revertida: {valor}")
+        except Exception as e:
+            print(f"⚠️ Error al confirmar la unidad de trabajo: {str(e)}")
+            try:
+                self.conexion.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            self.terminada = True
+            UnidadTrabajo._locales.unidad = None
+            if tipo is not None and issubclass(tipo, (pymysql.err.OperationalError, pymysql.err.InterfaceError)):
+                self.conexion.descartar()
+            else:
+                self.conexion.close()
+            if self.modelo is not None:
+                self.modelo.blockSignals(self._senales_bloqueadas)
+                if confirmada and self._prestamos:
+                    self.modelo.datos_actualizados.emit()
+            if confirmada:
+                for registro in self.trazabilidad_pendiente:
+                    ColaTrazabilidad.encolar(registro)
+        return False
+
+
+class CatalogoExamenes:
+    """
+    Caché de proceso de los catálogos de laboratorios e imágenes.
+    Se carga una vez por sesión, indexada por código y por nombre normalizado, y se
+    revalida con una sola lectura de la fila de versión de catalogo_version (que los
+    triggers de las tablas de catálogo incrementan en cada cambio).
+    """
+
+    # tipo -> (tabla, columna código, columna nombre)
+    TIPOS = {
+        'laboratorios': ('laboratorios', 'codigo_lab', 'nombre_lab'),
+        'imagenes': ('imagenes', 'codigo_ix', 'nombre_ix'),
+    }
+
+    # Segundos entre revalidaciones de la versión
+    INTERVALO_REVALIDACION = 30
+
+    _lock = threading.Lock()
+    _catalogos = {}       # tipo -> {'version', 'filas', 'por_codigo', 'por_nombre'}
+    _versiones = None     # tipo -> versión leída en la última revalidación
+    _revalidado_en = 0.0
+
+    @staticmethod
+    def normalizar(texto):
+        """Clave de búsqueda por nombre: sin tildes, minúsculas y espacios simples"""
+        return ' '.join(unidecode(texto or '').lower().split())
+
+    @classmethod
+    def invalidar(cls):
+        """Descarta los catálogos cargados (al cerrar sesión o cambiar de servidor)"""
+        with cls._lock:
+            cls._catalogos = {}
+            cls._versiones = None
+            cls._revalidado_en = 0.0
+
+    @classmethod
+    def _leer_versiones(cls, cursor):
+        try:
+            cursor.execute("SELECT catalogo, version FROM catalogo_version")
+            return {catalogo: version for catalogo, version in cursor.fetchall()}
+        except Exception as e:
+            # Sin tabla de versión el catálogo se conserva hasta el fin de la sesión
+            print(f"⚠️ No se pudo leer la versión de los catálogos: {str(e)}")
+            return {}
+
+    @classmethod
+    def obtener(cls, tipo, cursor=None):
+        """
+        Devuelve el catálogo indicado, cargándolo o recargándolo si su versión cambió.
+        
+        Args:
+            tipo: 'laboratorios' o 'imagenes'
+            cursor: Cursor a reutilizar para la revalidación y la carga (opcional)
+            
+        Returns:
+            dict: {'filas': [(codigo, nombre)] ordenadas por nombre,
+                   'por_codigo': {codigo: nombre}, 'por_nombre': {nombre normalizado: codigo}}
+        """
+        ahora = time.monotonic()
+        with cls._lock:
+            catalogo = cls._catalogos.get(tipo)
+            if (catalogo is not None and ahora - cls._revalidado_en < cls.INTERVALO_REVALIDACION
+                    and catalogo['version'] == (cls._versiones or {}).get(tipo)):
+                return catalogo
+
+        conn = None
+        try:
+            if cursor is None:
+                conn = ModeloPaciente.conectar()
+                cursor = conn.cursor()
+
+            versiones = cls._leer_versiones(cursor)
+            with cls._lock:
+                cls._versiones = versiones
+                cls._revalidado_en = ahora
+                catalogo = cls._catalogos.get(tipo)
+                if catalogo is not None and catalogo['version'] == versiones.get(tipo):
+                    return catalogo
+
+            tabla, columna_codigo, columna_nombre = cls.TIPOS[tipo]
+            cursor.execute(f"SELECT {columna_codigo}, {columna_nombre} FROM {tabla} ORDER BY {columna_nombre}")
+            filas = [(codigo, nombre) for codigo, nombre in cursor.fetchall()]
+            catalogo = {
+                'version': versiones.get(tipo),
+                'filas': filas,
+                'por_codigo': dict(filas),
+                'por_nombre': {cls.normalizar(nombre): codigo for codigo, nombre in filas},
+            }
+            with cls._lock:
+                cls._catalogos[tipo] = catalogo
+            print(f"✅ Catálogo de {tipo} cargado ({len(filas)} elementos)")
+            return catalogo
+
+        except Exception as e:
+            print(f"Error al cargar el catálogo de {tipo}: {str(e)}")
+            with cls._lock:
+                return cls._catalogos.get(tipo) or {'version': None, 'filas': [], 'por_codigo': {}, 'por_nombre': {}}
+        finally:
+            if conn:
+                conn.close()
+
+    @classmethod
+    def filas(cls, tipo, cursor=None):
+        """Lista de (codigo, nombre) ordenada por nombre"""
+        return cls.obtener(tipo, cursor)['filas']
+
+    @classmethod
+    def nombres(cls, tipo, cursor=None):
+        """Diccionario código -> nombre"""
+        return cls.obtener(tipo, cursor)['por_codigo']
+
+    @classmethod
+    def indice(cls, tipo):
+        """Índice de autocompletado del catálogo, construido una vez por versión"""
+        catalogo = cls.obtener(tipo)
+        if 'indice' not in catalogo:
+            catalogo['indice'] = IndiceBusqueda(catalogo['filas'])
+        return catalogo['indice']
+
+    @classmethod
+    def es_examen(cls, nombre, cursor=None):
+        """Indica si un texto es el nombre de algún laboratorio o imagen del catálogo"""
+        clave = cls.normalizar(nombre)
+        return any(clave in cls.obtener(tipo, cursor)['por_nombre'] for tipo in cls.TIPOS)
+
+
+class IndiceBusqueda:
+    """
+    Índice de autocompletado sobre un catálogo de (codigo, nombre), insensible a tildes
+    y mayúsculas. Combina un trie de prefijos de palabras (código y nombre) con un índice
+    de trigramas del vocabulario, que corrige las palabras mal escritas antes de buscar.
+    """
+
+    # Entradas guardadas por nodo del trie; los prefijos con más coincidencias son ambiguos de todas formas
+    LIMITE_POR_NODO = 200
+    # Similitud mínima (Jaccard de trigramas) entre una palabra escrita y una del vocabulario
+    SIMILITUD_MINIMA = 0.4
+    # Correcciones del vocabulario que se prueban por palabra mal escrita
+    CORRECCIONES_POR_PALABRA = 3
+    # Subárboles grandes del trie cuyas entradas se conservan entre pulsaciones
+    SUBARBOLES_EN_MEMORIA = 32
+
+    def __init__(self, filas):
+        # Las entradas se ordenan por longitud del nombre: ante igual puntaje gana la más corta
+        self.filas = sorted(filas, key=lambda fila: (len(fila[1] or ''), fila[1] or ''))
+
+        # Normalización por palabra con memoria: el vocabulario es mucho menor que el catálogo
+        self._memoria = {}
+        self._subarboles = {}
+        self.codigos = [self._normalizar(str(codigo)) for codigo, _ in self.filas]
+        self.nombres = [self._normalizar(nombre) for _, nombre in self.filas]
+        self.por_codigo = {codigo: id_entrada for id_entrada, codigo in reversed(list(enumerate(self.codigos)))}
+
+        # Cada palabra distinta se indexa una sola vez con sus entradas (en orden de relevancia)
+        self.palabras = []
+        self.entradas_por_palabra = {}
+        for id_entrada, (codigo, nombre) in enumerate(zip(self.codigos, self.nombres)):
+            palabras = tuple(dict.fromkeys(codigo.split() + nombre.split()))
+            self.palabras.append(palabras)
+            for palabra in palabras:
+                self.entradas_por_palabra.setdefault(palabra, []).append(id_entrada)
+
+        # Nodo del trie: [hijos, primeras entradas (hasta LIMITE_POR_NODO), total de entradas,
+        # entradas con una palabra que termina en el nodo]
+        self.trie = [{}, [], 0, []]
+        # Trigramas del vocabulario (los códigos numéricos no se corrigen): trigrama -> palabras,
+        # y cuántos trigramas tiene cada palabra para la similitud de Jaccard
+        self.postings = {}
+        self.total_trigramas = {}
+        for palabra, entradas in self.entradas_por_palabra.items():
+            nodo = self.trie
+            for caracter in palabra:
+                hijos = nodo[0]
+                if caracter not in hijos:
+                    hijos[caracter] = [{}, [], 0, []]
+                nodo = hijos[caracter]
+            nodo[3] = entradas
+            if not palabra.isdigit():
+                trigramas = self.trigramas_de(palabra)
+                self.total_trigramas[palabra] = len(trigramas)
+                for trigrama in trigramas:
+                    self.postings.setdefault(trigrama, []).append(palabra)
+        self._completar(self.trie)
+
+    def _normalizar(self, texto):
+        palabras = []
+        for palabra in (texto or '').split():
+            if palabra not in self._memoria:
+                self._memoria[palabra] = CatalogoExamenes.normalizar(palabra)
+            palabras.append(self._memoria[palabra])
+        return ' '.join(palabras)
+
+    @staticmethod
+    def trigramas_de(palabra):
+        """Conjunto de trigramas de una palabra normalizada, con relleno en los bordes"""
+        palabra = f"  {palabra} "
+        return frozenset(palabra[i:i + 3] for i in range(len(palabra) - 2))
+
+    def _completar(self, nodo):
+        """Calcula de abajo hacia arriba el total y las primeras entradas de cada nodo"""
+        entradas = set(nodo[3])
+        for hijo in nodo[0].values():
+            entradas.update(self._completar(hijo))
+        nodo[2] = len(entradas)
+        nodo[1] = heapq.nsmallest(self.LIMITE_POR_NODO, entradas)
+        return entradas
+
+    def _nodo(self, prefijo):
+        nodo = self.trie
+        for caracter in prefijo:
+            nodo = nodo[0].get(caracter)
+            if nodo is None:
+                return None
+        return nodo
+
+    def _entradas(self, ficha, nodo):
+        """
+        Todas las entradas bajo un nodo. Los subárboles grandes se recorren una vez y se
+        guardan: al escribir 'tomografia c', 'tomografia ce'... la primera ficha se reutiliza.
+        """
+        if nodo[2] <= len(nodo[1]):
+            return frozenset(nodo[1])
+        entradas = self._subarboles.get(ficha)
+        if entradas is None:
+            acumuladas, pila = set(), [nodo]
+            while pila:
+                actual = pila.pop()
+                acumuladas.update(actual[3])
+                pila.extend(actual[0].values())
+            entradas = frozenset(acumuladas)
+            if len(self._subarboles) >= self.SUBARBOLES_EN_MEMORIA:
+                self._subarboles.pop(next(iter(self._subarboles)))
+            self._subarboles[ficha] = entradas
+        return entradas
+
+    def _corregir(self, ficha):
+        """Palabras del vocabulario más parecidas a una ficha sin coincidencias de prefijo"""
+        trigramas = self.trigramas_de(ficha)
+        comunes = {}
+        for trigrama in trigramas:
+            for palabra in self.postings.get(trigrama, ()):
+                comunes[palabra] = comunes.get(palabra, 0) + 1
+        parecidas = []
+        for palabra, cantidad in comunes.items():
+            similitud = cantidad / (len(trigramas) + self.total_trigramas[palabra] - cantidad)
+            if similitud >= self.SIMILITUD_MINIMA:
+                parecidas.append((-similitud, palabra))
+        return [palabra for _, palabra in heapq.nsmallest(self.CORRECCIONES_POR_PALABRA, parecidas)]
+
+    def _puntaje(self, id_entrada, consulta, fichas):
+        """Menor es mejor: código exacto, prefijo de código, nombre exacto, prefijo de nombre, palabras"""
+        codigo, nombre = self.codigos[id_entrada], self.nombres[id_entrada]
+        if codigo == consulta:
+            return 0
+        if codigo.startswith(consulta):
+            return 1
+        if nombre == consulta:
+            return 2
+        if nombre.startswith(consulta):
+            return 3
+        if all(any(palabra.startswith(ficha) for palabra in self.palabras[id_entrada]) for ficha in fichas):
+            return 4
+        return None
+
+    def buscar(self, texto, limite=20):
+        """
+        Devuelve las entradas que mejor coinciden con el texto, ordenadas por relevancia.
+        
+        Args:
+            texto: Texto escrito por el usuario (código, nombre o parte de ellos)
+            limite: Número máximo de resultados
+            
+        Returns:
+            list: [(codigo, nombre, puntaje)]; puntajes 0-4 son coincidencias de prefijo y 5 aproximadas
+        """
+        consulta = self._normalizar(texto)
+        if not consulta:
+            return []
+        fichas = consulta.split()
+        nodos = [self._nodo(ficha) for ficha in fichas]
+
+        # Prefijos: con una sola ficha basta la lista acotada del nodo (ya viene en orden de
+        # relevancia); con varias se intersectan las entradas de cada ficha
+        if all(nodos):
+            if len(fichas) == 1:
+                candidatos = nodos[0][1]
+            else:
+                conjuntos = sorted((self._entradas(ficha, nodo) for ficha, nodo in zip(fichas, nodos)), key=len)
+                candidatos = heapq.nsmallest(self.LIMITE_POR_NODO, conjuntos[0].intersection(*conjuntos[1:]))
+            resultados = []
+            for id_entrada in candidatos:
+                puntaje = self._puntaje(id_entrada, consulta, fichas)
+                if puntaje is not None:
+                    resultados.append((puntaje, id_entrada))
+            resultados.sort()
+            return [(self.filas[id_entrada][0], self.filas[id_entrada][1], puntaje)
+                    for puntaje, id_entrada in resultados[:limite]]
+
+        # Aproximadas: las fichas sin prefijo en el trie se reemplazan por sus correcciones
+        conjuntos = []
+        for ficha, nodo in zip(fichas, nodos):
+            if nodo is not None:
+                conjuntos.append(self._entradas(ficha, nodo))
+                continue
+            if len(ficha) < 3 or ficha.isdigit():
+                return []
+            correcciones = self._corregir(ficha)
+            if not correcciones:
+                return []
+            conjuntos.append(frozenset().union(*(self.entradas_por_palabra[palabra] for palabra in correcciones)))
+        conjuntos.sort(key=len)
+        candidatos = heapq.nsmallest(limite, conjuntos[0].intersection(*conjuntos[1:]))
+        return [(self.filas[id_entrada][0], self.filas[id_entrada][1], 5) for id_entrada in candidatos]
+
+    def resolver(self, texto):
+        """
+        Identifica la entrada que el usuario quiso agregar: acepta 'código - nombre'
+        (el formato del autocompletado), el código o el nombre, o un prefijo inequívoco.
+        
+        Returns:
+            tuple: (codigo, nombre) o None si no hay una coincidencia de prefijo
+        """
+        id_entrada = self.por_codigo.get(self._normalizar(texto.split(' - ', 1)[0]))
+        if id_entrada is not None:
+            return self.filas[id_entrada]
+        mejores = self.buscar(texto, limite=1)
+        if mejores and mejores[0][2] <= 4:
+            return mejores[0][0], mejores[0][1]
+        return None
+
+
+class InstantaneaCenso:
+    """
+    Copia columnar del censo en arreglos NumPy para evaluar las alarmas de todas las filas
+    con máscaras vectorizadas. Se construye una vez por cada lista de datos (el sondeo
+    devuelve la misma lista mientras no hay cambios) y se reevalúa contra la hora actual
+    sin volver a recorrer las tuplas.
+    """
+    
+    # Códigos de los estados que usan las alarmas; 0 = vacío u otro valor
+    CODIGOS_TRIAGE = {"1": 1, "2": 2, "3": 3, "4": 4, "5": 5}
+    CODIGOS_ESTADO = {
+        "ci": {"No realizado": 1, "Realizado": 2},
+        "conducta": {"Observación": 1, "De Alta": 2},
+    }
+    NAT = np.iinfo(np.int64).min
+    
+    def __init__(self, datos, columnas):
+        """
+        Args:
+            datos: Lista de tuplas de la vista
+            columnas: Nombres de las columnas de las tuplas (COLUMNAS_VISTA del modelo)
+        """
+        indices = {columna: posicion for posicion, columna in enumerate(columnas)}
+        self.total = len(datos)
+        self.ids = np.fromiter((fila[indices['id']] for fila in datos), dtype=np.int64, count=self.total)
+        self.triage = np.fromiter((self.CODIGOS_TRIAGE.get(fila[indices['triage']], 0) for fila in datos),
+                                  dtype=np.int8, count=self.total)
+        self.estados = {
+            campo: np.fromiter((codigos.get(fila[indices[campo]], 0) for fila in datos), dtype=np.int8, count=self.total)
+            for campo, codigos in self.CODIGOS_ESTADO.items() if campo in indices
+        }
+        self.marcas = {
+            columna: self._a_milisegundos([fila[indices[columna]] for fila in datos])
+            for columna in ("triage_timestamp", "observacion_timestamp") if columna in indices
+        }
+    
+    @classmethod
+    def _a_milisegundos(cls, valores):
+        """Fechas (naive, hora local) a int64 en milisegundos; lo que no es fecha queda en NAT"""
+        fechas = np.array([valor if isinstance(valor, datetime) else None for valor in valores], dtype='datetime64[ms]')
+        return fechas.astype(np.int64)
+    
+    @classmethod
+    def ahora_ms(cls, ahora=None):
+        """Momento de referencia (por defecto datetime.now()) en la misma escala que las marcas"""
+        return int(np.datetime64(ahora or datetime.now(), 'ms').astype(np.int64))
+    
+    def vencimientos(self, umbrales):
+        """
+        Momento en que vence cada alarma de cada fila. Es la única definición de las
+        condiciones de alarma: evaluar_alarmas() y ProgramadorAlarmas la comparten.
+        
+        Args:
+            umbrales: Umbrales de ModeloConfiguracion.cargar_configuracion_alarmas()
+            
+        Returns:
+            dict: 'ci' y 'observacion' -> arreglo int64 alineado con ids, en milisegundos
+                  (misma escala que ahora_ms); NAT en las filas donde la alarma no aplica
+        """
+        resultado = {tipo: np.full(self.total, self.NAT, dtype=np.int64) for tipo in ('ci', 'observacion')}
+        if not self.total:
+            return resultado
+        
+        # Triage con umbral configurado, CI no realizada: vence umbral segundos después del triage
+        umbral_por_clase = np.array([0] + [umbrales['ci_triage'].get(str(clase), 0) for clase in range(1, 6)],
+                                    dtype=np.int64) * 1000
+        umbral_ci = umbral_por_clase[self.triage]
+        triage_ms = self.marcas.get('triage_timestamp')
+        if triage_ms is not None and 'ci' in self.estados:
+            mascara = ((umbral_ci > 0) & (self.estados['ci'] == self.CODIGOS_ESTADO['ci']['No realizado'])
+                       & (triage_ms != self.NAT))
+            resultado['ci'][mascara] = triage_ms[mascara] + umbral_ci[mascara]
+        
+        # Tiempo en observación (la sala de espera no trae la conducta)
+        observacion_ms = self.marcas.get('observacion_timestamp')
+        if observacion_ms is not None and 'conducta' in self.estados and umbrales['observacion']:
+            mascara = ((self.estados['conducta'] == self.CODIGOS_ESTADO['conducta']['Observación'])
+                       & (observacion_ms != self.NAT))
+            resultado['observacion'][mascara] = observacion_ms[mascara] + umbrales['observacion'] * 1000
+        
+        return resultado
+    
+    def evaluar_alarmas(self, umbrales, ahora=None):
+        """
+        Evalúa todas las alarmas del censo en una llamada.
+        
+        Args:
+            umbrales: Umbrales de ModeloConfiguracion.cargar_configuracion_alarmas()
+            ahora: Momento de referencia (por defecto datetime.now())
+            
+        Returns:
+            dict: 'ci' y 'observacion' -> conjunto de IDs de pacientes con la alarma activa
+        """
+        ahora_ms = self.ahora_ms(ahora)
+        return {
+            tipo: set(self.ids[(vencimiento != self.NAT) & (vencimiento <= ahora_ms)].tolist())
+            for tipo, vencimiento in self.vencimientos(umbrales).items()
+        }
+
 class ModeloPaciente(QObject):
     datos_actualizados = pyqtSignal()
     
+    # Columnas que consumen las vistas de pacientes, en el orden de sus tuplas
+    COLUMNAS_VISTA = ("nombre", "documento", "triage", "ci", "labs", "ix", "inter", "rv", "pendientes",
+                      "conducta", "ubicacion", "ingreso", "triage_timestamp", "id", "observacion_timestamp")
+    
+    # Los pendientes viven en pacientes_pendientes; el texto que muestran las vistas se arma
+    # al leer: manuales y automáticos en orden de tipo, luego los exámenes agrupados por nombre
+    SQL_PENDIENTES = """CONCAT_WS(', ',
+        (SELECT GROUP_CONCAT(pp.texto ORDER BY FIELD(pp.tipo, 'manual', 'triage', 'ci', 'inter', 'rv'), pp.id SEPARATOR ', ')
+           FROM pacientes_pendientes pp
+          WHERE pp.paciente_id = pacientes.id AND pp.tipo NOT IN ('laboratorio', 'imagen')),
+        (SELECT CONCAT('Labs pendientes: ', GROUP_CONCAT(DISTINCT l.nombre_lab ORDER BY l.nombre_lab SEPARATOR ', '))
+           FROM pacientes_pendientes pp JOIN laboratorios l ON l.codigo_lab = pp.codigo_ref
+          WHERE pp.paciente_id = pacientes.id AND pp.tipo = 'laboratorio'),
+        (SELECT CONCAT('IMG pendientes: ', GROUP_CONCAT(DISTINCT i.nombre_ix ORDER BY i.nombre_ix SEPARATOR ', '))
+           FROM pacientes_pendientes pp JOIN imagenes i ON i.codigo_ix = pp.codigo_ref
+          WHERE pp.paciente_id = pacientes.id AND pp.tipo = 'imagen')
+    ) AS pendientes"""
+    
+    # Los formularios muestran y editan solo los pendientes manuales, uno por fila de
+    # pacientes_pendientes; el separador no puede aparecer dentro de un pendiente
+    SEPARADOR_PENDIENTES = ";"
+    SQL_PENDIENTES_MANUALES = f"""(SELECT GROUP_CONCAT(pp.texto ORDER BY pp.id SEPARATOR '{SEPARADOR_PENDIENTES} ')
+           FROM pacientes_pendientes pp
+          WHERE pp.paciente_id = pacientes.id AND pp.origen = 'manual') AS pendientes_manuales"""
+    
+    # Prefijos exactos de los resúmenes de exámenes que arma SQL_PENDIENTES
+    PREFIJOS_RESUMEN_EXAMENES = ("Labs pendientes:", "IMG pendientes:")
+    
+    # Motor de pendientes automáticos. Cada regla es (tipo, texto, condición sobre el estado del
+    # paciente) y se evalúa en este orden; las de exámenes generan un pendiente por código asociado
+    # mientras la CI esté realizada y el campo de estado indique resultados pendientes
+    CAMPOS_PENDIENTES = ("triage", "ci", "labs", "ix", "inter", "rv")
+    REGLAS_PENDIENTES = (
+        ('triage', "Realizar triage", lambda e: e['triage'] in ("", "No realizado")),
+        ('ci', "Valoración CI", lambda e: e['triage'] not in ("", "No realizado") and e['ci'] == "No realizado"),
+        ('inter', "Abrir Interconsulta", lambda e: e['ci'] == "Realizado" and e['inter'] == "No se ha abierto"),
+        ('inter', "Respuesta Interconsulta", lambda e: e['ci'] == "Realizado" and e['inter'] == "Abierta"),
+        ('rv', "Realizar RV", lambda e: e['ci'] == "Realizado" and e['rv'] == "No realizado"),
+    )
+    REGLAS_EXAMENES = (('laboratorio', 'labs'), ('imagen', 'ix'))
+    ESTADOS_EXAMEN_PENDIENTE = ("No se ha realizado", "En espera de resultados")
+    
+    # Textos de los pendientes que generan las reglas; no se guardan como manuales
+    TEXTOS_PENDIENTES_AUTOMATICOS = tuple(dict.fromkeys(regla[1] for regla in REGLAS_PENDIENTES))
+    
+    # Límites del sondeo adaptativo de las vistas (milisegundos)
+    INTERVALO_SONDEO_MIN = 1500
+    INTERVALO_SONDEO_MAX = 15000
+    
+    # Margen al releer filas cambiadas, cubre transacciones confirmadas con un updated_at anterior
+    MARGEN_SONDEO = timedelta(seconds=2)
+    
+    # Contador de escrituras hechas desde esta aplicación (compartido por todas las instancias)
+    _version_escrituras = 0
+    
+    # Minutos que un paciente dado de alta sigue en el censo activo (se lee una vez del config.ini)
+    _gracia_alta_minutos = None
+    
+    # Umbrales de alarma de [ALARMAS] (se leen una vez del config.ini)
+    _umbrales_alarma = None
+
+    # Campos de estado del paciente, en el orden en que se escriben
+    CAMPOS_ESTADO = ("triage", "ci", "labs", "ix", "inter", "rv", "conducta")
+    TRIAGES_VALIDOS = ("1", "2", "3", "4", "5")
+
+    # Tabla de transiciones precompilada: (campo, nuevo estado) -> (columna timestamp,
+    # asignación condicional, asignación forzada). La condicional solo sella NOW() si el
+    # valor guardado en la fila es distinto; la forzada se usa al registrar un paciente nuevo.
+    TRANSICIONES_ESTADO = {
+        (campo, estado): (
+            columna,
+            f"{columna} = IF({campo} <=> %s, {columna}, NOW())",
+            f"{columna} = NOW()"
+        )
+        for campo, estados in (
+            ("ci", {"No realizado": "ci_no_realizado_timestamp", "Realizado": "ci_realizado_timestamp"}),
+            ("labs", {"No se ha realizado": "labs_no_realizado_timestamp",
+                      "En espera de resultados": "labs_solicitados_timestamp",
+                      "Resultados completos": "labs_completos_timestamp"}),
+            ("ix", {"No se ha realizado": "ix_no_realizado_timestamp",
+                    "En espera de resultados": "ix_solicitados_timestamp",
+                    "Resultados completos": "ix_completos_timestamp"}),
+            ("inter", {"No se ha abierto": "inter_no_abierta_timestamp",
+                       "Abierta": "inter_abierta_timestamp",
+                       "Realizada": "inter_realizada_timestamp"}),
+            ("rv", {"No realizado": "rv_no_realizado_timestamp", "Realizado": "rv_realizado_timestamp"}),
+            ("conducta", {"De Alta": "alta_timestamp"}),
+        )
+        for estado, columna in estados.items()
+    }
+
+    # Triage y Observación conservan su timestamp mientras el valor no cambie y se anulan al dejarlo
+    ASIGNACION_TRIAGE = ("triage_timestamp = IF(%s IN ('1', '2', '3', '4', '5'), "
+                         "IF(triage <=> %s AND triage_timestamp IS NOT NULL, triage_timestamp, NOW()), NULL)")
+    ASIGNACION_OBSERVACION = ("observacion_timestamp = IF(%s = 'Observación', "
+                              "IF(conducta <=> 'Observación' AND observacion_timestamp IS NOT NULL, "
+                              "observacion_timestamp, NOW()), NULL)")
+
+    # Asociaciones paciente-examen: tipo -> (tabla, columna de código)
+    ASOCIACIONES = {
+        'laboratorios': ('pacientes_laboratorios', 'codigo_lab'),
+        'imagenes': ('pacientes_ixs', 'codigo_ix'),
+    }
+
+    COLUMNAS_TIMESTAMP = frozenset(
+        [columna for columna, _, _ in TRANSICIONES_ESTADO.values()] + ["triage_timestamp", "observacion_timestamp"]
+    )
+    
     def __init__(self):
         super().__init__()
         self.conn = None
+        self._estado_sondeo = None
+        self._instantanea = None
+        self.datos_actualizados.connect(ModeloPaciente.registrar_escritura)
 
     @staticmethod
     def conectar():
+        """
+        Obtiene una conexión del pool de la sesión; close() la devuelve al pool.
+        Dentro de una unidad de trabajo devuelve un tramo de la conexión de la unidad.
+        """
+        unidad = UnidadTrabajo.actual()
+        if unidad is not None:
+            return unidad.prestar()
         credenciales = ModeloAutenticacion.obtener_credenciales()
-        return pymysql.connect(
+        return PoolConexiones.obtener(
             host=credenciales['equipo_trabajo'], 
             user=credenciales['usuario'], 
             password=credenciales['contrasena'], 
             database='sistema_visualizacion'
         )
+
+    def transaccion(self):
+        """
+        Abre una unidad de trabajo para una edición completa del paciente: todos los
+        métodos del modelo llamados dentro del bloque 'with' comparten una conexión,
+        una transacción y un único commit al salir (o un rollback si hay excepción).
+        
+        Returns:
+            UnidadTrabajo: gestor de contexto de la unidad
+        """
+        return UnidadTrabajo(self)
+
+    @staticmethod
+    def registrar_escritura():
+        """Anota una escritura local para que las vistas acorten su próximo sondeo"""
+        ModeloPaciente._version_escrituras += 1
+
+    @staticmethod
+    def version_escrituras():
+        """Devuelve el contador de escrituras locales"""
+        return ModeloPaciente._version_escrituras
+
+    @staticmethod
+    def gracia_alta_minutos():
+        """Devuelve la ventana de gracia tras el alta configurada en [CENSO]"""
+        if ModeloPaciente._gracia_alta_minutos is None:
+            ModeloPaciente._gracia_alta_minutos = ModeloConfiguracion.cargar_configuracion_censo()['gracia_alta_minutos']
+        return ModeloPaciente._gracia_alta_minutos
+
+    @staticmethod
+    def umbrales_alarma():
+        """Devuelve los umbrales de alarma configurados en [ALARMAS]"""
+        if ModeloPaciente._umbrales_alarma is None:
+            ModeloPaciente._umbrales_alarma = ModeloConfiguracion.cargar_configuracion_alarmas()
+        return ModeloPaciente._umbrales_alarma
+
+    @staticmethod
+    def condicion_areas(areas, columna="area"):
+        """
+        Construye el filtro parametrizado por área sobre la columna generada `area`.
+        
+        Args:
+            areas: Nombre de un área o lista de áreas
+            columna: Columna a filtrar (permite prefijos de alias, p. ej. 'p.area')
+            
+        Returns:
+            tuple: (condicion, parametros); la condición viene vacía si no hay áreas
+        """
+        if not areas:
+            return "", []
+        if isinstance(areas, str):
+            areas = [areas]
+        areas = list(dict.fromkeys(areas))
+        return f"{columna} IN ({', '.join(['%s'] * len(areas))})", areas
+
+    @classmethod
+    def columnas_select(cls, columnas=None):
+        """
+        Lista de columnas para un SELECT sobre pacientes; 'pendientes' se sustituye por
+        la expresión que arma el texto desde pacientes_pendientes y 'pendientes_manuales'
+        por la que arma solo los manuales.
         
-        # return pymysql.connect(
-        #     host=credenciales['equipo_trabajo'], 
-        #     user=credenciales['usuario'], 
-        #     password=credenciales['contrasena'], 
-        #     database='sistema_visualizacion'
-        # )
+        Args:
+            columnas: Columnas a seleccionar (por defecto COLUMNAS_VISTA)
+            
+        Returns:
+            str: Columnas separadas por comas
+        """
+        expresiones = {"pendientes": cls.SQL_PENDIENTES, "pendientes_manuales": cls.SQL_PENDIENTES_MANUALES}
+        return ", ".join(expresiones.get(columna, columna) for columna in (columnas or cls.COLUMNAS_VISTA))
 
     def organizar_por_ingreso(self):
         conn = self.conectar()
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT nombre, documento, triage, ci, labs, ix, inter, rv, pendientes, 
-                conducta, ubicacion, ingreso, triage_timestamp, id, observacion_timestamp 
+        cursor.execute(f"""
+            SELECT {ModeloPaciente.columnas_select()}
             FROM pacientes 
             ORDER BY ingreso DESC
         """)
@@ -229,8 +1304,11 @@ class ModeloPaciente(QObject):
     def obtener_registro_por_documento(self, documento):
         conn = self.conectar()
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM pacientes WHERE documento = %s", (documento,))
-        pacientes = cursor.fetchall()
+        cursor.execute(f"SELECT pacientes.*, {self.SQL_PENDIENTES_MANUALES} FROM pacientes WHERE documento = %s",
+                       (documento,))
+        # La columna pendientes de la tabla ya no se mantiene: en su posición van los manuales
+        indice = [descripcion[0] for descripcion in cursor.description].index("pendientes")
+        pacientes = [fila[:indice] + (fila[-1],) + fila[indice + 1:-1] for fila in cursor.fetchall()]
         conn.close()
         return pacientes
     
@@ -296,20 +1374,22 @@ class ModeloPaciente(QObject):
         observacion_timestamp = datos.get('observacion_timestamp')
         
         sql = """INSERT INTO pacientes (nombre, documento, triage, triage_timestamp, ci, labs, 
-                    ix, inter, rv, pendientes, conducta, ubicacion, ingreso, observacion_timestamp)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s)"""
+                    ix, inter, rv, conducta, ubicacion, ingreso, observacion_timestamp)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s)"""
         valores = (
             datos['nombre'], datos.get('documento', ''), triage, 
             triage_timestamp, 
             datos.get('ci', '') or "", datos.get('labs', '') or "", 
             datos.get('ix', '') or "", datos.get('inter', '') or "",
-            datos.get('rv', '') or "", datos.get('pendientes', ''),
+            datos.get('rv', '') or "",
             datos.get('conducta', '') or "", ubicacion,
             observacion_timestamp
         )
         cursor.execute(sql, valores)
         # Obtener el ID del paciente recién insertado
         paciente_id = cursor.lastrowid
+        self._sincronizar_pendientes(cursor, paciente_id, 'manual',
+                                     self.extraer_pendientes_manuales(datos.get('pendientes', ''), cursor))
         conn.commit()
         
         # Registrar en la trazabilidad
@@ -368,12 +1448,16 @@ class ModeloPaciente(QObject):
         conn = self.conectar()
         cursor = conn.cursor()
         
+        # El texto del formulario se interpreta una sola vez aquí; los automáticos se recalculan aparte
+        pendientes_manuales = self.extraer_pendientes_manuales(datos.get('pendientes', ''), cursor)
+        
         # Obtener información del paciente actual para el registro en consola
-        cursor.execute("""
-            SELECT nombre, documento, triage, ci, labs, ix, inter, rv, pendientes, conducta, triage_timestamp 
+        cursor.execute(f"""
+            SELECT {self.columnas_select(("nombre", "documento", "triage", "ci", "labs", "ix", "inter", "rv", "pendientes_manuales", "conducta"))}
             FROM pacientes WHERE id=%s
         """, (registro[13],))
         datos_actuales = cursor.fetchone()
+        estado_previo = {}
         
         if datos_actuales:
             nombre_paciente = datos_actuales[0]
@@ -388,7 +1472,6 @@ class ModeloPaciente(QObject):
                 'pendientes': datos_actuales[8],
                 'conducta': datos_actuales[9]
             }
-            triage_timestamp_previo = datos_actuales[10]
             
             # Imprimir información de seguimiento
             print(f"\n[ACTUALIZANDO PACIENTE] - {nombre_paciente} ({documento_paciente})")
@@ -406,15 +1489,15 @@ class ModeloPaciente(QObject):
                     print(f"  - {campo.upper()}: {estado_anterior or 'vacío'} → {estado_nuevo or 'vacío'}")
                     detalles_cambios.append(f"{campo.upper()}: {estado_anterior or 'vacío'} → {estado_nuevo or 'vacío'}")
             
-            # Verificar si hay cambios en pendientes
+            # Verificar si hay cambios en los pendientes manuales (los automáticos no se editan)
             pendientes_anteriores = estado_previo['pendientes'] or ''
-            pendientes_nuevos = datos.get('pendientes', '') or ''
+            pendientes_nuevos = f"{self.SEPARADOR_PENDIENTES} ".join(texto for _, _, texto in pendientes_manuales)
             if pendientes_anteriores != pendientes_nuevos:
                 detalles_cambios.append(f"PENDIENTES: '{pendientes_anteriores}' → '{pendientes_nuevos}'")
             
             # Mostrar cambios en pendientes si hay
-            print(f"Pendientes anteriores: {estado_previo['pendientes'] or 'Ninguno'}")
-            print(f"Pendientes actualizados: {datos.get('pendientes', '') or 'Ninguno'}")
+            print(f"Pendientes anteriores: {pendientes_anteriores or 'Ninguno'}")
+            print(f"Pendientes actualizados: {pendientes_nuevos or 'Ninguno'}")
             
             # Si hay cambios, registrar en la trazabilidad
             if detalles_cambios:
@@ -425,59 +1508,26 @@ class ModeloPaciente(QObject):
                     detalles_cambio=detalle_texto
                 )
         
-        # Determinar timestamp según triage
-        triage_actual = estado_previo.get('triage', '')
-        triage_nuevo = datos.get('triage', '')
-        
-        # Lógica mejorada para el timestamp de triage
-        triage_timestamp = None
-        
-        # Caso 1: Si el triage nuevo es válido (1-5)
-        if triage_nuevo in ["1", "2", "3", "4", "5"]:
-            # Si cambia de un triage válido a otro triage válido diferente, actualizar timestamp
-            if triage_actual in ["1", "2", "3", "4", "5"] and triage_actual != triage_nuevo:
-                print(f"Actualizando timestamp de triage: cambio de {triage_actual} a {triage_nuevo}")
-                triage_timestamp = datetime.now()
-            # Si viene desde un estado no válido a un triage válido, establecer timestamp
-            elif triage_actual not in ["1", "2", "3", "4", "5"]:
-                print(f"Estableciendo timestamp de triage inicial para valor {triage_nuevo}")
-                triage_timestamp = datetime.now()
-            # Si no cambia, mantener el timestamp existente
-            else:
-                triage_timestamp = triage_timestamp_previo
-        # Caso 2: Si se cambia a "No realizado" o valor no válido, anular el timestamp
-        else:
-            triage_timestamp = None
-            print("Anulando timestamp de triage por cambio a valor no válido")
-        
-        # Verificar si el estado de conducta cambió a Observación
-        observacion_timestamp = None
-        if datos.get('conducta') == 'Observación':
-            # Consultar si el registro anterior ya estaba en Observación
-            cursor.execute("SELECT conducta, observacion_timestamp FROM pacientes WHERE id=%s", (registro[13],))
-            resultado = cursor.fetchone()
-            if resultado:
-                conducta_anterior, timestamp_anterior = resultado
-                # Si ya estaba en Observación, mantener el timestamp original
-                if conducta_anterior == 'Observación' and timestamp_anterior:
-                    observacion_timestamp = timestamp_anterior
-                else:
-                    # Si es nuevo en Observación, crear timestamp ahora
-                    observacion_timestamp = datetime.now()
+        # Un único UPDATE: los timestamps de las transiciones (calculados en el servidor
+        # contra los valores guardados) van antes que las columnas de estado que se reescriben
+        marcas, params_marcas = self.asignaciones_estado(datos, estado_previo, incluir_estados=False)
         
-        sql = """UPDATE pacientes SET nombre=%s, triage=%s, triage_timestamp=%s, ci=%s, labs=%s, 
-                    ix=%s, inter=%s, rv=%s, pendientes=%s, conducta=%s, ubicacion=%s, observacion_timestamp=%s 
+        sql = f"""UPDATE pacientes SET {''.join(marca + ', ' for marca in marcas)}nombre=%s, triage=%s, ci=%s, 
+                    labs=%s, ix=%s, inter=%s, rv=%s, conducta=%s, ubicacion=%s 
                     WHERE id=%s"""
-        valores = (
-            datos['nombre'], triage_nuevo, triage_timestamp,
+        valores = tuple(params_marcas) + (
+            datos['nombre'], datos.get('triage', ''),
             datos.get('ci', '') or "", datos.get('labs', '') or "", 
             datos.get('ix', '') or "", datos.get('inter', '') or "", 
-            datos.get('rv', '') or "", datos.get('pendientes', ''),
-            datos.get('conducta', '') or "", ubicacion, observacion_timestamp,
+            datos.get('rv', '') or "",
+            datos.get('conducta', '') or "", ubicacion,
             registro[13]  # ID ahora en índice 13
         )
         cursor.execute(sql, valores)
+        self._sincronizar_pendientes(cursor, registro[13], 'manual', pendientes_manuales)
         conn.commit()
+        cursor.close()
+        conn.close()
         
         # Calcular y almacenar métricas para el paciente actualizado
         paciente_id = registro[13]
@@ -512,17 +1562,7 @@ class ModeloPaciente(QObject):
             timestamp_actual = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
             # Validar que el campo timestamp exista
-            campos_validos = [
-                'triage_timestamp', 
-                'ci_no_realizado_timestamp', 'ci_realizado_timestamp',
-                'labs_no_realizado_timestamp', 'labs_solicitados_timestamp', 'labs_completos_timestamp',
-                'ix_no_realizado_timestamp', 'ix_solicitados_timestamp', 'ix_completos_timestamp',
-                'inter_no_abierta_timestamp', 'inter_abierta_timestamp', 'inter_realizada_timestamp',
-                'rv_no_realizado_timestamp', 'rv_realizado_timestamp', 
-                'observacion_timestamp', 'alta_timestamp'
-            ]
-            
-            if campo_timestamp not in campos_validos:
+            if campo_timestamp not in self.COLUMNAS_TIMESTAMP:
                 print(f"Campo timestamp no válido: {campo_timestamp}")
                 return False
             
@@ -543,6 +1583,98 @@ class ModeloPaciente(QObject):
             if conn and hasattr(conn, 'close'):
                 cursor.close()
                 conn.close()
+            self.registrar_escritura()
+
+    @classmethod
+    def asignaciones_estado(cls, estados_nuevos, estados_previos=None, incluir_estados=True):
+        """
+        Compara en memoria los estados previos y nuevos y arma las asignaciones SQL de las
+        transiciones a partir de TRANSICIONES_ESTADO.
+        
+        Args:
+            estados_nuevos (dict): Estados a escribir (solo se consideran CAMPOS_ESTADO)
+            estados_previos (dict, opcional): Estados conocidos de la fila. Si se omite, se
+                trata como un registro inicial y los timestamps se sellan sin condición
+            incluir_estados (bool): Añadir también las asignaciones de las columnas de estado
+            
+        Returns:
+            tuple: (asignaciones, parametros). Los timestamps van primero porque MySQL evalúa
+                las asignaciones de izquierda a derecha y deben comparar contra la fila guardada
+        """
+        marcas, params_marcas = [], []
+        estados, params_estados = [], []
+        
+        for campo in cls.CAMPOS_ESTADO:
+            if campo not in estados_nuevos:
+                continue
+            nuevo = estados_nuevos[campo] or ""
+            if estados_previos is not None and (estados_previos.get(campo) or "") == nuevo:
+                continue
+            
+            estados.append(f"{campo} = %s")
+            params_estados.append(nuevo)
+            
+            if campo == "triage":
+                marcas.append(cls.ASIGNACION_TRIAGE)
+                params_marcas.extend((nuevo, nuevo))
+                continue
+            if campo == "conducta":
+                marcas.append(cls.ASIGNACION_OBSERVACION)
+                params_marcas.append(nuevo)
+            
+            transicion = cls.TRANSICIONES_ESTADO.get((campo, nuevo))
+            if transicion is None:
+                continue
+            _, condicional, forzada = transicion
+            if estados_previos is None:
+                marcas.append(forzada)
+            else:
+                marcas.append(condicional)
+                params_marcas.append(nuevo)
+        
+        if not incluir_estados:
+            return marcas, params_marcas
+        return marcas + estados, params_marcas + params_estados
+
+    def actualizar_estados_con_timestamp(self, paciente_id, estados_nuevos, estados_previos=None):
+        """
+        Escribe varios estados y sus timestamps asociados con un único UPDATE
+        
+        Args:
+            paciente_id (int): ID del paciente
+            estados_nuevos (dict): Campo de estado -> nuevo valor
+            estados_previos (dict, opcional): Estados anteriores para omitir los que no cambian;
+                si se omite, se sellan los timestamps de todos los estados indicados
+        
+        Returns:
+            bool: True si se actualizó correctamente, False en caso contrario
+        """
+        asignaciones, params = self.asignaciones_estado(estados_nuevos, estados_previos)
+        if not asignaciones:
+            return True
+        
+        conn = None
+        try:
+            conn = self.conectar()
+            cursor = conn.cursor()
+            cursor.execute(
+                f"UPDATE pacientes SET {', '.join(asignaciones)} WHERE id = %s",
+                tuple(params) + (paciente_id,)
+            )
+            conn.commit()
+            cursor.close()
+            
+            # Calcular y almacenar métricas inmediatamente
+            ModeloTrazabilidad.calcular_y_almacenar_metricas(paciente_id)
+            return True
+            
+        except Exception as e:
+            print(f"Error al actualizar estados con timestamp: {str(e)}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+            self.registrar_escritura()
 
     def actualizar_estado_con_timestamp(self, paciente_id, campo_estado, nuevo_estado, campo_timestamp=None):
         """
@@ -553,179 +1685,43 @@ class ModeloPaciente(QObject):
             campo_estado (str): Nombre del campo de estado a actualizar
             nuevo_estado (str): Nuevo valor para el estado
             campo_timestamp (str, opcional): Nombre del campo timestamp a actualizar.
-                Si no se especifica, se infiere del campo_estado
+                Si no se especifica, se infiere de TRANSICIONES_ESTADO
         
         Returns:
             bool: True si se actualizó correctamente, False en caso contrario
         """
+        if campo_estado not in self.CAMPOS_ESTADO:
+            print(f"Campo de estado no válido: {campo_estado}")
+            return False
+        
+        if not campo_timestamp:
+            return self.actualizar_estados_con_timestamp(paciente_id, {campo_estado: nuevo_estado})
+        
+        if campo_timestamp not in self.COLUMNAS_TIMESTAMP:
+            print(f"Campo timestamp no válido: {campo_timestamp}")
+            return False
+        
+        conn = None
         try:
             conn = self.conectar()
-            if not conn:
-                return False
-                
             cursor = conn.cursor()
-            timestamp_actual = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Si es actualización de triage, verificar valor actual y nuevo valor
-            if campo_estado == 'triage':
-                # Solo para valores válidos de triage (1-5)
-                if nuevo_estado in ["1", "2", "3", "4", "5"]:
-                    # Obtener el valor actual del triage
-                    cursor.execute("SELECT triage FROM pacientes WHERE id = %s", (paciente_id,))
-                    triage_actual_resultado = cursor.fetchone()
-                    triage_actual = triage_actual_resultado[0] if triage_actual_resultado else None
-                    
-                    # Si se está cambiando de un triage válido a otro, actualizar el timestamp
-                    if triage_actual in ["1", "2", "3", "4", "5"] and triage_actual != nuevo_estado:
-                        print(f"Actualizando timestamp de triage para paciente {paciente_id}: cambio de {triage_actual} a {nuevo_estado}")
-                        query = f"""
-                            UPDATE pacientes
-                            SET {campo_estado} = %s, triage_timestamp = %s
-                            WHERE id = %s
-                        """
-                        cursor.execute(query, (nuevo_estado, timestamp_actual, paciente_id))
-                        conn.commit()
-                        
-                        # Calcular y almacenar métricas inmediatamente
-                        ModeloTrazabilidad.calcular_y_almacenar_metricas(paciente_id)
-                        return True
-                    
-                    # Si es la primera vez o viene de "No realizado", establecer timestamp
-                    if not triage_actual or triage_actual not in ["1", "2", "3", "4", "5"]:
-                        print(f"Estableciendo nuevo timestamp de triage para paciente {paciente_id}")
-                        query = f"""
-                            UPDATE pacientes
-                            SET {campo_estado} = %s, triage_timestamp = %s
-                            WHERE id = %s
-                        """
-                        cursor.execute(query, (nuevo_estado, timestamp_actual, paciente_id))
-                        conn.commit()
-                        
-                        # Calcular y almacenar métricas inmediatamente
-                        ModeloTrazabilidad.calcular_y_almacenar_metricas(paciente_id)
-                        return True
-                    
-                    # Si no cambió el valor, solo actualizar el triage sin cambiar el timestamp
-                    query = f"""
-                        UPDATE pacientes
-                        SET {campo_estado} = %s
-                        WHERE id = %s
-                    """
-                    cursor.execute(query, (nuevo_estado, paciente_id))
-                    conn.commit()
-                    
-                    # Calcular y almacenar métricas inmediatamente
-                    ModeloTrazabilidad.calcular_y_almacenar_metricas(paciente_id)
-                    return True
-                else:
-                    # Si es "No realizado" u otro valor no válido, solo actualizar el estado sin timestamp
-                    query = f"""
-                        UPDATE pacientes
-                        SET {campo_estado} = %s, triage_timestamp = NULL
-                        WHERE id = %s
-                    """
-                    cursor.execute(query, (nuevo_estado, paciente_id))
-                    conn.commit()
-                    
-                    # Calcular y almacenar métricas inmediatamente
-                    ModeloTrazabilidad.calcular_y_almacenar_metricas(paciente_id)
-                    return True
-            
-            # Inferir campo timestamp si no se proporciona
-            if not campo_timestamp:
-                # Mapeo de estados a campos timestamp correspondientes
-                mapa_estado_timestamp = {
-                    'triage': {
-                        '1': 'triage_timestamp',
-                        '2': 'triage_timestamp',
-                        '3': 'triage_timestamp',
-                        '4': 'triage_timestamp',
-                        '5': 'triage_timestamp'
-                    },
-                    'ci': {
-                        'No realizado': 'ci_no_realizado_timestamp',
-                        'Realizado': 'ci_realizado_timestamp'
-                    },
-                    'labs': {
-                        'No se ha realizado': 'labs_no_realizado_timestamp',
-                        'En espera de resultados': 'labs_solicitados_timestamp',
-                        'Resultados completos': 'labs_completos_timestamp'
-                    },
-                    'ix': {
-                        'No se ha realizado': 'ix_no_realizado_timestamp',
-                        'En espera de resultados': 'ix_solicitados_timestamp',
-                        'Resultados completos': 'ix_completos_timestamp'
-                    },
-                    'inter': {
-                        'No se ha abierto': 'inter_no_abierta_timestamp',
-                        'Abierta': 'inter_abierta_timestamp',
-                        'Realizada': 'inter_realizada_timestamp'
-                    },
-                    'rv': {
-                        'No realizado': 'rv_no_realizado_timestamp',
-                        'Realizado': 'rv_realizado_timestamp'
-                    },
-                    'conducta': {
-                        'Observación': 'observacion_timestamp',
-                        'De Alta': 'alta_timestamp'
-                    }
-                }
-                
-                # Determinar el campo timestamp basado en el campo de estado y el nuevo valor
-                if campo_estado in mapa_estado_timestamp:
-                    if isinstance(mapa_estado_timestamp[campo_estado], dict):
-                        # Si es un diccionario, buscar el campo específico para el nuevo estado
-                        if nuevo_estado in mapa_estado_timestamp[campo_estado]:
-                            campo_timestamp = mapa_estado_timestamp[campo_estado][nuevo_estado]
-                        else:
-                            print(f"No se encontró campo timestamp para estado '{campo_estado}' con valor '{nuevo_estado}'")
-                            # En lugar de fallar, solo actualizar el estado sin timestamp
-                            query = f"""
-                                UPDATE pacientes
-                                SET {campo_estado} = %s
-                                WHERE id = %s
-                            """
-                            cursor.execute(query, (nuevo_estado, paciente_id))
-                            conn.commit()
-                            return True
-                    else:
-                        # Si es un valor directo, usarlo
-                        campo_timestamp = mapa_estado_timestamp[campo_estado]
-            
-            if not campo_timestamp:
-                print(f"No se pudo inferir el campo timestamp para el estado: {campo_estado} = {nuevo_estado}")
-                # En lugar de fallar, actualizar solo el estado
-                query = f"""
-                    UPDATE pacientes
-                    SET {campo_estado} = %s
-                    WHERE id = %s
-                """
-                cursor.execute(query, (nuevo_estado, paciente_id))
-                conn.commit()
-                return True
-            
-            # Actualizar el estado y el timestamp
-            query = f"""
-                UPDATE pacientes
-                SET {campo_estado} = %s, {campo_timestamp} = %s
-                WHERE id = %s
-            """
-            
-            cursor.execute(query, (nuevo_estado, timestamp_actual, paciente_id))
+            cursor.execute(
+                f"UPDATE pacientes SET {campo_timestamp} = NOW(), {campo_estado} = %s WHERE id = %s",
+                (nuevo_estado, paciente_id)
+            )
             conn.commit()
+            cursor.close()
             
-            # Calcular y almacenar métricas inmediatamente
             ModeloTrazabilidad.calcular_y_almacenar_metricas(paciente_id)
-            
             return True
             
         except Exception as e:
             print(f"Error al actualizar estado con timestamp: {str(e)}")
             return False
         finally:
-            if conn and hasattr(conn, 'close'):
-                cursor.close()
+            if conn:
                 conn.close()
+            self.registrar_escritura()
 
     def validar_nombre(self, nombre):
         """
@@ -819,9 +1815,11 @@ class ModeloPaciente(QObject):
             nombre_paciente = paciente_info[0]
             documento_paciente = paciente_info[1]
             
-            # Eliminar el paciente
+            # Eliminar el paciente y retirar su aporte del rollup histórico de métricas
             sql = "DELETE FROM pacientes WHERE id = %s"
             cursor.execute(sql, (id_registro,))
+            from Back_end.ModeloMetricas import ModeloMetricas
+            ModeloMetricas.actualizar_rollup_paciente(cursor, id_registro)
             conn.commit()
             
             # Registrar en la trazabilidad
@@ -956,6 +1954,51 @@ class ModeloPaciente(QObject):
         # Si todas las validaciones pasan
         return None
     
+    def instantanea_censo(self, datos):
+        """
+        Devuelve la copia columnar de los datos, reutilizándola mientras la lista sea la misma
+        (el sondeo devuelve la misma lista si no hubo cambios).
+        
+        Args:
+            datos: Lista de registros de pacientes
+            
+        Returns:
+            InstantaneaCenso: Arreglos NumPy del censo
+        """
+        if self._instantanea is None or self._instantanea[0] is not datos:
+            self._instantanea = (datos, InstantaneaCenso(datos, self.COLUMNAS_VISTA))
+        return self._instantanea[1]
+    
+    def evaluar_alarmas(self, datos):
+        """
+        Evalúa todas las alarmas de los registros en una llamada vectorizada.
+        
+        Args:
+            datos: Lista de registros de pacientes
+            
+        Returns:
+            dict: 'ci' y 'observacion' -> conjunto de IDs de pacientes con la alarma activa
+        """
+        return self.instantanea_censo(datos).evaluar_alarmas(self.umbrales_alarma())
+    
+    def celdas_alarma(self, datos, ids_alarma, columna):
+        """
+        Traduce IDs con alarma a celdas (row_idx, col_idx) de una lista de registros.
+        
+        Args:
+            datos: Registros mostrados (p. ej. una página)
+            ids_alarma: Conjunto de IDs con la alarma activa
+            columna: Nombre de la columna que se marca
+            
+        Returns:
+            set: Conjunto de tuplas (row_idx, col_idx)
+        """
+        if not ids_alarma or columna not in self.COLUMNAS_VISTA:
+            return set()
+        idx_id = self.COLUMNAS_VISTA.index('id')
+        col_idx = self.COLUMNAS_VISTA.index(columna)
+        return {(row_idx, col_idx) for row_idx, fila in enumerate(datos) if fila[idx_id] in ids_alarma}
+    
     def verificar_alarmas(self, datos):
         """
         Verifica las condiciones de alarma para los pacientes.
@@ -967,27 +2010,7 @@ class ModeloPaciente(QObject):
         Returns:
             set: Conjunto de tuplas (row_idx, col_idx) con las celdas que deben tener alarma
         """
-        alarm_cells = set()
-        
-        for row_idx, fila in enumerate(datos):
-            triage = fila[2]  # Índice de triage
-            ci = fila[3]      # Índice de ci
-            triage_timestamp = fila[12]  # Índice del timestamp de triage
-            
-            # Verificar condiciones de alarma
-            if triage in ['2', '3'] and ci == 'No realizado' and triage_timestamp:
-                ahora = datetime.now()
-                if isinstance(triage_timestamp, datetime):
-                    tiempo_transcurrido = (ahora - triage_timestamp).total_seconds()
-                    
-                    # Alarma para triage 2: más de 15 minutos sin CI
-                    # Alarma para triage 3: más de 30 minutos sin CI
-                    if (triage == '2' and tiempo_transcurrido >= 5) or \
-                       (triage == '3' and tiempo_transcurrido >= 10):
-                        ci_col = 3  # Índice de la columna CI
-                        alarm_cells.add((row_idx, ci_col))
-        
-        return alarm_cells
+        return self.celdas_alarma(datos, self.evaluar_alarmas(datos)['ci'], 'ci')
 
     def verificar_alarma_conducta(self, datos):
         """
@@ -1000,31 +2023,7 @@ class ModeloPaciente(QObject):
         Returns:
             set: Conjunto de tuplas (row_idx, col_idx) con las celdas que deben tener alarma
         """
-        conducta_alarm_cells = set()
-        
-        for row_idx, fila in enumerate(datos):
-            conducta = fila[9]       # Índice de conducta
-            observacion_timestamp = None   # Timestamp específico para observación
-            
-            # Verificar si tenemos el campo observacion_timestamp en los datos
-            if len(fila) > 14: 
-                observacion_timestamp = fila[14]
-            
-            # Verificar condiciones de alarma para conducta
-            if conducta == "Observación" and observacion_timestamp:
-                ahora = datetime.now()
-                if isinstance(observacion_timestamp, datetime):
-                    # Para pruebas: 20 segundos
-                    # En producción: 11 horas (39600 segundos)
-                    tiempo_limite_segundos = 20  # 20 segundos para pruebas
-                    
-                    tiempo_transcurrido = (ahora - observacion_timestamp).total_seconds()
-                    
-                    if tiempo_transcurrido >= tiempo_limite_segundos:
-                        conducta_col = 9  # Índice de la columna Conducta
-                        conducta_alarm_cells.add((row_idx, conducta_col))
-        
-        return conducta_alarm_cells
+        return self.celdas_alarma(datos, self.evaluar_alarmas(datos)['observacion'], 'conducta')
 
     def obtener_colores(self):
         """Obtener los colores para diferentes estados, incluyendo los niveles de triage."""
@@ -1045,7 +2044,41 @@ class ModeloPaciente(QObject):
         }
         return colores
 
-    def obtener_datos_pacientes_filtrados(self, areas_seleccionadas=None, fecha_inicio=None, fecha_fin=None):
+    def _condiciones_filtro(self, areas_seleccionadas=None, fecha_inicio=None, fecha_fin=None, solo_activos=False):
+        """
+        Construye la cláusula WHERE parametrizada para los filtros de área, fecha y censo activo.
+        
+        Returns:
+            tuple: (clausula_where, parametros); la cláusula viene vacía si no hay filtros
+        """
+        condiciones = []
+        parametros = []
+        
+        # Censo activo: excluir pacientes dados de alta (salvo los que siguen en la ventana de gracia)
+        if solo_activos:
+            gracia = self.gracia_alta_minutos()
+            if gracia > 0:
+                condiciones.append("(conducta IS NULL OR conducta <> 'De Alta' OR alta_timestamp >= %s)")
+                parametros.append(datetime.now() - timedelta(minutes=gracia))
+            else:
+                condiciones.append("(conducta IS NULL OR conducta <> 'De Alta')")
+        
+        # Filtro por áreas
+        if areas_seleccionadas:
+            condicion, valores = self.condicion_areas(areas_seleccionadas)
+            condiciones.append(condicion)
+            parametros.extend(valores)
+        
+        # Filtro por fecha
+        if fecha_inicio and fecha_fin:
+            condiciones.append("ingreso BETWEEN %s AND %s")
+            parametros.extend([fecha_inicio, fecha_fin])
+        
+        if not condiciones:
+            return "", parametros
+        return " WHERE " + " AND ".join(condiciones), parametros
+
+    def obtener_datos_pacientes_filtrados(self, areas_seleccionadas=None, fecha_inicio=None, fecha_fin=None, solo_activos=False):
         """
         Obtiene datos de pacientes filtrados por áreas específicas y/o rango de fechas.
         
@@ -1053,6 +2086,7 @@ class ModeloPaciente(QObject):
             areas_seleccionadas: Lista de áreas seleccionadas
             fecha_inicio: Fecha de inicio del rango (formato: 'YYYY-MM-DD HH:MM:SS')
             fecha_fin: Fecha de fin del rango (formato: 'YYYY-MM-DD HH:MM:SS')
+            solo_activos: Si es True, excluye a los pacientes dados de alta (censo activo)
             
         Returns:
             list: Lista de registros de pacientes filtrados
@@ -1060,41 +2094,113 @@ class ModeloPaciente(QObject):
         conn = self.conectar()
         cursor = conn.cursor()
         
-        # Construir las condiciones WHERE basadas en los filtros
-        condiciones = []
-        
-        # Filtro por áreas
-        if areas_seleccionadas and len(areas_seleccionadas) > 0:
-            area_conditions = []
-            for area in areas_seleccionadas:
-                area_conditions.append(f"ubicacion LIKE '{area}%'")
-            
-            if area_conditions:
-                condiciones.append("(" + " OR ".join(area_conditions) + ")")
-        
-        # Filtro por fecha
-        if fecha_inicio and fecha_fin:
-            condiciones.append(f"ingreso BETWEEN '{fecha_inicio}' AND '{fecha_fin}'")
-        
-        query = """
-            SELECT nombre, documento, triage, ci, labs, ix, inter, rv, pendientes, 
-                conducta, ubicacion, ingreso, triage_timestamp, id, observacion_timestamp 
-            FROM pacientes
-        """
-        
-        # Agregar las condiciones WHERE si existen
-        if condiciones:
-            query += " WHERE " + " AND ".join(condiciones)
+        where, parametros = self._condiciones_filtro(areas_seleccionadas, fecha_inicio, fecha_fin, solo_activos)
         
         # Ordenar por fecha de ingreso descendente
-        query += " ORDER BY ingreso DESC"
+        query = f"SELECT {self.columnas_select()} FROM pacientes{where} ORDER BY ingreso DESC"
         
         # Ejecutar la consulta
-        cursor.execute(query)
+        cursor.execute(query, parametros)
         datos = cursor.fetchall()
         conn.close()
         
         return datos
+
+    def obtener_censo_activo(self, areas_seleccionadas=None):
+        """
+        Obtiene el censo activo: pacientes de las áreas indicadas que no han sido dados de alta,
+        o que lo fueron dentro de la ventana de gracia configurada en [CENSO].
+        
+        Args:
+            areas_seleccionadas: Lista de áreas seleccionadas
+            
+        Returns:
+            list: Lista de registros de pacientes activos ordenados por ingreso descendente
+        """
+        return self.obtener_datos_pacientes_filtrados(areas_seleccionadas, solo_activos=True)
+
+    def obtener_cambios_pacientes(self, areas_seleccionadas=None, fecha_inicio=None, fecha_fin=None, solo_activos=False):
+        """
+        Devuelve los pacientes del filtro leyendo de la base de datos solo lo que cambió.
+        
+        Primero consulta una firma barata del filtro (total de filas y MAX(updated_at));
+        si es igual a la del sondeo anterior se devuelve la copia local sin leer filas.
+        Si se movió, se traen solo las filas con updated_at reciente y se mezclan con la
+        copia local. Cuando el total no cuadra (p. ej. un paciente eliminado) o cambia el
+        filtro, se recarga todo.
+        
+        Args:
+            areas_seleccionadas: Lista de áreas seleccionadas
+            fecha_inicio: Fecha de inicio del rango (formato: 'YYYY-MM-DD HH:MM:SS')
+            fecha_fin: Fecha de fin del rango (formato: 'YYYY-MM-DD HH:MM:SS')
+            solo_activos: Si es True, se limita al censo activo (sin pacientes dados de alta)
+            
+        Returns:
+            tuple: (datos, hubo_cambios) con los registros ordenados por ingreso descendente
+        """
+        idx_id = self.COLUMNAS_VISTA.index('id')
+        idx_ingreso = self.COLUMNAS_VISTA.index('ingreso')
+        columnas = self.columnas_select()
+        filtro = (tuple(areas_seleccionadas or ()), fecha_inicio, fecha_fin, solo_activos)
+        where, parametros = self._condiciones_filtro(areas_seleccionadas, fecha_inicio, fecha_fin, solo_activos)
+        estado = self._estado_sondeo if self._estado_sondeo and self._estado_sondeo['filtro'] == filtro else None
+        
+        conn = self.conectar()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*), MAX(updated_at) FROM pacientes{where}", parametros)
+            total, ultimo_cambio = cursor.fetchone()
+            
+            if estado and estado['firma'] == (total, ultimo_cambio):
+                return estado['datos'], False
+            
+            filas = None
+            if estado and estado['firma'][1] is not None:
+                desde = estado['firma'][1] - self.MARGEN_SONDEO
+                filas = dict(estado['filas'])
+                
+                # Quitar todo lo que cambió (incluye pacientes que salieron del filtro) y reinsertar lo que sigue dentro
+                cursor.execute("SELECT id FROM pacientes WHERE updated_at >= %s", (desde,))
+                for (paciente_id,) in cursor.fetchall():
+                    filas.pop(paciente_id, None)
+                
+                condicion = (where + " AND " if where else " WHERE ") + "updated_at >= %s"
+                cursor.execute(f"SELECT {columnas} FROM pacientes{condicion}", parametros + [desde])
+                for fila in cursor.fetchall():
+                    filas[fila[idx_id]] = fila
+                
+                # Una eliminación (o un alta que sale de la ventana de gracia) no deja rastro en
+                # updated_at; si el total no cuadra se recarga todo
+                if len(filas) != total:
+                    filas = None
+            
+            if filas is None:
+                cursor.execute(f"SELECT {columnas} FROM pacientes{where}", parametros)
+                filas = {fila[idx_id]: fila for fila in cursor.fetchall()}
+            
+            datos = sorted(
+                filas.values(),
+                key=lambda fila: (fila[idx_ingreso] is not None, fila[idx_ingreso] or datetime.min, fila[idx_id]),
+                reverse=True
+            )
+            self._estado_sondeo = {
+                'filtro': filtro,
+                'firma': (total, ultimo_cambio),
+                'filas': filas,
+                'datos': datos
+            }
+            return datos, True
+        except pymysql.err.MySQLError as e:
+            # Base de datos sin la columna updated_at: se mantiene la recarga completa
+            print(f"⚠️ Sondeo de cambios no disponible, se recarga toda la tabla: {str(e)}")
+            self._estado_sondeo = None
+            return list(self.obtener_datos_pacientes_filtrados(areas_seleccionadas, fecha_inicio, fecha_fin, solo_activos)), True
+        finally:
+            conn.close()
+
+    def reiniciar_sondeo(self):
+        """Descarta la copia local del sondeo para forzar una recarga completa"""
+        self._estado_sondeo = None
     
     def datos_guardar_paciente(self, datos, ubicacion):
         """
@@ -1130,6 +2236,44 @@ class ModeloPaciente(QObject):
         except Exception as e:
             return False, f"Error al guardar paciente: {str(e)}", None
         
+    def _sincronizar_asociaciones(self, cursor, tipo, paciente_id, codigos):
+        """
+        Sincroniza las asociaciones de un paciente con la selección indicada aplicando solo
+        las diferencias; las filas que se mantienen conservan su estado y fecha de solicitud.
+        
+        Args:
+            cursor: Cursor de la transacción en curso
+            tipo: 'laboratorios' o 'imagenes'
+            paciente_id: ID del paciente
+            codigos: Códigos seleccionados
+            
+        Returns:
+            tuple: (agregados, eliminados) como listas de códigos
+        """
+        tabla, columna = self.ASOCIACIONES[tipo]
+        
+        cursor.execute(f"SELECT {columna} FROM {tabla} WHERE paciente_id = %s", (paciente_id,))
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        seleccion = list(dict.fromkeys(codigos))
+        
+        agregados = [codigo for codigo in seleccion if codigo not in existentes]
+        eliminados = sorted(existentes.difference(seleccion))
+        
+        if eliminados:
+            cursor.execute(
+                f"DELETE FROM {tabla} WHERE paciente_id = %s AND {columna} IN ({', '.join(['%s'] * len(eliminados))})",
+                [paciente_id] + eliminados
+            )
+        if agregados:
+            cursor.execute(
+                f"INSERT INTO {tabla} (paciente_id, {columna}) VALUES {', '.join(['(%s, %s)'] * len(agregados))}",
+                [valor for codigo in agregados for valor in (paciente_id, codigo)]
+            )
+        
+        # Los nombres se resuelven del catálogo en memoria, sin una consulta por código
+        CatalogoExamenes.obtener(tipo, cursor)
+        return agregados, eliminados
+
     def obtener_laboratorios_paciente(self, paciente_id):
         """Obtiene los laboratorios asociados a un paciente"""
         conn = self.conectar()
@@ -1205,48 +2349,26 @@ class ModeloPaciente(QObject):
             # Actualizar el estado en la tabla de pacientes a vacío si tiene algún valor
             if estado_labs:
                 cursor.execute("UPDATE pacientes SET labs = '' WHERE id = %s", (paciente_id,))
+            self.recalcular_pendientes(paciente_id, cursor)
             conn.commit()
             conn.close()
             print("✅ No se asociaron laboratorios (eliminadas asociaciones existentes)")
             return True, "No se asociaron laboratorios"
         
-        # Continuar con el procedimiento normal de inserción de laboratorios
-        cursor.execute("DELETE FROM pacientes_laboratorios WHERE paciente_id = %s", (paciente_id,))
-        
-        # Obtener detalles de los laboratorios para mostrar en consola
-        lab_detalles = []
-        
-        # Insertar nuevos laboratorios
-        for codigo_lab in laboratorios:
-            # Obtener el nombre del laboratorio para mostrar en consola
-            cursor.execute("SELECT nombre_lab FROM laboratorios WHERE codigo_lab = %s", (codigo_lab,))
-            lab_info = cursor.fetchone()
-            lab_nombre = lab_info[0] if lab_info else codigo_lab
-            
-            cursor.execute("""
-                INSERT INTO pacientes_laboratorios (paciente_id, codigo_lab)
-                VALUES (%s, %s)
-            """, (paciente_id, codigo_lab))
-            
-            lab_detalles.append(f"{codigo_lab} - {lab_nombre}")
-        
+        # Sincronizar solo las diferencias: un INSERT multi-fila y un DELETE ... IN
+        agregados, eliminados = self._sincronizar_asociaciones(cursor, 'laboratorios', paciente_id, laboratorios)
         conn.commit()
+        conn.close()
         
         # Imprimir detalles de los laboratorios guardados
-        print(f"Laboratorios guardados:")
-        for detalle in lab_detalles:
-            print(f"  - {detalle}")
-        
-        # Obtener el estado actual de Labs
-        cursor.execute("SELECT labs FROM pacientes WHERE id = %s", (paciente_id,))
-        resultado = cursor.fetchone()
-        labs_estado = resultado[0] if resultado else ""
-        
-        conn.close()
+        nombres = CatalogoExamenes.nombres('laboratorios')
+        print(f"Laboratorios guardados (+{len(agregados)} / -{len(eliminados)}):")
+        for codigo_lab in laboratorios:
+            print(f"  - {codigo_lab} - {nombres.get(codigo_lab, codigo_lab)}")
         
-        # Actualizar pendientes automáticamente según el estado de Labs
-        print(f"Actualizando pendientes para Labs con estado: {labs_estado}")
-        self.actualizar_pendientes_segun_labs(paciente_id, labs_estado)
+        # Recalcular los pendientes automáticos con las nuevas asociaciones
+        print(f"Actualizando pendientes para Labs con estado: {estado_labs}")
+        self.recalcular_pendientes(paciente_id)
         
         self.datos_actualizados.emit()
         print("✅ Laboratorios guardados correctamente")
@@ -1266,195 +2388,250 @@ class ModeloPaciente(QObject):
         conn.close()
         return imagenes
     
-    def actualizar_columna_pendientes(self, paciente_id, pendientes_texto):
+    def recalcular_pendientes(self, paciente_id, cursor=None):
         """
-        Actualiza la columna de pendientes para un paciente específico.
+        Recalcula los pendientes automáticos de un paciente con el motor de reglas.
         
         Args:
-            paciente_id: ID del paciente a actualizar
-            pendientes_texto: Texto con los pendientes actualizados
+            paciente_id: ID del paciente
+            cursor: Cursor de una transacción en curso (opcional); sin él se abre y confirma una propia
             
         Returns:
             bool: True si la actualización fue exitosa, False en caso contrario
         """
-        try:
-            conn = self.conectar()
-            cursor = conn.cursor()
-            
-            # Obtener el nombre del paciente para el registro en consola
-            cursor.execute("SELECT nombre, documento FROM pacientes WHERE id = %s", (paciente_id,))
-            paciente_info = cursor.fetchone()
-            nombre_paciente = paciente_info[0] if paciente_info else f"Paciente ID: {paciente_id}"
-            documento_paciente = paciente_info[1] if paciente_info else "Desconocido"
+        return self.recalcular_pendientes_lote([paciente_id], cursor) is not None
+    
+    def recalcular_pendientes_lote(self, pacientes_ids=None, cursor=None):
+        """
+        Recalcula los pendientes automáticos de un grupo de pacientes en una sola pasada.
+        El estado, las asociaciones y los pendientes guardados se leen en una consulta; las
+        diferencias se escriben con un DELETE ... IN y un INSERT multi-fila.
+        
+        Args:
+            pacientes_ids: IDs de los pacientes; si es None se recalcula todo el censo activo
+            cursor: Cursor de una transacción en curso (opcional); sin él se abre y confirma una propia
             
-            # Actualizar el campo de pendientes en la tabla principal
-            cursor.execute("""
-                UPDATE pacientes
-                SET pendientes = %s
-                WHERE id = %s
-            """, (pendientes_texto, paciente_id))
+        Returns:
+            list: IDs de los pacientes cuyos pendientes cambiaron, o None si hubo un error
+        """
+        if pacientes_ids is None:
+            where, parametros = self._condiciones_filtro(solo_activos=True)
+        else:
+            pacientes_ids = list(dict.fromkeys(pacientes_ids))
+            if not pacientes_ids:
+                return []
+            where = f" WHERE id IN ({', '.join(['%s'] * len(pacientes_ids))})"
+            parametros = pacientes_ids
+        
+        conn = None
+        try:
+            if cursor is None:
+                conn = self.conectar()
+                cursor = conn.cursor()
             
-            conn.commit()
+            subconsulta = f"paciente_id IN (SELECT id FROM pacientes{where})"
+            cursor.execute(f"""
+                SELECT 'estado', id, triage, ci, labs, ix, inter, rv FROM pacientes{where}
+                UNION ALL
+                SELECT 'laboratorio', paciente_id, codigo_lab, NULL, NULL, NULL, NULL, NULL
+                    FROM pacientes_laboratorios WHERE {subconsulta}
+                UNION ALL
+                SELECT 'imagen', paciente_id, codigo_ix, NULL, NULL, NULL, NULL, NULL
+                    FROM pacientes_ixs WHERE {subconsulta}
+                UNION ALL
+                SELECT 'guardado', paciente_id, id, tipo, codigo_ref, texto, NULL, NULL
+                    FROM pacientes_pendientes WHERE origen = 'automatico' AND {subconsulta}
+            """, list(parametros) * 4)
+            
+            estados, examenes, guardados = {}, {}, {}
+            for clase, paciente_id, *valores in cursor.fetchall():
+                if clase == 'estado':
+                    estados[paciente_id] = dict(zip(self.CAMPOS_PENDIENTES, valores))
+                elif clase == 'guardado':
+                    guardados.setdefault(paciente_id, {})[tuple(valores[1:4])] = int(valores[0])
+                else:
+                    examenes.setdefault(paciente_id, {}).setdefault(clase, []).append(valores[0])
+            
+            calculados = self.calcular_pendientes_lote(estados, examenes)
+            
+            eliminados, nuevos, cambiados = [], [], []
+            for paciente_id, pendientes in calculados.items():
+                existentes = guardados.get(paciente_id, {})
+                vigentes = set(pendientes)
+                faltantes = [pendiente for pendiente in pendientes if pendiente not in existentes]
+                sobrantes = [id_fila for clave, id_fila in existentes.items() if clave not in vigentes]
+                if faltantes or sobrantes:
+                    cambiados.append(paciente_id)
+                    eliminados.extend(sobrantes)
+                    nuevos.extend((paciente_id,) + pendiente for pendiente in faltantes)
+            
+            if eliminados:
+                cursor.execute(
+                    f"DELETE FROM pacientes_pendientes WHERE id IN ({', '.join(['%s'] * len(eliminados))})",
+                    sorted(eliminados)
+                )
+            if nuevos:
+                cursor.execute(
+                    "INSERT INTO pacientes_pendientes (paciente_id, tipo, origen, codigo_ref, texto) VALUES "
+                    + ", ".join(["(%s, %s, 'automatico', %s, %s)"] * len(nuevos)),
+                    [valor for fila in nuevos for valor in fila]
+                )
+            if cambiados:
+                self._marcar_cambio_pendientes(cursor, cambiados)
             
-            # Verificar si se realizaron cambios
-            if cursor.rowcount > 0:
-                print(f"\n[PENDIENTES ACTUALIZADOS] - {nombre_paciente} ({documento_paciente})")
-                print(f"ID: {paciente_id}")
-                print(f"Pendientes: {pendientes_texto}")
-                # Emitir señal de datos actualizados para refrescar la interfaz
-                self.datos_actualizados.emit()
-                return True
-            else:
-                print(f"No se encontró paciente con ID: {paciente_id}")
-                return False
-                
+            if conn:
+                conn.commit()
+            if cambiados:
+                print(f"✅ Pendientes recalculados: {len(cambiados)} de {len(calculados)} pacientes con cambios")
+                if conn:
+                    self.datos_actualizados.emit()
+            return cambiados
+        
         except Exception as e:
-            print(f"Error al actualizar pendientes: {str(e)}")
-            return False
+            print(f"Error al recalcular pendientes: {str(e)}")
+            return None
         finally:
-            if 'conn' in locals() and conn:
+            if conn:
                 conn.close()
-                
-    def calcular_pendientes_auto(self, paciente_id):
+    
+    @classmethod
+    def calcular_pendientes_lote(cls, estados, examenes=None):
         """
-        Calcula automáticamente los pendientes basados en el estado de otros campos
-        y los laboratorios e imágenes asignados al paciente.
+        Aplica REGLAS_PENDIENTES y REGLAS_EXAMENES a un grupo de pacientes en una pasada.
+        No consulta la base de datos.
         
         Args:
-            paciente_id: ID del paciente
+            estados: Diccionario paciente_id -> {campo: valor} con los campos de CAMPOS_PENDIENTES
+            examenes: Diccionario paciente_id -> {'laboratorio': [códigos], 'imagen': [códigos]}
             
         Returns:
-            str: Texto calculado de pendientes
+            dict: paciente_id -> lista de pendientes como tuplas (tipo, codigo_ref, texto)
         """
-        try:
-            conn = self.conectar()
-            cursor = conn.cursor()
-            
-            # Obtener datos relevantes del paciente
-            cursor.execute("""
-                SELECT triage, ci, labs, ix, inter, rv, pendientes 
-                FROM pacientes
-                WHERE id = %s
-            """, (paciente_id,))
-            
-            resultado = cursor.fetchone()
-            
-            if not resultado:
-                return ""
-            
-            triage, ci, estado_labs, estado_ix, inter, rv, pendientes_actuales = resultado
-            pendientes = []
+        examenes = examenes or {}
+        resultado = {}
+        for paciente_id, estado in estados.items():
+            pendientes = [(tipo, None, texto) for tipo, texto, aplica in cls.REGLAS_PENDIENTES if aplica(estado)]
+            
+            if estado['ci'] == "Realizado":
+                asociados = examenes.get(paciente_id, {})
+                for tipo, campo in cls.REGLAS_EXAMENES:
+                    if estado[campo] in cls.ESTADOS_EXAMEN_PENDIENTE:
+                        pendientes.extend((tipo, codigo, None) for codigo in dict.fromkeys(asociados.get(tipo, ())))
+            
+            resultado[paciente_id] = pendientes
+        return resultado
+    
+    @classmethod
+    def extraer_pendientes_manuales(cls, texto, cursor=None):
+        """
+        Convierte el texto de pendientes escrito en los formularios en pendientes manuales.
+        Se descartan los automáticos (se recalculan por reglas), los resúmenes de exámenes
+        y los nombres de exámenes del catálogo. Las comas se conservan dentro del pendiente.
+        
+        Args:
+            texto: Texto de pendientes separado por SEPARADOR_PENDIENTES
+            cursor: Cursor para cargar el catálogo de exámenes si no está en memoria (opcional)
             
-            if pendientes_actuales:
-                # Lista de pendientes automáticos específicos que serán regenerados
-                pendientes_automaticos = [
-                    "Valoración CI", "Abrir Interconsulta", "Respuesta Interconsulta",
-                    "Realizar RV", "Realizar triage"
-                ]
-                
-                # Filtrar pendientes eliminando todos los automáticos y los relacionados con labs/imágenes
-                pendientes_personalizados = []
-                for pendiente in pendientes_actuales.split(", "):
-                    # Eliminar cualquier pendiente que contenga la palabra "Labs"
-                    if not pendiente.startswith("Labs pendientes:") and "Labs" not in pendiente:
-                        # Eliminar cualquier pendiente que contenga la palabra "IMG"
-                        if not pendiente.startswith("IMG pendientes:") and "IMG" not in pendiente and "Resultados IMG" not in pendiente:
-                            # Verificar si es un pendiente automático específico
-                            es_automatico = any(p_auto in pendiente for p_auto in pendientes_automaticos)
-                            
-                            # Verificar si está relacionado con labs/imágenes
-                            es_lab_img = pendiente.startswith("Labs pendientes:") or pendiente.startswith("IMG pendientes:")
-                            
-                            if not es_automatico and not es_lab_img:
-                                cursor.execute("""
-                                    SELECT COUNT(*) FROM (
-                                        SELECT nombre_lab AS nombre FROM laboratorios
-                                        WHERE nombre_lab = %s
-                                        UNION
-                                        SELECT nombre_ix AS nombre FROM imagenes
-                                        WHERE nombre_ix = %s
-                                    ) AS combined
-                                """, (pendiente, pendiente))
-                                
-                                resultado_check = cursor.fetchone()
-                                es_lab_img_item = resultado_check[0] > 0 if resultado_check else False
-                                
-                                # Solo agregar si no es un elemento de lab o imagen
-                                if not es_lab_img_item:
-                                    pendientes_personalizados.append(pendiente)
-                
-                # Actualizar la lista de pendientes con solo los personalizados no automáticos
-                pendientes = pendientes_personalizados
-                        
-            # 1. Triage pendiente
-            if triage in ["", "No realizado"] and "Realizar triage" not in pendientes:
-                pendientes.append("Realizar triage")
-            
-            # 2. CI pendiente (solo si hay triage)
-            if triage not in ["", "No realizado"] and ci == "No realizado" and "Valoración CI" not in pendientes:
-                pendientes.append("Valoración CI")
-            
-            # 3. Si CI está realizado, verificar otros pendientes
-            if ci == "Realizado":
-                # 4. Verificar pendientes de Interconsulta
-                if inter in ["No se ha abierto", "Abierta"]:
-                    pendiente_texto = "Abrir Interconsulta" if inter == "No se ha abierto" else "Respuesta Interconsulta"
-                    if pendiente_texto not in pendientes:
-                        pendientes.append(pendiente_texto)
-                
-                # 5. Verificar pendientes de RV
-                if rv == "No realizado" and "Realizar RV" not in pendientes:
-                    pendientes.append("Realizar RV")
+        Returns:
+            list: Pendientes manuales como tuplas ('manual', None, texto)
+        """
+        manuales = []
+        for pendiente in (texto or "").split(cls.SEPARADOR_PENDIENTES):
+            pendiente = pendiente.strip()
+            if not pendiente or pendiente in cls.TEXTOS_PENDIENTES_AUTOMATICOS:
+                continue
+            # Los resúmenes "Labs pendientes: ..." e "IMG pendientes: ..." se derivan de las asociaciones
+            if pendiente.startswith(cls.PREFIJOS_RESUMEN_EXAMENES):
+                continue
+            if CatalogoExamenes.es_examen(pendiente, cursor):
+                continue
+            manuales.append(('manual', None, pendiente[:255]))
+        return list(dict.fromkeys(manuales))
+    
+    def _sincronizar_pendientes(self, cursor, paciente_id, origen, pendientes):
+        """
+        Sincroniza los pendientes de un origen con la lista indicada aplicando solo las
+        diferencias; los que se mantienen conservan su fecha de creación.
+        
+        Args:
+            cursor: Cursor de la transacción en curso
+            paciente_id: ID del paciente
+            origen: 'automatico' o 'manual'
+            pendientes: Lista de tuplas (tipo, codigo_ref, texto)
             
-            # 7. Procesar laboratorios pendientes - Lista única y ordenada
-            labs_pendientes_lista = []
-            if ci == "Realizado" and estado_labs in ["No se ha realizado", "En espera de resultados"]:
-                cursor.execute("""
-                    SELECT DISTINCT l.nombre_lab 
-                    FROM pacientes_laboratorios pl
-                    JOIN laboratorios l ON pl.codigo_lab = l.codigo_lab
-                    WHERE pl.paciente_id = %s
-                    ORDER BY l.nombre_lab
-                """, (paciente_id,))
-                
-                labs_pendientes = cursor.fetchall()
-                
-                if labs_pendientes:
-                    # Extraer los nombres de los laboratorios y crear una lista única
-                    labs_pendientes_lista = sorted(set(lab[0] for lab in labs_pendientes))
+        Returns:
+            bool: True si hubo cambios
+        """
+        cursor.execute("""
+            SELECT id, tipo, codigo_ref, texto FROM pacientes_pendientes
+            WHERE paciente_id = %s AND origen = %s
+        """, (paciente_id, origen))
+        existentes = {tuple(fila[1:]): fila[0] for fila in cursor.fetchall()}
+        
+        seleccion = list(dict.fromkeys(pendientes))
+        nuevos = [pendiente for pendiente in seleccion if pendiente not in existentes]
+        eliminados = sorted(id_fila for clave, id_fila in existentes.items() if clave not in set(seleccion))
+        
+        if eliminados:
+            cursor.execute(
+                f"DELETE FROM pacientes_pendientes WHERE id IN ({', '.join(['%s'] * len(eliminados))})",
+                eliminados
+            )
+        if nuevos:
+            cursor.execute(
+                "INSERT INTO pacientes_pendientes (paciente_id, tipo, origen, codigo_ref, texto) VALUES "
+                + ", ".join(['(%s, %s, %s, %s, %s)'] * len(nuevos)),
+                [valor for tipo, codigo, texto in nuevos for valor in (paciente_id, tipo, origen, codigo, texto)]
+            )
+        if not (nuevos or eliminados):
+            return False
+        
+        self._marcar_cambio_pendientes(cursor, [paciente_id])
+        return True
+    
+    @staticmethod
+    def _marcar_cambio_pendientes(cursor, pacientes_ids):
+        """
+        Mueve updated_at de los pacientes indicados; las vistas detectan cambios por esa
+        columna, que no se actualiza al escribir en pacientes_pendientes.
+        
+        Args:
+            cursor: Cursor de la transacción en curso
+            pacientes_ids: IDs de los pacientes con pendientes modificados
+        """
+        try:
+            cursor.execute(
+                f"UPDATE pacientes SET updated_at = CURRENT_TIMESTAMP(6) WHERE id IN ({', '.join(['%s'] * len(pacientes_ids))})",
+                list(pacientes_ids)
+            )
+        except pymysql.err.OperationalError as e:
+            print(f"⚠️ No se pudo marcar el cambio de pendientes en updated_at: {str(e)}")
+    
+    def obtener_pacientes_con_pendiente(self, tipo, codigo_ref=None):
+        """
+        Lista los pacientes con un pendiente abierto de un tipo, p. ej. todos los que esperan
+        un laboratorio concreto. Se resuelve con el índice (tipo, codigo_ref).
+        
+        Args:
+            tipo: Tipo de pendiente ('laboratorio', 'imagen', 'ci', 'inter', 'rv', 'triage' o 'manual')
+            codigo_ref: Código del laboratorio o imagen (opcional)
             
-            # 8. Procesar imágenes pendientes - Lista única y ordenada
-            img_pendientes_lista = []
-            if ci == "Realizado" and estado_ix in ["No se ha realizado", "En espera de resultados"]:
+        Returns:
+            list: IDs de los pacientes, sin repetir
+        """
+        conn = self.conectar()
+        try:
+            cursor = conn.cursor()
+            if codigo_ref is None:
+                cursor.execute("SELECT DISTINCT paciente_id FROM pacientes_pendientes WHERE tipo = %s", (tipo,))
+            else:
                 cursor.execute("""
-                    SELECT DISTINCT i.nombre_ix 
-                    FROM pacientes_ixs pi
-                    JOIN imagenes i ON pi.codigo_ix = i.codigo_ix
-                    WHERE pi.paciente_id = %s
-                    ORDER BY i.nombre_ix
-                """, (paciente_id,))
-                
-                img_pendientes = cursor.fetchall()
-                
-                if img_pendientes:
-                    # Extraer los nombres de las imágenes y crear una lista única
-                    img_pendientes_lista = sorted(set(img[0] for img in img_pendientes))
-            
-            # Añadir los pendientes de labs e imágenes si existen
-            if labs_pendientes_lista:
-                pendientes.append(f"Labs pendientes: {', '.join(labs_pendientes_lista)}")
-            
-            if img_pendientes_lista:
-                pendientes.append(f"IMG pendientes: {', '.join(img_pendientes_lista)}")
-            
-            return ", ".join(pendientes)
-            
-        except Exception as e:
-            print(f"Error al calcular pendientes automáticos: {str(e)}")
-            return ""
+                    SELECT DISTINCT paciente_id FROM pacientes_pendientes
+                    WHERE tipo = %s AND codigo_ref = %s
+                """, (tipo, codigo_ref))
+            return [fila[0] for fila in cursor.fetchall()]
         finally:
-            if 'conn' in locals() and conn:
-                conn.close()
+            conn.close()
     
     def guardar_imagenes_paciente(self, paciente_id, imagenes):
         """
@@ -1493,355 +2670,55 @@ class ModeloPaciente(QObject):
         # Validar que triage y CI estén realizados
         if triage not in ["1", "2", "3", "4", "5"] or ci != "Realizado":
             print(f"⚠️ Error: El triage y CI deben estar realizados antes de asociar imágenes")
-            conn.close()
-            return False, "El triage y CI deben estar realizados antes de asociar imágenes"
-        
-        # Validación de concordancia entre estado IX y imágenes seleccionadas
-        estados_validos = ["No se ha realizado", "En espera de resultados", "Resultados completos"]
-        
-        # ✅ Si hay imágenes pero no se ha establecido un estado válido
-        if imagenes and (not estado_ix or estado_ix not in estados_validos):
-            print(f"⚠️ Error: Debe establecer un estado válido en IMG cuando selecciona imágenes")
-            conn.close()
-            return False, "Debe establecer un estado válido en IMG cuando selecciona imágenes"
-            
-        # ✅ Si hay un estado válido pero no hay imágenes seleccionadas
-        if not imagenes and estado_ix in estados_validos:
-            print(f"⚠️ Error: Ha seleccionado un estado para IMG pero no ha agregado ninguna imagen")
-            conn.close()
-            return False, "Ha seleccionado un estado para IMG pero no ha agregado ninguna imagen"
-        
-        # Si no hay imágenes y no hay estado, simplemente eliminar las asociaciones antiguas
-        if not imagenes and (not estado_ix or estado_ix not in estados_validos):
-            cursor.execute("DELETE FROM pacientes_ixs WHERE paciente_id = %s", (paciente_id,))
-            # Actualizar el estado en la tabla de pacientes a vacío si tiene algún valor
-            if estado_ix:
-                cursor.execute("UPDATE pacientes SET ix = '' WHERE id = %s", (paciente_id,))
-            conn.commit()
-            conn.close()
-            print("✅ No se asociaron imágenes (eliminadas asociaciones existentes)")
-            return True, "No se asociaron imágenes"
-        
-        # Continuar con el procedimiento normal de inserción de imágenes
-        cursor.execute("DELETE FROM pacientes_ixs WHERE paciente_id = %s", (paciente_id,))
-        
-        # Obtener detalles de las imágenes para mostrar en consola
-        img_detalles = []
-        
-        # Insertar nuevas imágenes
-        for codigo_ix in imagenes:
-            # Obtener el nombre de la imagen para mostrar en consola
-            cursor.execute("SELECT nombre_ix FROM imagenes WHERE codigo_ix = %s", (codigo_ix,))
-            ix_info = cursor.fetchone()
-            ix_nombre = ix_info[0] if ix_info else codigo_ix
-            
-            cursor.execute("""
-                INSERT INTO pacientes_ixs (paciente_id, codigo_ix)
-                VALUES (%s, %s)
-            """, (paciente_id, codigo_ix))
-            
-            img_detalles.append(f"{codigo_ix} - {ix_nombre}")
-        
-        conn.commit()
-        
-        # Imprimir detalles de las imágenes guardadas
-        print(f"Imágenes guardadas:")
-        for detalle in img_detalles:
-            print(f"  - {detalle}")
-        
-        # Obtener el estado actual de IX
-        cursor.execute("SELECT ix FROM pacientes WHERE id = %s", (paciente_id,))
-        resultado = cursor.fetchone()
-        ix_estado = resultado[0] if resultado else ""
-        
-        conn.close()
-        
-        # Actualizar pendientes automáticamente según el estado de IX
-        print(f"Actualizando pendientes para IMG con estado: {ix_estado}")
-        self.actualizar_pendientes_segun_ix(paciente_id, ix_estado)
-        
-        self.datos_actualizados.emit()
-        print("✅ Imágenes guardadas correctamente")
-        return True, "Imágenes guardadas correctamente"
-    
-    def actualizar_pendientes_segun_labs(self, paciente_id, estado_labs):
-        """
-        Actualiza los pendientes basado en el estado de Labs
-        
-        Args:
-            paciente_id: ID del paciente
-            estado_labs: Estado actual del campo Labs
-            
-        Returns:
-            bool: True si la actualización fue exitosa, False en caso contrario
-        """
-        try:
-            # Si Labs está completo, eliminar los pendientes relacionados con laboratorios
-            if estado_labs == "Resultados completos":
-                conn = self.conectar()
-                cursor = conn.cursor()
-                
-                # Obtener pendientes actuales
-                cursor.execute("SELECT pendientes FROM pacientes WHERE id = %s", (paciente_id,))
-                resultado = cursor.fetchone()
-                pendientes_actuales = resultado[0] if resultado and resultado[0] else ""
-                
-                # Filtrar pendientes para eliminar los relacionados con laboratorios
-                pendientes_filtrados = []
-                for pendiente in pendientes_actuales.split(", "):
-                    # Eliminar cualquier pendiente que contenga la palabra "Labs"
-                    if not pendiente.startswith("Labs pendientes:") and "Labs" not in pendiente:
-                        pendientes_filtrados.append(pendiente)
-                
-                nuevos_pendientes = ", ".join(pendientes_filtrados)
-                
-                # Actualizar pendientes
-                cursor.execute("UPDATE pacientes SET pendientes = %s WHERE id = %s", 
-                              (nuevos_pendientes, paciente_id))
-                conn.commit()
-                conn.close()
-                self.datos_actualizados.emit()
-                return True
-            else:
-                # Si Labs no está completo, recalcular pendientes
-                nuevos_pendientes = self.calcular_pendientes_auto(paciente_id)
-                return self.actualizar_columna_pendientes(paciente_id, nuevos_pendientes)
-        
-        except Exception as e:
-            print(f"Error al actualizar pendientes según estado de Labs: {str(e)}")
-            return False
-    
-    def actualizar_pendientes_segun_ix(self, paciente_id, estado_ix):
-        """
-        Actualiza los pendientes basado en el estado de IX
-        
-        Args:
-            paciente_id: ID del paciente
-            estado_ix: Estado actual del campo IX
-            
-        Returns:
-            bool: True si la actualización fue exitosa, False en caso contrario
-        """
-        try:
-            # Si IX está completo, eliminar los pendientes relacionados con imágenes
-            if estado_ix == "Resultados completos":
-                conn = self.conectar()
-                cursor = conn.cursor()
-                
-                # Obtener pendientes actuales
-                cursor.execute("SELECT pendientes FROM pacientes WHERE id = %s", (paciente_id,))
-                resultado = cursor.fetchone()
-                pendientes_actuales = resultado[0] if resultado and resultado[0] else ""
-                
-                # Filtrar pendientes para eliminar los relacionados con imágenes
-                pendientes_filtrados = []
-                for pendiente in pendientes_actuales.split(", "):
-                    # Eliminar cualquier pendiente que contenga la palabra "IMG"
-                    if not pendiente.startswith("IMG pendientes:") and "IMG" not in pendiente and "Resultados IMG" not in pendiente:
-                        pendientes_filtrados.append(pendiente)
-                
-                nuevos_pendientes = ", ".join(pendientes_filtrados)
-                
-                # Actualizar pendientes
-                cursor.execute("UPDATE pacientes SET pendientes = %s WHERE id = %s", 
-                              (nuevos_pendientes, paciente_id))
-                conn.commit()
-                conn.close()
-                self.datos_actualizados.emit()
-                return True
-            else:
-                # Si IX no está completo, recalcular pendientes
-                nuevos_pendientes = self.calcular_pendientes_auto(paciente_id)
-                return self.actualizar_columna_pendientes(paciente_id, nuevos_pendientes)
-        
-        except Exception as e:
-            print(f"Error al actualizar pendientes según estado de IX: {str(e)}")
-            return False
-    
-    def actualizar_pendientes_segun_ci(self, paciente_id, estado_ci):
-        """
-        Actualiza los pendientes basado en el estado de CI
-        
-        Args:
-            paciente_id: ID del paciente
-            estado_ci: Estado actual del campo CI
-            
-        Returns:
-            bool: True si la actualización fue exitosa, False en caso contrario
-        """
-        try:
-            # Si CI está Realizado, eliminar el pendiente relacionado con valoración de CI
-            if estado_ci == "Realizado":
-                conn = self.conectar()
-                cursor = conn.cursor()
-                
-                # Obtener pendientes actuales
-                cursor.execute("SELECT pendientes FROM pacientes WHERE id = %s", (paciente_id,))
-                resultado = cursor.fetchone()
-                pendientes_actuales = resultado[0] if resultado and resultado[0] else ""
-                
-                # Filtrar pendientes para eliminar los relacionados con CI
-                pendientes_filtrados = []
-                for pendiente in pendientes_actuales.split(", "):
-                    if pendiente and pendiente != "Valoración CI":
-                        pendientes_filtrados.append(pendiente)
-                
-                nuevos_pendientes = ", ".join(pendientes_filtrados)
-                
-                # Actualizar pendientes
-                cursor.execute("UPDATE pacientes SET pendientes = %s WHERE id = %s", 
-                              (nuevos_pendientes, paciente_id))
-                conn.commit()
-                conn.close()
-                self.datos_actualizados.emit()
-                return True
-            else:
-                # Si CI no está realizado, actualizar pendientes según corresponda
-                nuevos_pendientes = self.calcular_pendientes_auto(paciente_id)
-                return self.actualizar_columna_pendientes(paciente_id, nuevos_pendientes)
-        
-        except Exception as e:
-            print(f"Error al actualizar pendientes según estado de CI: {str(e)}")
-            return False
-    
-    def actualizar_pendientes_segun_triage(self, paciente_id, estado_triage):
-        """
-        Actualiza los pendientes basado en el estado del triage
-        
-        Args:
-            paciente_id: ID del paciente
-            estado_triage: Estado actual del campo triage
-            
-        Returns:
-            bool: True si la actualización fue exitosa, False en caso contrario
-        """
-        try:
-            # Si triage está establecido (tiene un nivel), eliminar el pendiente relacionado
-            if estado_triage in ["1", "2", "3", "4", "5"]:
-                conn = self.conectar()
-                cursor = conn.cursor()
-                
-                # Obtener pendientes actuales
-                cursor.execute("SELECT pendientes FROM pacientes WHERE id = %s", (paciente_id,))
-                resultado = cursor.fetchone()
-                pendientes_actuales = resultado[0] if resultado and resultado[0] else ""
-                
-                # Filtrar pendientes para eliminar los relacionados con triage
-                pendientes_filtrados = []
-                for pendiente in pendientes_actuales.split(", "):
-                    if pendiente and pendiente != "Realizar triage":
-                        pendientes_filtrados.append(pendiente)
-                
-                nuevos_pendientes = ", ".join(pendientes_filtrados)
-                
-                # Actualizar pendientes
-                cursor.execute("UPDATE pacientes SET pendientes = %s WHERE id = %s", 
-                              (nuevos_pendientes, paciente_id))
-                conn.commit()
-                conn.close()
-                self.datos_actualizados.emit()
-                return True
-            else:
-                # Si triage no está establecido, añadir el pendiente correspondiente
-                nuevos_pendientes = self.calcular_pendientes_auto(paciente_id)
-                return self.actualizar_columna_pendientes(paciente_id, nuevos_pendientes)
+            conn.close()
+            return False, "El triage y CI deben estar realizados antes de asociar imágenes"
         
-        except Exception as e:
-            print(f"Error al actualizar pendientes según estado de triage: {str(e)}")
-            return False
-    
-    def actualizar_pendientes_segun_inter(self, paciente_id, estado_inter):
-        """
-        Actualiza los pendientes basado en el estado de la interconsulta
+        # Validación de concordancia entre estado IX y imágenes seleccionadas
+        estados_validos = ["No se ha realizado", "En espera de resultados", "Resultados completos"]
         
-        Args:
-            paciente_id: ID del paciente
-            estado_inter: Estado actual del campo interconsulta
+        # ✅ Si hay imágenes pero no se ha establecido un estado válido
+        if imagenes and (not estado_ix or estado_ix not in estados_validos):
+            print(f"⚠️ Error: Debe establecer un estado válido en IMG cuando selecciona imágenes")
+            conn.close()
+            return False, "Debe establecer un estado válido en IMG cuando selecciona imágenes"
             
-        Returns:
-            bool: True si la actualización fue exitosa, False en caso contrario
-        """
-        try:
-            # Si la interconsulta está realizada, eliminar el pendiente relacionado
-            if estado_inter == "Realizada":
-                conn = self.conectar()
-                cursor = conn.cursor()
-                
-                # Obtener pendientes actuales
-                cursor.execute("SELECT pendientes FROM pacientes WHERE id = %s", (paciente_id,))
-                resultado = cursor.fetchone()
-                pendientes_actuales = resultado[0] if resultado and resultado[0] else ""
-                
-                # Filtrar pendientes para eliminar los relacionados con interconsulta
-                pendientes_filtrados = []
-                for pendiente in pendientes_actuales.split(", "):
-                    if pendiente and pendiente != "Abrir Interconsulta" and pendiente != "Respuesta Interconsulta":
-                        pendientes_filtrados.append(pendiente)
-                
-                nuevos_pendientes = ", ".join(pendientes_filtrados)
-                
-                # Actualizar pendientes
-                cursor.execute("UPDATE pacientes SET pendientes = %s WHERE id = %s", 
-                              (nuevos_pendientes, paciente_id))
-                conn.commit()
-                conn.close()
-                self.datos_actualizados.emit()
-                return True
-            else:
-                # Si la interconsulta no está realizada, recalcular pendientes
-                nuevos_pendientes = self.calcular_pendientes_auto(paciente_id)
-                return self.actualizar_columna_pendientes(paciente_id, nuevos_pendientes)
+        # ✅ Si hay un estado válido pero no hay imágenes seleccionadas
+        if not imagenes and estado_ix in estados_validos:
+            print(f"⚠️ Error: Ha seleccionado un estado para IMG pero no ha agregado ninguna imagen")
+            conn.close()
+            return False, "Ha seleccionado un estado para IMG pero no ha agregado ninguna imagen"
         
-        except Exception as e:
-            print(f"Error al actualizar pendientes según estado de interconsulta: {str(e)}")
-            return False
-    
-    def actualizar_pendientes_segun_rv(self, paciente_id, estado_rv):
-        """
-        Actualiza los pendientes basado en el estado de RV
+        # Si no hay imágenes y no hay estado, simplemente eliminar las asociaciones antiguas
+        if not imagenes and (not estado_ix or estado_ix not in estados_validos):
+            cursor.execute("DELETE FROM pacientes_ixs WHERE paciente_id = %s", (paciente_id,))
+            # Actualizar el estado en la tabla de pacientes a vacío si tiene algún valor
+            if estado_ix:
+                cursor.execute("UPDATE pacientes SET ix = '' WHERE id = %s", (paciente_id,))
+            self.recalcular_pendientes(paciente_id, cursor)
+            conn.commit()
+            conn.close()
+            print("✅ No se asociaron imágenes (eliminadas asociaciones existentes)")
+            return True, "No se asociaron imágenes"
         
-        Args:
-            paciente_id: ID del paciente
-            estado_rv: Estado actual del campo RV
-            
-        Returns:
-            bool: True si la actualización fue exitosa, False en caso contrario
-        """
-        try:
-            # Si RV está realizado, eliminar el pendiente relacionado
-            if estado_rv == "Realizado":
-                conn = self.conectar()
-                cursor = conn.cursor()
-                
-                # Obtener pendientes actuales
-                cursor.execute("SELECT pendientes FROM pacientes WHERE id = %s", (paciente_id,))
-                resultado = cursor.fetchone()
-                pendientes_actuales = resultado[0] if resultado and resultado[0] else ""
-                
-                # Filtrar pendientes para eliminar los relacionados con RV
-                pendientes_filtrados = []
-                for pendiente in pendientes_actuales.split(", "):
-                    if pendiente and pendiente != "Realizar RV":
-                        pendientes_filtrados.append(pendiente)
-                
-                nuevos_pendientes = ", ".join(pendientes_filtrados)
-                
-                # Actualizar pendientes
-                cursor.execute("UPDATE pacientes SET pendientes = %s WHERE id = %s", 
-                              (nuevos_pendientes, paciente_id))
-                conn.commit()
-                conn.close()
-                self.datos_actualizados.emit()
-                return True
-            else:
-                # Si RV no está realizado, recalcular pendientes
-                nuevos_pendientes = self.calcular_pendientes_auto(paciente_id)
-                return self.actualizar_columna_pendientes(paciente_id, nuevos_pendientes)
+        # Sincronizar solo las diferencias: un INSERT multi-fila y un DELETE ... IN
+        agregados, eliminados = self._sincronizar_asociaciones(cursor, 'imagenes', paciente_id, imagenes)
+        conn.commit()
+        conn.close()
         
-        except Exception as e:
-            print(f"Error al actualizar pendientes según estado de RV: {str(e)}")
-            return False
-
+        # Imprimir detalles de las imágenes guardadas
+        nombres = CatalogoExamenes.nombres('imagenes')
+        print(f"Imágenes guardadas (+{len(agregados)} / -{len(eliminados)}):")
+        for codigo_ix in imagenes:
+            print(f"  - {codigo_ix} - {nombres.get(codigo_ix, codigo_ix)}")
+        
+        # Recalcular los pendientes automáticos con las nuevas asociaciones
+        print(f"Actualizando pendientes para IMG con estado: {estado_ix}")
+        self.recalcular_pendientes(paciente_id)
+        
+        self.datos_actualizados.emit()
+        print("✅ Imágenes guardadas correctamente")
+        return True, "Imágenes guardadas correctamente"
+    
     def obtener_nombre_usuario(self, username):
         """Obtiene el nombre completo del usuario desde la base de datos"""
         try:
@@ -1872,80 +2749,561 @@ class ModeloPaciente(QObject):
             print(f"Error al obtener nombre de usuario: {str(e)}")
             return username 
 
-    def actualizar_informacion_basica(self, datos, ubicacion, registro_original):
+class ProgramadorAlarmas(QObject):
+    """
+    Programador central de alarmas de una vista. Guarda un montículo con el próximo
+    vencimiento de cada alarma (triage sin CI, tiempo en observación) y un QTimer que
+    despierta exactamente cuando vence la primera, en lugar de reevaluar todas las filas
+    en cada refresco. Cada cambio de plazo cuesta O(log n); las entradas reemplazadas se
+    descartan al salir del montículo.
+    """
+    
+    # Lista de IDs de pacientes cuyas alarmas se activaron o se apagaron
+    alarmas_cambiadas = pyqtSignal(list)
+    
+    TIPOS = ("ci", "observacion")
+    
+    # Espera máxima del QTimer (milisegundos); plazos más lejanos se reprograman al despertar
+    ESPERA_MAXIMA_MS = 3600 * 1000
+    
+    def __init__(self, columnas=None, parent=None):
+        """
+        Args:
+            columnas: Columnas de las tuplas de la vista (por defecto ModeloPaciente.COLUMNAS_VISTA)
+            parent: QObject padre
         """
-        Actualiza información básica del paciente sin actualizar estados (que se manejarán con timestamps)
+        super().__init__(parent)
+        self.columnas = columnas or ModeloPaciente.COLUMNAS_VISTA
+        self.umbrales = ModeloPaciente.umbrales_alarma()
+        
+        self._plazos = {}       # (tipo, paciente_id) -> vencimiento en ms (escala de InstantaneaCenso)
+        self._monticulo = []    # (vencimiento, tipo, paciente_id)
+        self._activas = {tipo: set() for tipo in self.TIPOS}
+        
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._al_vencer)
+    
+    def sincronizar(self, datos, emitir=True):
+        """
+        Actualiza los plazos con las filas de la vista. Los vencimientos se calculan con
+        InstantaneaCenso.vencimientos(); solo los pacientes cuyo plazo cambió tocan el
+        montículo y los que ya no están en la vista se descartan (con datos vacíos se
+        apagan todas las alarmas y se detiene el temporizador).
         
         Args:
-            datos (dict): Diccionario de datos básicos del paciente
-            ubicacion (str): Ubicación del paciente
-            registro_original (tuple): Datos originales del paciente
+            datos: Lista de tuplas de la vista
+            emitir: Si es False no se emite alarmas_cambiadas (la vista aplica el resultado)
             
         Returns:
-            tuple: (exito, mensaje)
+            list: IDs de los pacientes cuyas alarmas se activaron o se apagaron
         """
-        try:
-            paciente_id = registro_original[13]  # ID en la posición 13
-            
-            conn = self.conectar()
-            cursor = conn.cursor()
-            
-            # Actualiza solo nombre, documento, pendientes y ubicación
-            query = """
-                UPDATE pacientes
-                SET nombre = %s, documento = %s, pendientes = %s, ubicacion = %s
-                WHERE id = %s
-            """
-            
-            params = (
-                datos['nombre'],
-                datos['documento'],
-                datos['pendientes'],
-                ubicacion,
-                paciente_id
-            )
-            
-            cursor.execute(query, params)
-            conn.commit()
+        cambiados = set()
+        instantanea = InstantaneaCenso(datos, self.columnas)
+        vencimientos = instantanea.vencimientos(self.umbrales)
+        ids = instantanea.ids.tolist()
+        vistos = set(ids)
+        
+        for tipo in self.TIPOS:
+            for paciente_id, vencimiento in zip(ids, vencimientos[tipo].tolist()):
+                if self._programar(tipo, paciente_id, None if vencimiento == InstantaneaCenso.NAT else vencimiento):
+                    cambiados.add(paciente_id)
+        
+        for tipo, paciente_id in [clave for clave in self._plazos if clave[1] not in vistos]:
+            if self._programar(tipo, paciente_id, None):
+                cambiados.add(paciente_id)
+        
+        # Compactar si las entradas reemplazadas dominan el montículo
+        if len(self._monticulo) > 2 * len(self._plazos) + 64:
+            self._monticulo = [(vencimiento, tipo, paciente_id) for (tipo, paciente_id), vencimiento in self._plazos.items()
+                               if paciente_id not in self._activas[tipo]]
+            heapq.heapify(self._monticulo)
+        
+        cambiados.update(self._procesar_vencidos())
+        self._rearmar()
+        if cambiados and emitir:
+            self.alarmas_cambiadas.emit(sorted(cambiados))
+        return sorted(cambiados)
+    
+    def activas(self, tipo):
+        """
+        Args:
+            tipo: 'ci' u 'observacion'
             
-            return True, "Información básica actualizada correctamente"
+        Returns:
+            set: IDs de los pacientes con esa alarma activa
+        """
+        return set(self._activas[tipo])
+    
+    def detener(self):
+        """Detiene el temporizador (al cerrar la vista)"""
+        self._timer.stop()
+    
+    def _programar(self, tipo, paciente_id, vencimiento):
+        """
+        Registra el plazo de una alarma. Devuelve True si la alarma estaba activa y se apagó.
+        """
+        clave = (tipo, paciente_id)
+        if self._plazos.get(clave) == vencimiento:
+            return False
+        
+        if vencimiento is None:
+            del self._plazos[clave]
+        else:
+            self._plazos[clave] = vencimiento
+            heapq.heappush(self._monticulo, (vencimiento, tipo, paciente_id))
+        
+        if paciente_id in self._activas[tipo]:
+            self._activas[tipo].discard(paciente_id)
+            return True
+        return False
+    
+    def _procesar_vencidos(self):
+        """Activa las alarmas cuyo plazo ya venció y devuelve los IDs afectados"""
+        ahora = InstantaneaCenso.ahora_ms()
+        activados = set()
+        while self._monticulo and self._monticulo[0][0] <= ahora:
+            vencimiento, tipo, paciente_id = heapq.heappop(self._monticulo)
+            # Entrada reemplazada por un plazo más reciente o de un paciente que ya no está
+            if self._plazos.get((tipo, paciente_id)) != vencimiento:
+                continue
+            if paciente_id not in self._activas[tipo]:
+                self._activas[tipo].add(paciente_id)
+                activados.add(paciente_id)
+        return activados
+    
+    def _rearmar(self):
+        """Programa el QTimer para el próximo vencimiento vigente"""
+        while self._monticulo and self._plazos.get(self._monticulo[0][1:]) != self._monticulo[0][0]:
+            heapq.heappop(self._monticulo)
+        
+        if not self._monticulo:
+            self._timer.stop()
+            return
+        
+        espera_ms = max(0, self._monticulo[0][0] - InstantaneaCenso.ahora_ms() + 1)
+        self._timer.start(min(espera_ms, self.ESPERA_MAXIMA_MS))
+    
+    def _al_vencer(self):
+        """Despertar del QTimer: activa lo vencido, avisa y reprograma"""
+        activados = self._procesar_vencidos()
+        self._rearmar()
+        if activados:
+            self.alarmas_cambiadas.emit(sorted(activados))
+
+class ColaTrazabilidad:
+    """
+    Cola de escritura diferida de la trazabilidad.
+    registrar_accion() solo encola el registro y lo anota en un archivo local de solo
+    anexado (spool); un hilo en segundo plano lo escribe en la base de datos en lotes
+    con INSERT de varias filas. Mientras MySQL no responde o no hay sesión, los registros
+    siguen en el spool y se reintentan, también en el siguiente inicio de la aplicación.
+    Cada registro lleva un id_registro único, de modo que reintentar un lote ya escrito
+    no duplica filas.
+    """
+
+    NOMBRE_SPOOL = 'trazabilidad_pendiente.jsonl'
+
+    # Espera máxima (segundos) entre reintentos cuando la base de datos no responde
+    ESPERA_MAXIMA_REINTENTO = 30
+
+    # El spool se compacta cuando los registros ya escritos son al menos esta cantidad
+    # y la mitad de sus líneas; así cada reescritura se amortiza entre muchos lotes
+    COMPACTAR_MINIMO = 500
+
+    _condicion = threading.Condition()
+    _cola = collections.deque()
+    _hilo = None
+    _config = None
+    _ruta_spool = None
+    _en_vuelo = 0
+    _releer_spool = False
+    _recargando = False
+    _confirmados = set()
+    _vaciando = 0
+    _estadisticas = {'encolados': 0, 'escritos': 0, 'lotes': 0, 'desbordados': 0,
+                     'reintentos': 0, 'en_spool': 0, 'profundidad_maxima': 0}
+
+    @classmethod
+    def _obtener_config(cls):
+        if cls._config is None:
+            cls._config = ModeloConfiguracion.cargar_configuracion_trazabilidad()
+        return cls._config
+
+    @classmethod
+    def _obtener_ruta_spool(cls):
+        if cls._ruta_spool is None:
+            base_path = os.path.dirname(ModeloConfiguracion.get_config_path())
+            cls._ruta_spool = os.path.join(base_path, cls.NOMBRE_SPOOL)
+        return cls._ruta_spool
+
+    @classmethod
+    def iniciar(cls):
+        """Arranca el hilo escritor (una vez por proceso) y recupera el spool de sesiones anteriores"""
+        with cls._condicion:
+            if cls._hilo is None:
+                try:
+                    ruta = cls._obtener_ruta_spool()
+                    if os.path.exists(ruta) and os.path.getsize(ruta) > 0:
+                        cls._releer_spool = True
+                        print("⚠️ Hay registros de trazabilidad pendientes de una sesión anterior")
+                except Exception as e:
+                    print(f"Error al revisar el spool de trazabilidad: {str(e)}")
+                cls._hilo = threading.Thread(target=cls._trabajar, name='ColaTrazabilidad', daemon=True)
+                cls._hilo.start()
+            # Una sesión nueva puede desbloquear los registros que esperaban credenciales
+            cls._condicion.notify_all()
+
+    @classmethod
+    def encolar(cls, registro):
+        """
+        Anota el registro en el spool y lo pone en la cola en memoria.
+        Si la cola está llena el registro queda solo en el spool y se escribe al releerlo.
+        
+        Args:
+            registro: dict con id_registro, usuario, rol, accion, fecha_hora,
+                      paciente_afectado y detalles_cambio
+        """
+        cls.iniciar()
+        with cls._condicion:
+            try:
+                with open(cls._obtener_ruta_spool(), 'a', encoding='utf-8') as spool:
+                    spool.write(json.dumps(registro, ensure_ascii=False) + '\n')
+                cls._estadisticas['en_spool'] += 1
+            except Exception as e:
+                print(f"⚠️ No se pudo anotar la trazabilidad en el spool: {str(e)}")
+
+            cls._estadisticas['encolados'] += 1
+            if len(cls._cola) >= cls._obtener_config()['tamano_cola']:
+                cls._estadisticas['desbordados'] += 1
+                cls._releer_spool = True
+            else:
+                cls._cola.append(registro)
+                cls._estadisticas['profundidad_maxima'] = max(cls._estadisticas['profundidad_maxima'], len(cls._cola))
+            cls._condicion.notify_all()
+
+    @classmethod
+    def _hay_sesion(cls):
+        return bool(ModeloAutenticacion.obtener_credenciales().get('usuario'))
+
+    @classmethod
+    def _pendiente(cls):
+        return bool(cls._cola) or cls._en_vuelo > 0 or cls._releer_spool or cls._recargando
+
+    @classmethod
+    def _tamano_spool(cls):
+        try:
+            return os.path.getsize(cls._obtener_ruta_spool())
+        except OSError:
+            return 0
+
+    @classmethod
+    def _leer_spool(cls, hasta):
+        """
+        Recorre las líneas del spool contenidas en sus primeros 'hasta' bytes. Solo lo llama
+        el hilo escritor y sin el candado: encolar() solo anexa al final del archivo.
+        
+        Args:
+            hasta: Tamaño del spool tomado con el candado
             
+        Yields:
+            tuple: (línea en bytes, id_registro o None si la línea está incompleta)
+        """
+        leidos = 0
+        try:
+            with open(cls._obtener_ruta_spool(), 'rb') as spool:
+                for linea in spool:
+                    if leidos >= hasta:
+                        break
+                    leidos += len(linea)
+                    try:
+                        yield linea, json.loads(linea).get('id_registro')
+                    except ValueError:
+                        # Línea incompleta de un cierre abrupto
+                        yield linea, None
+        except FileNotFoundError:
+            return
+
+    @classmethod
+    def _recargar_spool(cls, hasta, en_spool_base):
+        """
+        Carga en la cola los registros del spool que aún no se escribieron, como máximo
+        tamano_cola; si quedan más, _releer_spool sigue activo para la próxima pasada.
+        Se llama sin el candado con la cola vacía, así que todo lo anotado en los primeros
+        'hasta' bytes que no esté confirmado está solo en el spool.
+        
+        Args:
+            hasta: Tamaño del spool al tomar la decisión
+            en_spool_base: Líneas contadas en el spool en ese momento
+        """
+        capacidad = cls._obtener_config()['tamano_cola']
+        registros = []
+        lineas = 0
+        try:
+            for linea, id_registro in cls._leer_spool(hasta):
+                lineas += 1
+                if id_registro is None or id_registro in cls._confirmados or len(registros) > capacidad:
+                    continue
+                registros.append(json.loads(linea))
         except Exception as e:
-            print(f"Error al actualizar información básica: {str(e)}")
-            return False, f"Error al actualizar información básica: {str(e)}"
-        finally:
-            if conn and hasattr(conn, 'close'):
-                cursor.close()
-                conn.close()
+            print(f"⚠️ No se pudo releer el spool de trazabilidad: {str(e)}")
+            with cls._condicion:
+                cls._releer_spool = True
+                cls._recargando = False
+                cls._condicion.notify_all()
+                cls._condicion.wait(cls.ESPERA_MAXIMA_REINTENTO)
+            return
+
+        with cls._condicion:
+            cls._recargando = False
+            cls._condicion.notify_all()
+            # Lo encolado mientras se leía es más reciente y ya está en la cola
+            espacio = max(0, capacidad - len(cls._cola))
+            if len(registros) > espacio:
+                cls._releer_spool = True
+            cls._cola.extendleft(reversed(registros[:espacio]))
+            cls._estadisticas['en_spool'] = lineas + cls._estadisticas['en_spool'] - en_spool_base
+            cls._estadisticas['profundidad_maxima'] = max(cls._estadisticas['profundidad_maxima'], len(cls._cola))
+
+    @classmethod
+    def _truncar_spool(cls):
+        """Vacía el spool cuando todo lo anotado ya está en la base de datos (con el candado)"""
+        try:
+            open(cls._obtener_ruta_spool(), 'w', encoding='utf-8').close()
+            cls._estadisticas['en_spool'] = 0
+            cls._confirmados = set()
+        except Exception as e:
+            print(f"⚠️ No se pudo vaciar el spool de trazabilidad: {str(e)}")
+
+    @classmethod
+    def _compactar_spool(cls, hasta, confirmados, en_spool_base):
+        """
+        Reescribe el spool sin los registros ya escritos en la base de datos. La copia de los
+        primeros 'hasta' bytes se hace sin el candado; con el candado solo se agrega lo
+        anotado mientras tanto y se reemplaza el archivo de forma atómica.
+        
+        Args:
+            hasta: Tamaño del spool al tomar la decisión
+            confirmados: Conjunto de id_registro escritos que se quitan del spool
+            en_spool_base: Líneas contadas en el spool en ese momento
+        """
+        ruta = cls._obtener_ruta_spool()
+        temporal = ruta + '.tmp'
+        conservados = 0
+        try:
+            with open(temporal, 'wb') as destino:
+                for linea, id_registro in cls._leer_spool(hasta):
+                    if id_registro is None or id_registro in confirmados:
+                        continue
+                    destino.write(linea if linea.endswith(b'\n') else linea + b'\n')
+                    conservados += 1
+
+            with cls._condicion:
+                with open(ruta, 'rb') as origen, open(temporal, 'ab') as destino:
+                    origen.seek(hasta)
+                    destino.write(origen.read())
+                os.replace(temporal, ruta)
+                cls._estadisticas['en_spool'] = conservados + cls._estadisticas['en_spool'] - en_spool_base
+        except Exception as e:
+            print(f"⚠️ No se pudo compactar el spool de trazabilidad: {str(e)}")
+            with cls._condicion:
+                cls._confirmados |= confirmados
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+
+    @classmethod
+    def _trabajar(cls):
+        fallos = 0
+        while True:
+            with cls._condicion:
+                while not ((cls._cola or cls._releer_spool) and cls._hay_sesion()):
+                    cls._condicion.wait()
+
+                # Los registros que solo están en el spool se cargan cuando la cola se vacía
+                recargar = cls._releer_spool and not cls._cola
+                if recargar:
+                    cls._releer_spool = False
+                    cls._recargando = True
+                    hasta, en_spool_base = cls._tamano_spool(), cls._estadisticas['en_spool']
+
+            if recargar:
+                cls._recargar_spool(hasta, en_spool_base)
+                continue
+
+            with cls._condicion:
+                # Esperar un poco para agrupar más registros en el mismo INSERT
+                config = cls._obtener_config()
+                if len(cls._cola) < config['tamano_lote'] and not cls._vaciando and config['intervalo_ms']:
+                    cls._condicion.wait(config['intervalo_ms'] / 1000)
+
+                lote = [cls._cola.popleft() for _ in range(min(config['tamano_lote'], len(cls._cola)))]
+                cls._en_vuelo = len(lote)
+
+            escrito = bool(lote) and cls._escribir_lote(lote)
+            compactar = None
+
+            with cls._condicion:
+                cls._en_vuelo = 0
+                if escrito:
+                    fallos = 0
+                    cls._estadisticas['escritos'] += len(lote)
+                    cls._estadisticas['lotes'] += 1
+                    cls._confirmados.update(registro['id_registro'] for registro in lote)
+                    # Todo lo anotado en el spool ya está en la base de datos: se vacía; si no,
+                    # se compacta fuera del candado cuando lo ya escrito es una fracción grande
+                    if not cls._cola and not cls._releer_spool:
+                        cls._truncar_spool()
+                    elif (len(cls._confirmados) >= cls.COMPACTAR_MINIMO
+                          and 2 * len(cls._confirmados) >= cls._estadisticas['en_spool']):
+                        compactar = (cls._tamano_spool(), cls._confirmados, cls._estadisticas['en_spool'])
+                        cls._confirmados = set()
+                elif lote:
+                    fallos += 1
+                    cls._estadisticas['reintentos'] += 1
+                    cls._cola.extendleft(reversed(lote))
+                cls._condicion.notify_all()
+
+                if lote and not escrito:
+                    cls._condicion.wait(min(cls.ESPERA_MAXIMA_REINTENTO, 2 ** fallos))
+
+            if compactar:
+                cls._compactar_spool(*compactar)
+
+    @classmethod
+    def _escribir_lote(cls, lote):
+        """Escribe un lote de registros con un solo INSERT de varias filas"""
+        try:
+            with ModeloTrazabilidad.conectar() as conn:
+                cursor = conn.cursor()
+
+                # IDs y roles desde la caché de identidades de la sesión
+                from Back_end.Usuarios.ModeloUsuarios import ModeloUsuarios
+                identidades = {}
+                for username in {registro['usuario'] for registro in lote}:
+                    identidad = ModeloUsuarios.obtener_identidad(username)
+                    if identidad is None:
+                        # Usuario sin fila en la tabla: la consulta de rol lo da de alta
+                        ModeloUsuarios.obtener_rol_usuario(username)
+                        identidad = ModeloUsuarios.obtener_identidad(username)
+                    identidades[username] = identidad or {}
+
+                filas = []
+                for registro in lote:
+                    identidad = identidades[registro['usuario']]
+                    filas.append((
+                        registro['id_registro'], registro['usuario'],
+                        registro.get('rol') or identidad.get('rol') or 'visitante',
+                        registro['accion'], registro['fecha_hora'], registro.get('paciente_afectado'),
+                        registro.get('detalles_cambio'), identidad.get('id')
+                    ))
+
+                # executemany convierte el INSERT ... VALUES en una sola sentencia de varias filas;
+                # un lote reintentado tras un fallo no duplica filas gracias a id_registro
+                cursor.executemany("""
+                    INSERT INTO trazabilidad 
+                    (id_registro, usuario, rol, accion, fecha_hora, paciente_afectado, detalles_cambio, usuario_id) 
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE id_registro = id_registro
+                """, filas)
+                conn.commit()
+
+            print(f"✅ {len(lote)} acciones escritas en trazabilidad")
+            return True
+        except Exception as e:
+            print(f"⚠️ No se pudo escribir la trazabilidad (se reintentará): {str(e)}")
+            return False
+
+    @classmethod
+    def vaciar(cls, timeout=5):
+        """
+        Espera a que la cola se escriba por completo (p. ej. antes de cerrar sesión).
+        Lo que no alcance a escribirse sigue en el spool para la próxima sesión.
+        
+        Args:
+            timeout: Segundos máximos de espera
+            
+        Returns:
+            bool: True si no quedó nada pendiente
+        """
+        limite = time.monotonic() + timeout
+        with cls._condicion:
+            if cls._hilo is None or not cls._hay_sesion():
+                return not cls._pendiente()
+            cls._vaciando += 1
+            cls._condicion.notify_all()
+            try:
+                while cls._pendiente():
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        print(f"⚠️ Quedan {len(cls._cola) + cls._en_vuelo} acciones de trazabilidad en el spool")
+                        return False
+                    cls._condicion.wait(restante)
+                return True
+            finally:
+                cls._vaciando -= 1
+
+    @classmethod
+    def obtener_estadisticas(cls):
+        """
+        Retorna los contadores de la cola
+
+        Returns:
+            dict: profundidad actual y máxima, registros en vuelo, encolados, escritos,
+                  lotes, desbordados (solo en el spool), reintentos y líneas en el spool
+        """
+        with cls._condicion:
+            estadisticas = dict(cls._estadisticas)
+            estadisticas['profundidad'] = len(cls._cola)
+            estadisticas['en_vuelo'] = cls._en_vuelo
+        return estadisticas
+
+
+# Al salir de la aplicación sin cerrar sesión, intentar escribir lo pendiente (el resto queda en el spool)
+atexit.register(ColaTrazabilidad.vaciar, 2)
+
 
 class ModeloTrazabilidad:
     """Modelo para gestionar la trazabilidad de acciones en el sistema"""
     
+    # Columnas del índice FULLTEXT (parser ngram) ft_trazabilidad
+    COLUMNAS_TEXTO_COMPLETO = "t.usuario, t.paciente_afectado, t.detalles_cambio"
+    # Términos más cortos que el token del parser ngram (ngram_token_size) se buscan con LIKE
+    LONGITUD_MINIMA_NGRAM = 2
+    _indice_texto_completo = True
+    
     @staticmethod
     def conectar():
-        """Establece una conexión con la base de datos utilizando las credenciales actuales"""
+        """Obtiene una conexión del pool de la sesión (o de la unidad de trabajo activa)"""
+        unidad = UnidadTrabajo.actual()
+        if unidad is not None:
+            return unidad.prestar()
         credenciales = ModeloAutenticacion.obtener_credenciales()
-        return pymysql.connect(
+        return PoolConexiones.obtener(
             host=credenciales['equipo_trabajo'], 
             user=credenciales['usuario'], 
             password=credenciales['contrasena'], 
             database='sistema_visualizacion'
-        )    
+        )
     
     @classmethod
     def registrar_accion(cls, usuario=None, rol=None, accion=None, paciente_afectado=None, detalles_cambio=None):
         """
-        Registra una acción en la tabla de trazabilidad
+        Registra una acción en la tabla de trazabilidad.
+        La escritura es diferida: el registro se encola y ColaTrazabilidad lo guarda en
+        segundo plano (dentro de una unidad de trabajo, solo si la unidad se confirma).
         
         Args:
             usuario: Usuario que realizó la acción (si es None, se usa el usuario actual)
-            rol: Rol del usuario (si es None, se infiere del usuario)
+            rol: Rol del usuario (si es None, se infiere del usuario al escribir)
             accion: Descripción de la acción realizada
             paciente_afectado: Nombre del paciente afectado por la acción
             detalles_cambio: Detalles específicos del cambio realizado
             
         Returns:
-            bool: True si se registró correctamente, False en caso contrario
+            bool: True si se encoló correctamente, False en caso contrario
         """
         try:
             # Si no se proporciona un usuario, utilizar el usuario autenticado actual
@@ -1957,57 +3315,65 @@ class ModeloTrazabilidad:
             if not usuario:
                 print("No se pudo registrar trazabilidad: No hay usuario autenticado")
                 return False
-                
-            # Obtener el rol del usuario si no se proporcionó
-            if not rol:
-                rol = cls.obtener_rol_usuario(usuario)
-            # Conectar a la base de datos para buscar el ID del usuario
-            conn = cls.conectar()
-            cursor = conn.cursor()
             
-            # Consultar el ID del usuario
-            cursor.execute("SELECT id FROM usuarios WHERE username = %s", (usuario,))
-            resultado = cursor.fetchone()
-            usuario_id = resultado[0] if resultado else None
+            # La fecha es la del momento de la acción, no la de la escritura en lote
+            registro = {
+                'id_registro': uuid.uuid4().hex,
+                'usuario': usuario,
+                'rol': rol,
+                'accion': accion,
+                'fecha_hora': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'paciente_afectado': paciente_afectado,
+                'detalles_cambio': detalles_cambio
+            }
             
-            # Registrar la acción en la tabla de trazabilidad
-            sql = """
-                INSERT INTO trazabilidad 
-                (usuario, rol, accion, fecha_hora, paciente_afectado, detalles_cambio, usuario_id) 
-                VALUES (%s, %s, %s, NOW(), %s, %s, %s)
-            """
-            cursor.execute(sql, (usuario, rol, accion, paciente_afectado, detalles_cambio, usuario_id))
-            conn.commit()
-            conn.close()
+            unidad = UnidadTrabajo.actual()
+            if unidad is not None:
+                unidad.diferir_trazabilidad(registro)
+            else:
+                ColaTrazabilidad.encolar(registro)
             
-            print(f"✅ Acción registrada en trazabilidad: {usuario} ({rol}) - {accion}")
+            print(f"✅ Acción encolada en trazabilidad: {usuario} - {accion}")
             return True            
         except Exception as e:
             print(f"Error al registrar acción en trazabilidad: {str(e)}")
             return False
     
     @classmethod
-    def obtener_acciones(cls, search_terms=None, filtro_rol_usuario=None, limite=200, pagina=1):
+    def obtener_acciones(cls, search_terms=None, filtro_rol_usuario=None, limite=200, despues_de=None):
         """
-        Obtiene las acciones de trazabilidad filtradas según los parámetros
+        Obtiene las acciones de trazabilidad filtradas según los parámetros, de la más
+        reciente a la más antigua. La paginación es por cursor sobre (fecha_hora, id), de
+        modo que cada página cuesta lo mismo sin importar lo profunda que sea.
         
         Args:
             search_terms: Lista de términos de búsqueda (se aplican con AND)
             filtro_rol_usuario: Filtrar por rol de usuario (Administrador, Médico, etc.)
             limite: Límite de resultados a retornar
-            pagina: Número de página para paginación
+            despues_de: Cursor (fecha_hora, id) de la última fila de la página anterior;
+                        None para la primera página (ver cursor_siguiente)
             
         Returns:
-            list: Lista de acciones que cumplen los criterios
+            list: Lista de acciones que cumplen los criterios. Cada fila trae ya los datos
+                  del usuario unidos desde la tabla usuarios: [usuario, rol, accion, fecha_hora,
+                  paciente_afectado, detalles_cambio, usuario_id, nombre_completo, activo,
+                  rol_usuario, id]
         """
         try:
             conn = cls.conectar()
             cursor = conn.cursor()
             
-            # Construir la consulta base
+            # Construir la consulta base (nombre, estado y rol actual del usuario en el mismo JOIN)
             sql = """
                 SELECT t.usuario, t.rol, t.accion, t.fecha_hora, 
-                       t.paciente_afectado, t.detalles_cambio, t.usuario_id, u.nombre_completo
+                       t.paciente_afectado, t.detalles_cambio, t.usuario_id, u.nombre_completo,
+                       COALESCE(u.estado = 'activo', 0) AS activo,
+                       CASE 
+                           WHEN u.rol_admin = 1 THEN 'admin'
+                           WHEN u.rol_medico = 1 THEN 'medico'
+                           ELSE 'visitante'
+                       END AS rol_usuario,
+                       t.id
                 FROM trazabilidad t
                 LEFT JOIN usuarios u ON t.usuario = u.username
                 WHERE 1=1
@@ -2015,48 +3381,44 @@ class ModeloTrazabilidad:
             
             params = []
             
-            # Agregar condiciones de búsqueda por términos
+            # Agregar condiciones de búsqueda por términos (índice FULLTEXT; LIKE si no existe)
+            condiciones, params_busqueda = "", []
             if search_terms and len(search_terms) > 0:
-                # Crear condiciones para cada término de búsqueda
-                term_conditions = []
-                
-                for term in search_terms:
-                    term_condition = """
-                        (LOWER(t.usuario) LIKE %s 
-                        OR LOWER(u.nombre_completo) LIKE %s
-                        OR LOWER(t.paciente_afectado) LIKE %s
-                        OR LOWER(t.detalles_cambio) LIKE %s)
-                    """
-                    term_conditions.append(term_condition)
-                    texto_busqueda = f"%{term.lower()}%"
-                    params.extend([texto_busqueda, texto_busqueda, texto_busqueda, texto_busqueda])
-                
-                # Combinar todas las condiciones con AND para que se cumplan todos los términos
-                if term_conditions:
-                    sql += " AND " + " AND ".join(term_conditions)
+                condiciones, params_busqueda = cls._condiciones_busqueda(
+                    cursor, search_terms, texto_completo=cls._indice_texto_completo)
             
             # Agregar filtro por rol si está presente
+            filtros = ""
             if filtro_rol_usuario:
-                sql += """ 
-                    AND t.usuario IN (
-                        SELECT username FROM usuarios 
-                        WHERE CASE 
-                            WHEN %s = 'Administrador' THEN rol_admin = 1
-                            WHEN %s = 'Médico' THEN rol_medico = 1
-                            ELSE 0 END
-                    )
+                filtros += """ 
+                    AND CASE 
+                        WHEN %s = 'Administrador' THEN u.rol_admin = 1
+                        WHEN %s = 'Médico' THEN u.rol_medico = 1
+                        ELSE 0 END
                 """
                 params.extend([filtro_rol_usuario, filtro_rol_usuario])
             
-            # Calcular offset para paginación
-            offset = (pagina - 1) * limite
+            # Continuar justo después de la última fila ya entregada (índice idx_fecha_id)
+            if despues_de:
+                fecha_cursor, id_cursor = despues_de
+                filtros += " AND (t.fecha_hora < %s OR (t.fecha_hora = %s AND t.id < %s))"
+                params.extend([fecha_cursor, fecha_cursor, id_cursor])
             
-            # Ordenar por fecha descendente y establecer límite con paginación
-            sql += " ORDER BY t.fecha_hora DESC LIMIT %s OFFSET %s"
-            params.extend([limite, offset])
+            # Ordenar por fecha descendente (id como desempate) y establecer límite de la página
+            filtros += " ORDER BY t.fecha_hora DESC, t.id DESC LIMIT %s"
+            params.append(limite)
             
             # Ejecutar consulta
-            cursor.execute(sql, params)
+            try:
+                cursor.execute(sql + condiciones + filtros, params_busqueda + params)
+            except pymysql.err.MySQLError as e:
+                # 1191: el servidor no tiene el índice FULLTEXT; buscar con LIKE el resto de la sesión
+                if not (condiciones and e.args and e.args[0] == 1191):
+                    raise
+                print("⚠️ Sin índice FULLTEXT en trazabilidad: búsqueda con LIKE")
+                cls._indice_texto_completo = False
+                condiciones, params_busqueda = cls._condiciones_busqueda(cursor, search_terms, texto_completo=False)
+                cursor.execute(sql + condiciones + filtros, params_busqueda + params)
             resultados = cursor.fetchall()
             
             conn.close()
@@ -2070,6 +3432,87 @@ class ModeloTrazabilidad:
             print(f"Error al obtener acciones de trazabilidad: {str(e)}")
             return []
 
+    @classmethod
+    def _condiciones_busqueda(cls, cursor, search_terms, texto_completo=True):
+        """
+        Construye las condiciones de búsqueda por términos (se aplican con AND).
+        Los términos van en un solo MATCH ... AGAINST en modo booleano (+"término" por cada
+        uno), que el parser ngram resuelve como búsqueda de subcadena sobre el índice. El
+        nombre completo vive en la tabla usuarios (pequeña): los usuarios cuyo nombre
+        contiene algún término se resuelven antes, en una sola consulta para todos los
+        términos, y se agregan como alternativa a ese término. Equivale a LIKE solo si el
+        índice se creó sin stopwords (ver DB_Software.sql); TrazabilidadTest lo verifica.
+        
+        Args:
+            cursor: Cursor para resolver los nombres de usuario
+            search_terms: Lista de términos de búsqueda
+            texto_completo: False para usar LIKE (sin índice FULLTEXT)
+            
+        Returns:
+            tuple: (fragmento SQL que empieza con ' AND ', lista de parámetros)
+        """
+        sql = ""
+        params = []
+        terminos_indice = []
+        
+        terminos = [term.lower().replace('"', '').strip() for term in search_terms]
+        terminos = [term for term in terminos if term]
+        
+        # Usuarios cuyo nombre completo contiene cada término, todos en una sola consulta
+        usuarios_por_termino = {}
+        if terminos:
+            cursor.execute(
+                " UNION ALL ".join(["SELECT %s, username FROM usuarios WHERE nombre_completo LIKE %s"] * len(terminos)),
+                [valor for posicion, term in enumerate(terminos) for valor in (posicion, f"%{term}%")]
+            )
+            for posicion, username in cursor.fetchall():
+                usuarios_por_termino.setdefault(int(posicion), []).append(username)
+        
+        for posicion, term in enumerate(terminos):
+            texto_busqueda = f"%{term}%"
+            usuarios_nombre = usuarios_por_termino.get(posicion, [])
+            por_nombre = ""
+            if usuarios_nombre:
+                por_nombre = f" OR t.usuario IN ({', '.join(['%s'] * len(usuarios_nombre))})"
+            
+            if texto_completo and len(term) >= cls.LONGITUD_MINIMA_NGRAM:
+                if not usuarios_nombre:
+                    # Todos los términos sin alternativa comparten un único MATCH
+                    terminos_indice.append(f'+"{term}"')
+                    continue
+                sql += (f" AND (MATCH({cls.COLUMNAS_TEXTO_COMPLETO}) AGAINST (%s IN BOOLEAN MODE)"
+                        f"{por_nombre})")
+                params.append(f'"{term}"')
+            else:
+                sql += f"""
+                    AND (LOWER(t.usuario) LIKE %s 
+                    OR LOWER(t.paciente_afectado) LIKE %s
+                    OR LOWER(t.detalles_cambio) LIKE %s{por_nombre})
+                """
+                params.extend([texto_busqueda, texto_busqueda, texto_busqueda])
+            params.extend(usuarios_nombre)
+        
+        if terminos_indice:
+            sql = f" AND MATCH({cls.COLUMNAS_TEXTO_COMPLETO}) AGAINST (%s IN BOOLEAN MODE)" + sql
+            params.insert(0, ' '.join(terminos_indice))
+        
+        return sql, params
+
+    @staticmethod
+    def cursor_siguiente(acciones):
+        """
+        Cursor de paginación para pedir la página que sigue a las acciones dadas
+        
+        Args:
+            acciones: Página devuelta por obtener_acciones
+            
+        Returns:
+            tuple: (fecha_hora, id) de la última acción, o None si la página está vacía
+        """
+        if not acciones:
+            return None
+        return (acciones[-1][3], acciones[-1][10])
+
     @classmethod
     def obtener_rol_usuario(cls, username):
         """Obtiene el rol de un usuario desde la base de datos"""
@@ -2092,6 +3535,11 @@ class ModeloTrazabilidad:
         Returns:
             bool: True si se calcularon y guardaron correctamente, False en caso contrario
         """
+        # Dentro de una unidad de trabajo el cálculo se hace una sola vez antes del commit
+        unidad = UnidadTrabajo.actual()
+        if unidad is not None and unidad.diferir_metricas(paciente_id):
+            return True
+        
         conn = None
         try:
             conn = cls.conectar()
@@ -2256,6 +3704,10 @@ class ModeloTrazabilidad:
                     
                     cursor.execute(insert_query, valores)
                 
+                # Llevar el nuevo aporte del paciente al rollup histórico en la misma transacción
+                from Back_end.ModeloMetricas import ModeloMetricas
+                ModeloMetricas.actualizar_rollup_paciente(cursor, paciente_id)
+                
                 conn.commit()
                 print(f"Métricas actualizadas/guardadas para paciente {paciente_id}")
                 return True
@@ -1,7 +1,344 @@
 import pymysql
+import time
+import warnings
 from datetime import datetime, timedelta
 import numpy as np
-from Back_end.Manejo_DB import ModeloPaciente, ModeloAutenticacion
+from Back_end.Manejo_DB import ModeloPaciente, ModeloAutenticacion, PoolConexiones
+
+class SketchCuantiles:
+    """
+    Sketch de cuantiles por cubetas logarítmicas (estilo DDSketch) para los tiempos del rollup.
+    
+    Cada valor en minutos cae en una cubeta entera: 0 para el cero, +(i+1) para los positivos y
+    -(i+1) para los negativos, con i = ceil(log_GAMMA(|v|)). Un sketch es solo un conteo por cubeta,
+    así que fusionar sketches de varias horas, áreas o clases es sumar conteos (SUM ... GROUP BY cubeta)
+    y retirar un valor es restar uno; a diferencia de t-digest o KLL, esto permite descontar el aporte
+    anterior de un paciente cuando cambian sus tiempos.
+    
+    Cota de error: con ALFA = 0.01 (GAMMA = 1.01 / 0.99) el valor que representa cada cubeta está a menos
+    de 1 % relativo de cualquier valor que contenga, y en las cubetas que contienen un solo minuto entero
+    (valores por debajo de ~50 minutos) es exacto. Como los cuantiles interpolan linealmente entre los dos
+    valores vecinos del rango q·(n-1), igual que np.percentile, la mediana y el p90 quedan a menos de 1 %
+    relativo del valor exacto cuando esos dos vecinos tienen el mismo signo. Conteos y promedios no se
+    aproximan: salen de las sumas exactas del rollup.
+    """
+    
+    ALFA = 0.01
+    GAMMA = (1 + ALFA) / (1 - ALFA)
+    
+    @classmethod
+    def cubetas(cls, valores):
+        """
+        Cubeta de cada valor (en minutos enteros).
+        
+        Args:
+            valores (np.ndarray): Valores sin NaN
+            
+        Returns:
+            np.ndarray: Índices enteros de cubeta
+        """
+        valores = np.asarray(valores, dtype=float)
+        magnitud = np.abs(valores)
+        indices = np.zeros(valores.shape, dtype=int)
+        distinto_de_cero = magnitud > 0
+        indices[distinto_de_cero] = np.ceil(
+            np.log(magnitud[distinto_de_cero]) / np.log(cls.GAMMA)
+        ).astype(int) + 1
+        return np.where(valores < 0, -indices, indices)
+    
+    @classmethod
+    def valores_representativos(cls, cubetas):
+        """Valor que representa cada cubeta (exacto si la cubeta solo contiene un minuto entero)"""
+        cubetas = np.asarray(cubetas, dtype=int)
+        i = np.abs(cubetas) - 1
+        superior = cls.GAMMA ** i
+        inferior = cls.GAMMA ** (i - 1)
+        valores = 2 * superior / (cls.GAMMA + 1)
+        
+        # Los tiempos son minutos enteros: si la cubeta (inferior, superior] contiene un único entero, ese es el valor
+        unico_entero = (np.floor(superior + 1e-9) - np.floor(inferior + 1e-9)) == 1
+        valores = np.where(unico_entero, np.floor(superior + 1e-9), valores)
+        
+        valores = np.where(cubetas < 0, -valores, valores)
+        return np.where(cubetas == 0, 0.0, valores)
+    
+    @classmethod
+    def cuantiles(cls, conteos, percentiles):
+        """
+        Estima percentiles a partir de un sketch fusionado.
+        
+        Args:
+            conteos (dict): {cubeta: cantidad de valores}
+            percentiles (list): Percentiles a estimar (0-100)
+            
+        Returns:
+            list: Un valor por percentil (None si el sketch está vacío)
+        """
+        cubetas = np.array(sorted(c for c, n in conteos.items() if n > 0), dtype=int)
+        if cubetas.size == 0:
+            return [None] * len(percentiles)
+        
+        cantidades = np.array([conteos[c] for c in cubetas], dtype=float)
+        acumulado = np.cumsum(cantidades)
+        representativos = cls.valores_representativos(cubetas)
+        
+        # Misma interpolación lineal entre rangos vecinos que np.percentile
+        posiciones = np.asarray(percentiles, dtype=float) / 100 * (acumulado[-1] - 1)
+        bajo = np.floor(posiciones)
+        alto = np.ceil(posiciones)
+        valor_bajo = representativos[np.searchsorted(acumulado, bajo, side='right')]
+        valor_alto = representativos[np.searchsorted(acumulado, alto, side='right')]
+        return [float(v) for v in valor_bajo + (posiciones - bajo) * (valor_alto - valor_bajo)]
+
+
+class CohorteMetricas:
+    """
+    Cohorte de pacientes cargada en columnas NumPy para calcular métricas con operaciones vectorizadas.
+    
+    Los estados y el área se guardan como arreglos de objetos y los timestamps como datetime64[s]
+    (NaT donde la base devuelve NULL), de modo que las duraciones de todas las etapas, sus
+    estadísticas por grupo y las máscaras de cumplimiento de SLA se obtienen sin recorrer filas en Python.
+    """
+    
+    COLUMNAS_ESTADO = ('id', 'area', 'triage', 'ci', 'labs', 'ix', 'inter', 'rv', 'conducta')
+    
+    COLUMNAS_TIEMPO = (
+        'ingreso', 'triage_timestamp',
+        'ci_no_realizado_timestamp', 'ci_realizado_timestamp',
+        'labs_no_realizado_timestamp', 'labs_solicitados_timestamp', 'labs_completos_timestamp',
+        'ix_no_realizado_timestamp', 'ix_solicitados_timestamp', 'ix_completos_timestamp',
+        'inter_no_abierta_timestamp', 'inter_abierta_timestamp', 'inter_realizada_timestamp',
+        'rv_no_realizado_timestamp', 'rv_realizado_timestamp',
+        'alta_timestamp', 'observacion_timestamp'
+    )
+    
+    # Series de métricas en el orden en que se arman la matriz y el rollup
+    SERIES = (
+        'triage', 'ci',
+        'labs_solicitud', 'labs_resultados', 'labs_total',
+        'ix_solicitud', 'ix_resultados', 'ix_total',
+        'inter_apertura', 'inter_realizacion', 'inter_total',
+        'rv',
+        'total', 'total_alta', 'total_observacion', 'total_hospitalizacion'
+    )
+    
+    # Series de duración: (clave, timestamp inicial, timestamp final)
+    ETAPAS = (
+        ('triage', 'ingreso', 'triage_timestamp'),
+        ('ci', 'ci_no_realizado_timestamp', 'ci_realizado_timestamp'),
+        ('labs_solicitud', 'labs_no_realizado_timestamp', 'labs_solicitados_timestamp'),
+        ('labs_resultados', 'labs_solicitados_timestamp', 'labs_completos_timestamp'),
+        ('labs_total', 'labs_no_realizado_timestamp', 'labs_completos_timestamp'),
+        ('ix_solicitud', 'ix_no_realizado_timestamp', 'ix_solicitados_timestamp'),
+        ('ix_resultados', 'ix_solicitados_timestamp', 'ix_completos_timestamp'),
+        ('ix_total', 'ix_no_realizado_timestamp', 'ix_completos_timestamp'),
+        ('inter_apertura', 'inter_no_abierta_timestamp', 'inter_abierta_timestamp'),
+        ('inter_realizacion', 'inter_abierta_timestamp', 'inter_realizada_timestamp'),
+        ('inter_total', 'inter_no_abierta_timestamp', 'inter_realizada_timestamp'),
+        ('rv', 'rv_no_realizado_timestamp', 'rv_realizado_timestamp'),
+    )
+    
+    def __init__(self, filas=()):
+        filas = list(filas)
+        n_estados = len(self.COLUMNAS_ESTADO)
+        self.n = len(filas)
+        
+        estados = np.empty((self.n, n_estados), dtype=object)
+        if self.n:
+            estados[:] = [fila[:n_estados] for fila in filas]
+        self.estados = {col: estados[:, i] for i, col in enumerate(self.COLUMNAS_ESTADO)}
+        
+        self.tiempos = {
+            col: np.array([fila[n_estados + i] for fila in filas], dtype='datetime64[s]')
+            for i, col in enumerate(self.COLUMNAS_TIEMPO)
+        }
+        
+        self._duraciones = None
+    
+    @classmethod
+    def consulta(cls):
+        """Devuelve el SELECT (sin WHERE) que produce las filas que espera el constructor"""
+        return f"SELECT {', '.join(cls.COLUMNAS_ESTADO + cls.COLUMNAS_TIEMPO)} FROM pacientes"
+    
+    def minutos_entre(self, inicio, fin):
+        """
+        Minutos completos entre dos columnas de timestamps (misma semántica que TIMESTAMPDIFF(MINUTE, ...)).
+        
+        Returns:
+            np.ndarray: Duraciones en minutos; NaN donde falta alguno de los dos timestamps
+        """
+        if isinstance(inicio, str):
+            inicio = self.tiempos[inicio]
+        if isinstance(fin, str):
+            fin = self.tiempos[fin]
+        segundos = (fin - inicio).astype('timedelta64[s]').astype(float)
+        segundos[np.isnat(inicio) | np.isnat(fin)] = np.nan
+        return np.trunc(segundos / 60) + 0.0
+    
+    def duraciones(self):
+        """Calcula (una sola vez) las duraciones de todas las etapas, incluido el tiempo total de atención"""
+        if self._duraciones is None:
+            duraciones = {clave: self.minutos_entre(inicio, fin) for clave, inicio, fin in self.ETAPAS}
+            
+            # Tiempo total: hasta el timestamp de cierre más reciente (alta, observación o RV)
+            cierre = np.fmax(np.fmax(self.tiempos['alta_timestamp'], self.tiempos['observacion_timestamp']),
+                             self.tiempos['rv_realizado_timestamp'])
+            duraciones['total'] = self.minutos_entre('ingreso', cierre)
+            self._duraciones = duraciones
+        return self._duraciones
+    
+    def mascaras(self):
+        """
+        Devuelve, por serie, qué pacientes cuentan para ella.
+        
+        Cada máscara reproduce el filtro de estado de la consulta individual que reemplaza
+        (p. ej. solo labs con 'Resultados completos' para el tiempo de resultados).
+        """
+        e = self.estados
+        t = self.tiempos
+        d = self.duraciones()
+        
+        labs_solicitados = np.isin(e['labs'], ['En espera de resultados', 'Resultados completos'])
+        ix_solicitados = np.isin(e['ix'], ['En espera de resultados', 'Resultados completos'])
+        inter_realizada = (e['inter'] == 'Realizada') & ~np.isnan(d['inter_apertura']) & ~np.isnan(d['inter_realizacion'])
+        
+        con_cierre = (
+            ((e['conducta'] == 'De Alta') & ~np.isnat(t['alta_timestamp'])) |
+            ~np.isnat(t['ci_realizado_timestamp']) |
+            ~np.isnat(t['labs_completos_timestamp']) |
+            ~np.isnat(t['ix_completos_timestamp']) |
+            ~np.isnat(t['inter_realizada_timestamp']) |
+            ~np.isnat(t['rv_realizado_timestamp'])
+        )
+        con_total = con_cierre & (np.nan_to_num(d['total'], nan=0) > 0)
+        
+        return {
+            'triage': np.isin(e['triage'], ModeloMetricas.CLASES_TRIAGE),
+            'ci': e['ci'] == 'Realizado',
+            'labs_solicitud': labs_solicitados,
+            'labs_resultados': e['labs'] == 'Resultados completos',
+            'labs_total': e['labs'] == 'Resultados completos',
+            'ix_solicitud': ix_solicitados,
+            'ix_resultados': e['ix'] == 'Resultados completos',
+            'ix_total': e['ix'] == 'Resultados completos',
+            'inter_apertura': inter_realizada,
+            'inter_realizacion': inter_realizada,
+            'inter_total': inter_realizada,
+            'rv': e['rv'] == 'Realizado',
+            'total': con_total,
+            'total_alta': con_total & (e['conducta'] == 'De Alta'),
+            'total_observacion': con_total & (e['conducta'] == 'Observación'),
+            'total_hospitalizacion': con_total & (e['conducta'] == 'Hospitalización'),
+        }
+    
+    def matriz_series(self, seleccion=None):
+        """
+        Arma la matriz (pacientes x series) con NaN donde el paciente no cuenta para la serie.
+        
+        Args:
+            seleccion (np.ndarray, opcional): Máscara booleana de pacientes a incluir
+            
+        Returns:
+            tuple: (claves, matriz)
+        """
+        duraciones = self.duraciones()
+        mascaras = self.mascaras()
+        claves = list(self.SERIES)
+        
+        matriz = np.full((self.n, len(claves)), np.nan)
+        for j, clave in enumerate(claves):
+            base = 'total' if clave.startswith('total') else clave
+            matriz[:, j] = np.where(mascaras[clave], duraciones[base], np.nan)
+        
+        if seleccion is not None:
+            matriz = matriz[seleccion]
+        return claves, matriz
+    
+    def poblaciones_sla(self):
+        """
+        Devuelve, por etapa con SLA, la duración evaluada y qué pacientes cuentan para ella.
+        
+        Returns:
+            dict: {etapa: (duraciones, mascara)}
+        """
+        e = self.estados
+        d = self.duraciones()
+        return {
+            'triage': (d['triage'], np.isin(e['triage'], ModeloMetricas.CLASES_TRIAGE)),
+            'ci': (d['ci'], e['ci'] == 'Realizado'),
+            'labs': (d['labs_resultados'], e['labs'] == 'Resultados completos'),
+            'ix': (d['ix_resultados'], e['ix'] == 'Resultados completos'),
+            'inter': (d['inter_realizacion'], e['inter'] == 'Realizada'),
+            'rv': (d['rv'], e['rv'] == 'Realizado'),
+        }
+    
+    def limites_sla(self, objetivos, por_defecto):
+        """Tiempo objetivo de cada paciente según su clase de triage"""
+        limites = np.full(self.n, float(por_defecto))
+        for clase, minutos in objetivos.items():
+            limites[self.estados['triage'] == clase] = minutos
+        return limites
+    
+    def cumplimiento_sla(self, slas, por_defecto):
+        """
+        Porcentaje de pacientes que cumplen el tiempo objetivo de cada etapa según su clase de triage.
+        
+        Args:
+            slas (dict): {etapa: {clase_triage: minutos}}
+            por_defecto (dict): {etapa: minutos} para clases sin objetivo definido
+            
+        Returns:
+            dict: {etapa: porcentaje entero}
+        """
+        resultados = {}
+        for etapa, (duracion, mascara) in self.poblaciones_sla().items():
+            mascara = mascara & ~np.isnan(duracion)
+            total = int(np.count_nonzero(mascara))
+            if total == 0:
+                resultados[etapa] = 0
+                continue
+            
+            limites = self.limites_sla(slas[etapa], por_defecto[etapa])
+            cumplidos = int(np.count_nonzero(mascara & (duracion <= limites)))
+            resultados[etapa] = round((cumplidos / total) * 100)
+        return resultados
+    
+    def aportes_rollup(self, slas, por_defecto):
+        """
+        Calcula lo que aporta cada paciente a cada serie del rollup histórico.
+        
+        Además de las series de matriz_series, se guardan la estancia (ingreso -> alta) que usa
+        la línea temporal y las poblaciones de SLA ('sla_<etapa>') con su marca de cumplimiento.
+        La cubeta es la del SketchCuantiles en que cae el valor.
+        
+        Returns:
+            list: Tuplas (paciente_id, serie, hora, area, clase_triage, minutos, cumple_sla, cubeta)
+        """
+        ingreso = self.tiempos['ingreso']
+        con_ingreso = ~np.isnat(ingreso)
+        horas = ingreso.astype('datetime64[h]').astype('datetime64[s]').astype(object)
+        clases = np.where(np.isin(self.estados['triage'], ModeloMetricas.CLASES_TRIAGE), self.estados['triage'], '')
+        areas = np.array([area or '' for area in self.estados['area']], dtype=object)
+        ids = self.estados['id']
+        
+        claves, matriz = self.matriz_series()
+        series = [(clave, matriz[:, j], None) for j, clave in enumerate(claves)]
+        series.append(('estancia', self.minutos_entre('ingreso', 'alta_timestamp'), None))
+        for etapa, (duracion, mascara) in self.poblaciones_sla().items():
+            valores = np.where(mascara, duracion, np.nan)
+            series.append((f"sla_{etapa}", valores, valores <= self.limites_sla(slas[etapa], por_defecto[etapa])))
+        
+        aportes = []
+        for serie, valores, cumple in series:
+            indices = np.nonzero(con_ingreso & ~np.isnan(valores))[0]
+            cubetas = SketchCuantiles.cubetas(valores[indices])
+            for i, cubeta in zip(indices, cubetas):
+                aportes.append((
+                    int(ids[i]), serie, horas[i], areas[i], str(clases[i]),
+                    int(valores[i]), int(bool(cumple[i])) if cumple is not None else 0, int(cubeta)
+                ))
+        return aportes
+
 
 class ModeloMetricas:
     """
@@ -9,16 +346,41 @@ class ModeloMetricas:
     transiciones de estado en la atención de pacientes.
     """
     
+    CLASES_TRIAGE = ['1', '2', '3', '4', '5']
+    
+    # SLAs objetivo (en minutos) para cada etapa y clase de triage
+    SLAS = {
+        # Formato: {clase_triage: tiempo_objetivo_en_minutos}
+        'triage': {'1': 0, '2': 30, '3': 120, '4': 30, '5': 60},
+        'ci': {'1': 210, '2': 210, '3': 360, '4': 420, '5': 420},
+        'labs': {'1': 360, '2': 360, '3': 360, '4': 360, '5': 360},
+        'ix': {'1': 360, '2': 360, '3': 360, '4': 360, '5': 360},
+        'inter': {'1': 30, '2': 45, '3': 60, '4': 120, '5': 180},
+        'rv': {'1': 30, '2': 60, '3': 120, '4': 240, '5': 360}
+    }
+    
+    # Objetivo para clases de triage sin SLA definido
+    SLA_POR_DEFECTO = {'triage': 30, 'ci': 60, 'labs': 90, 'ix': 90, 'inter': 60, 'rv': 120}
+    
+    # Segundos que se reutiliza una cohorte cargada con los mismos filtros
+    COHORTE_TTL_SEGUNDOS = 10
+    
+    # {filtros: (version_escrituras, instante_de_carga, CohorteMetricas)}
+    _cohortes = {}
+    
+    # Si ya se comprobó en esta sesión que el rollup histórico está poblado
+    _rollup_verificado = False
+    
     @classmethod
     def conectar(cls):
-        """Establece conexión a la base de datos usando credenciales directas"""
+        """Obtiene una conexión del pool de la sesión usando las credenciales actuales"""
         try:
             from Back_end.Manejo_DB import ModeloAutenticacion
             from Back_end.Manejo_DB import ModeloConfiguracion
             
             host_config = ModeloConfiguracion.cargar_configuracion()
             credenciales = ModeloAutenticacion.obtener_credenciales()
-            return pymysql.connect(
+            return PoolConexiones.obtener(
                     host=host_config,
                     user=credenciales['usuario'],
                     password=credenciales['contrasena'],
@@ -68,7 +430,7 @@ class ModeloMetricas:
         Calcula las métricas de tiempo desde ingreso hasta triage.
         
         Args:
-            area (str, opcional): Área para filtrar los datos
+            area (str | list, opcional): Área o lista de áreas para filtrar los datos
             fecha_inicio (str, opcional): Fecha de inicio del rango (formato: 'YYYY-MM-DD HH:MM:SS')
             fecha_fin (str, opcional): Fecha de fin del rango (formato: 'YYYY-MM-DD HH:MM:SS')
             clase_triage (str, opcional): Clase de triage para filtrar (1-5)
@@ -76,68 +438,7 @@ class ModeloMetricas:
         Returns:
             dict: Diccionario con estadísticas de tiempo de triage
         """
-        try:
-            conn = cls.conectar()
-            cursor = conn.cursor()
-            
-            # Construir condiciones del WHERE
-            condiciones = []
-            params = []
-            
-            # Solo considerar pacientes con triage realizado y timestamp de triage
-            condiciones.append("triage IN ('1', '2', '3', '4', '5') AND triage_timestamp IS NOT NULL")
-            
-            if area:
-                condiciones.append("ubicacion LIKE %s")
-                params.append(f"%{area}%")
-            
-            if clase_triage:
-                condiciones.append("triage = %s")
-                params.append(clase_triage)
-            
-            if fecha_inicio:
-                condiciones.append("ingreso >= %s")
-                params.append(fecha_inicio)
-                
-            if fecha_fin:
-                condiciones.append("ingreso <= %s")
-                params.append(fecha_fin)
-            
-            # Construir la consulta
-            query = """
-                SELECT 
-                    TIMESTAMPDIFF(MINUTE, ingreso, triage_timestamp) as tiempo_triage
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones)
-            
-            # Ejecutar consulta
-            cursor.execute(query, params)
-            resultados = cursor.fetchall()
-            
-            # Extraer tiempos
-            tiempos = [resultado[0] for resultado in resultados if resultado[0] is not None]
-            
-            # Calcular estadísticas
-            estadisticas = cls.calcular_estadisticas(tiempos)
-            
-            conn.close()
-            return {
-                'total_pacientes': len(tiempos),
-                'estadisticas': estadisticas
-            }
-            
-        except Exception as e:
-            print(f"Error al obtener métricas de triage: {str(e)}")
-            return {
-                'total_pacientes': 0,
-                'estadisticas': {
-                    'promedio': None,
-                    'mediana': None,
-                    'p90': None
-                }
-            }
+        return cls.obtener_todas_metricas(area, fecha_inicio, fecha_fin, clase_triage)['triage']
     
     @classmethod
     def obtener_metricas_consulta_ingreso(cls, area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
@@ -145,7 +446,7 @@ class ModeloMetricas:
         Calcula las métricas de tiempo desde CI no realizado hasta CI realizado.
         
         Args:
-            area (str, opcional): Área para filtrar los datos
+            area (str | list, opcional): Área o lista de áreas para filtrar los datos
             fecha_inicio (str, opcional): Fecha de inicio del rango
             fecha_fin (str, opcional): Fecha de fin del rango
             clase_triage (str, opcional): Clase de triage para filtrar (1-5)
@@ -153,69 +454,7 @@ class ModeloMetricas:
         Returns:
             dict: Diccionario con estadísticas de tiempo de consulta de ingreso
         """
-        try:
-            conn = cls.conectar()
-            cursor = conn.cursor()
-            
-            # Construir condiciones del WHERE
-            condiciones = []
-            params = []
-            
-            # Solo considerar pacientes con CI realizado y timestamps correspondientes
-            condiciones.append("ci = 'Realizado' AND ci_no_realizado_timestamp IS NOT NULL AND ci_realizado_timestamp IS NOT NULL")
-            
-            if area:
-                condiciones.append("ubicacion LIKE %s")
-                params.append(f"%{area}%")
-            
-            if clase_triage:
-                condiciones.append("triage = %s")
-                params.append(clase_triage)
-            
-            if fecha_inicio:
-                condiciones.append("ingreso >= %s")
-                params.append(fecha_inicio)
-                
-            if fecha_fin:
-                condiciones.append("ingreso <= %s")
-                params.append(fecha_fin)
-            
-            # Construir la consulta
-            query = """
-                SELECT 
-                    TIMESTAMPDIFF(MINUTE, ci_no_realizado_timestamp, ci_realizado_timestamp) as tiempo_ci
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones)
-            
-            # Ejecutar consulta
-            cursor.execute(query, params)
-            resultados = cursor.fetchall()
-            
-            # Extraer tiempos
-            tiempos = [resultado[0] for resultado in resultados if resultado[0] is not None]
-            
-            # Calcular estadísticas
-            estadisticas = cls.calcular_estadisticas(tiempos)
-            
-            conn.close()
-            return {
-                'total_pacientes': len(tiempos),
-                'estadisticas': estadisticas
-            }
-            
-        except Exception as e:
-            print(f"Error al obtener métricas de consulta de ingreso: {str(e)}")
-            return {
-                'total_pacientes': 0,
-                'estadisticas': {
-                    'promedio': None,
-                    'mediana': None,
-                    'p90': None
-                }
-            }
-            
+        return cls.obtener_todas_metricas(area, fecha_inicio, fecha_fin, clase_triage)['consulta_ingreso']
 
     @classmethod
     def obtener_metricas_laboratorios(cls, area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
@@ -226,7 +465,7 @@ class ModeloMetricas:
         - Tiempo total desde "No realizado" hasta "Resultados completos"
         
         Args:
-            area (str, opcional): Área para filtrar los datos
+            area (str | list, opcional): Área o lista de áreas para filtrar los datos
             fecha_inicio (str, opcional): Fecha de inicio del rango
             fecha_fin (str, opcional): Fecha de fin del rango
             clase_triage (str, opcional): Clase de triage para filtrar (1-5)
@@ -234,115 +473,7 @@ class ModeloMetricas:
         Returns:
             dict: Diccionario con estadísticas de tiempo de procesamiento de laboratorios
         """
-        try:
-            conn = cls.conectar()
-            cursor = conn.cursor()
-            
-            # Base conditions for filtering
-            condiciones_base = []
-            params_base = []
-            
-            if area:
-                condiciones_base.append("ubicacion LIKE %s")
-                params_base.append(f"%{area}%")
-            
-            if clase_triage:
-                condiciones_base.append("triage = %s")
-                params_base.append(clase_triage)
-            
-            if fecha_inicio:
-                condiciones_base.append("ingreso >= %s")
-                params_base.append(fecha_inicio)
-                
-            if fecha_fin:
-                condiciones_base.append("ingreso <= %s")
-                params_base.append(fecha_fin)
-            
-            # Resultados para diferentes transiciones
-            resultados = {}
-            
-            # 1. Métricas para "No realizado" a "En espera de resultados"
-            condiciones_solicitud = condiciones_base.copy()
-            params_solicitud = params_base.copy()
-            condiciones_solicitud.append(
-                "labs IN ('En espera de resultados', 'Resultados completos') AND labs_no_realizado_timestamp IS NOT NULL AND labs_solicitados_timestamp IS NOT NULL"
-            )
-            
-            query_solicitud = """
-                SELECT 
-                    TIMESTAMPDIFF(MINUTE, labs_no_realizado_timestamp, labs_solicitados_timestamp) as tiempo_solicitud
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones_solicitud)
-            
-            cursor.execute(query_solicitud, params_solicitud)
-            resultados_solicitud = cursor.fetchall()
-            tiempos_solicitud = [r[0] for r in resultados_solicitud if r[0] is not None]
-            
-            # 2. Métricas para "En espera de resultados" a "Resultados completos"
-            condiciones_resultados = condiciones_base.copy()
-            params_resultados = params_base.copy()
-            condiciones_resultados.append(
-                "labs = 'Resultados completos' AND labs_solicitados_timestamp IS NOT NULL AND labs_completos_timestamp IS NOT NULL"
-            )
-            
-            query_resultados = """
-                SELECT 
-                    TIMESTAMPDIFF(MINUTE, labs_solicitados_timestamp, labs_completos_timestamp) as tiempo_resultados
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones_resultados)
-            
-            cursor.execute(query_resultados, params_resultados)
-            resultados_resultados = cursor.fetchall()
-            tiempos_resultados = [r[0] for r in resultados_resultados if r[0] is not None]
-            
-            # 3. Métricas para tiempo total
-            condiciones_total = condiciones_base.copy()
-            params_total = params_base.copy()
-            condiciones_total.append(
-                "labs = 'Resultados completos' AND labs_no_realizado_timestamp IS NOT NULL AND labs_completos_timestamp IS NOT NULL"
-            )
-            
-            query_total = """
-                SELECT 
-                    TIMESTAMPDIFF(MINUTE, labs_no_realizado_timestamp, labs_completos_timestamp) as tiempo_total
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones_total)
-            
-            cursor.execute(query_total, params_total)
-            resultados_total = cursor.fetchall()
-            tiempos_total = [r[0] for r in resultados_total if r[0] is not None]
-            
-            # Calcular estadísticas para cada conjunto
-            estadisticas_solicitud = cls.calcular_estadisticas(tiempos_solicitud)
-            estadisticas_resultados = cls.calcular_estadisticas(tiempos_resultados)
-            estadisticas_total = cls.calcular_estadisticas(tiempos_total)
-            
-            conn.close()
-            return {
-                'total_pacientes_solicitud': len(tiempos_solicitud),
-                'estadisticas_solicitud': estadisticas_solicitud,
-                'total_pacientes_resultados': len(tiempos_resultados),
-                'estadisticas_resultados': estadisticas_resultados,
-                'total_pacientes_total': len(tiempos_total),
-                'estadisticas_total': estadisticas_total
-            }
-            
-        except Exception as e:
-            print(f"Error al obtener métricas de laboratorios: {str(e)}")
-            return {
-                'total_pacientes_solicitud': 0,
-                'estadisticas_solicitud': {'promedio': None, 'mediana': None, 'p90': None},
-                'total_pacientes_resultados': 0,
-                'estadisticas_resultados': {'promedio': None, 'mediana': None, 'p90': None},
-                'total_pacientes_total': 0,
-                'estadisticas_total': {'promedio': None, 'mediana': None, 'p90': None}
-            }
+        return cls.obtener_todas_metricas(area, fecha_inicio, fecha_fin, clase_triage)['laboratorios']
 
     @classmethod
     def obtener_metricas_imagenes(cls, area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
@@ -353,7 +484,7 @@ class ModeloMetricas:
         - Tiempo total desde "No realizado" hasta "Resultados completos"
         
         Args:
-            area (str, opcional): Área para filtrar los datos
+            area (str | list, opcional): Área o lista de áreas para filtrar los datos
             fecha_inicio (str, opcional): Fecha de inicio del rango
             fecha_fin (str, opcional): Fecha de fin del rango
             clase_triage (str, opcional): Clase de triage para filtrar (1-5)
@@ -361,115 +492,7 @@ class ModeloMetricas:
         Returns:
             dict: Diccionario con estadísticas de tiempo de procesamiento de imágenes
         """
-        try:
-            conn = cls.conectar()
-            cursor = conn.cursor()
-            
-            # Base conditions for filtering
-            condiciones_base = []
-            params_base = []
-            
-            if area:
-                condiciones_base.append("ubicacion LIKE %s")
-                params_base.append(f"%{area}%")
-            
-            if clase_triage:
-                condiciones_base.append("triage = %s")
-                params_base.append(clase_triage)
-            
-            if fecha_inicio:
-                condiciones_base.append("ingreso >= %s")
-                params_base.append(fecha_inicio)
-                
-            if fecha_fin:
-                condiciones_base.append("ingreso <= %s")
-                params_base.append(fecha_fin)
-            
-            # Resultados para diferentes transiciones
-            resultados = {}
-            
-            # 1. Métricas para "No realizado" a "En espera de resultados"
-            condiciones_solicitud = condiciones_base.copy()
-            params_solicitud = params_base.copy()
-            condiciones_solicitud.append(
-                "ix IN ('En espera de resultados', 'Resultados completos') AND ix_no_realizado_timestamp IS NOT NULL AND ix_solicitados_timestamp IS NOT NULL"
-            )
-            
-            query_solicitud = """
-                SELECT 
-                    TIMESTAMPDIFF(MINUTE, ix_no_realizado_timestamp, ix_solicitados_timestamp) as tiempo_solicitud
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones_solicitud)
-            
-            cursor.execute(query_solicitud, params_solicitud)
-            resultados_solicitud = cursor.fetchall()
-            tiempos_solicitud = [r[0] for r in resultados_solicitud if r[0] is not None]
-            
-            # 2. Métricas para "En espera de resultados" a "Resultados completos"
-            condiciones_resultados = condiciones_base.copy()
-            params_resultados = params_base.copy()
-            condiciones_resultados.append(
-                "ix = 'Resultados completos' AND ix_solicitados_timestamp IS NOT NULL AND ix_completos_timestamp IS NOT NULL"
-            )
-            
-            query_resultados = """
-                SELECT 
-                    TIMESTAMPDIFF(MINUTE, ix_solicitados_timestamp, ix_completos_timestamp) as tiempo_resultados
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones_resultados)
-            
-            cursor.execute(query_resultados, params_resultados)
-            resultados_resultados = cursor.fetchall()
-            tiempos_resultados = [r[0] for r in resultados_resultados if r[0] is not None]
-            
-            # 3. Métricas para tiempo total
-            condiciones_total = condiciones_base.copy()
-            params_total = params_base.copy()
-            condiciones_total.append(
-                "ix = 'Resultados completos' AND ix_no_realizado_timestamp IS NOT NULL AND ix_completos_timestamp IS NOT NULL"
-            )
-            
-            query_total = """
-                SELECT 
-                    TIMESTAMPDIFF(MINUTE, ix_no_realizado_timestamp, ix_completos_timestamp) as tiempo_total
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones_total)
-            
-            cursor.execute(query_total, params_total)
-            resultados_total = cursor.fetchall()
-            tiempos_total = [r[0] for r in resultados_total if r[0] is not None]
-            
-            # Calcular estadísticas para cada conjunto
-            estadisticas_solicitud = cls.calcular_estadisticas(tiempos_solicitud)
-            estadisticas_resultados = cls.calcular_estadisticas(tiempos_resultados)
-            estadisticas_total = cls.calcular_estadisticas(tiempos_total)
-            
-            conn.close()
-            return {
-                'total_pacientes_solicitud': len(tiempos_solicitud),
-                'estadisticas_solicitud': estadisticas_solicitud,
-                'total_pacientes_resultados': len(tiempos_resultados),
-                'estadisticas_resultados': estadisticas_resultados,
-                'total_pacientes_total': len(tiempos_total),
-                'estadisticas_total': estadisticas_total
-            }
-            
-        except Exception as e:
-            print(f"Error al obtener métricas de imágenes diagnósticas: {str(e)}")
-            return {
-                'total_pacientes_solicitud': 0,
-                'estadisticas_solicitud': {'promedio': None, 'mediana': None, 'p90': None},
-                'total_pacientes_resultados': 0,
-                'estadisticas_resultados': {'promedio': None, 'mediana': None, 'p90': None},
-                'total_pacientes_total': 0,
-                'estadisticas_total': {'promedio': None, 'mediana': None, 'p90': None}
-            }
+        return cls.obtener_todas_metricas(area, fecha_inicio, fecha_fin, clase_triage)['imagenes']
    
     @classmethod
     def obtener_metricas_interconsulta(cls, area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
@@ -477,7 +500,7 @@ class ModeloMetricas:
         Calcula las métricas de tiempo para interconsultas, tanto para apertura como para realización.
         
         Args:
-            area (str, opcional): Área para filtrar los datos
+            area (str | list, opcional): Área o lista de áreas para filtrar los datos
             fecha_inicio (str, opcional): Fecha de inicio del rango
             fecha_fin (str, opcional): Fecha de fin del rango
             clase_triage (str, opcional): Clase de triage para filtrar (1-5)
@@ -485,114 +508,7 @@ class ModeloMetricas:
         Returns:
             dict: Diccionario con estadísticas de tiempo para interconsultas
         """
-        try:
-            conn = cls.conectar()
-            cursor = conn.cursor()
-            
-            # Construir condiciones del WHERE
-            condiciones = []
-            params = []
-            
-            # Solo considerar pacientes con interconsulta realizada y timestamps correspondientes
-            condiciones.append("inter = 'Realizada' AND inter_no_abierta_timestamp IS NOT NULL AND inter_abierta_timestamp IS NOT NULL AND inter_realizada_timestamp IS NOT NULL")
-            
-            if area:
-                condiciones.append("ubicacion LIKE %s")
-                params.append(f"%{area}%")
-            
-            if clase_triage:
-                condiciones.append("triage = %s")
-                params.append(clase_triage)
-            
-            if fecha_inicio:
-                condiciones.append("ingreso >= %s")
-                params.append(fecha_inicio)
-                
-            if fecha_fin:
-                condiciones.append("ingreso <= %s")
-                params.append(fecha_fin)
-            
-            # Construir la consulta para tiempo de apertura (no abierta -> abierta)
-            query_apertura = """
-                SELECT 
-                    TIMESTAMPDIFF(MINUTE, inter_no_abierta_timestamp, inter_abierta_timestamp) as tiempo_apertura
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones)
-            
-            # Ejecutar consulta de tiempo de apertura
-            cursor.execute(query_apertura, params)
-            resultados_apertura = cursor.fetchall()
-            
-            # Extraer tiempos de apertura
-            tiempos_apertura = [resultado[0] for resultado in resultados_apertura if resultado[0] is not None]
-            
-            # Construir la consulta para tiempo de realización (abierta -> realizada)
-            query_realizacion = """
-                SELECT 
-                    TIMESTAMPDIFF(MINUTE, inter_abierta_timestamp, inter_realizada_timestamp) as tiempo_realizacion
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones)
-            
-            # Ejecutar consulta de tiempo de realización
-            cursor.execute(query_realizacion, params)
-            resultados_realizacion = cursor.fetchall()
-            
-            # Extraer tiempos de realización
-            tiempos_realizacion = [resultado[0] for resultado in resultados_realizacion if resultado[0] is not None]
-            
-            # Construir la consulta para tiempo total (no abierta -> realizada)
-            query_total = """
-                SELECT 
-                    TIMESTAMPDIFF(MINUTE, inter_no_abierta_timestamp, inter_realizada_timestamp) as tiempo_total
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones)
-            
-            # Ejecutar consulta de tiempo total
-            cursor.execute(query_total, params)
-            resultados_total = cursor.fetchall()
-            
-            # Extraer tiempos totales
-            tiempos_total = [resultado[0] for resultado in resultados_total if resultado[0] is not None]
-            
-            # Calcular estadísticas para cada conjunto de tiempos
-            estadisticas_apertura = cls.calcular_estadisticas(tiempos_apertura)
-            estadisticas_realizacion = cls.calcular_estadisticas(tiempos_realizacion)
-            estadisticas_total = cls.calcular_estadisticas(tiempos_total)
-            
-            conn.close()
-            return {
-                'total_pacientes': len(tiempos_total),
-                'estadisticas_apertura': estadisticas_apertura,
-                'estadisticas_realizacion': estadisticas_realizacion,
-                'estadisticas_total': estadisticas_total
-            }
-            
-        except Exception as e:
-            print(f"Error al obtener métricas de interconsulta: {str(e)}")
-            return {
-                'total_pacientes': 0,
-                'estadisticas_apertura': {
-                    'promedio': None,
-                    'mediana': None,
-                    'p90': None
-                },
-                'estadisticas_realizacion': {
-                    'promedio': None,
-                    'mediana': None,
-                    'p90': None
-                },
-                'estadisticas_total': {
-                    'promedio': None,
-                    'mediana': None,
-                    'p90': None
-                }
-            }
+        return cls.obtener_todas_metricas(area, fecha_inicio, fecha_fin, clase_triage)['interconsulta']
 
     @classmethod
     def obtener_metricas_rv(cls, area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
@@ -600,7 +516,7 @@ class ModeloMetricas:
         Calcula las métricas de tiempo desde RV no realizado hasta RV realizado.
         
         Args:
-            area (str, opcional): Área para filtrar los datos
+            area (str | list, opcional): Área o lista de áreas para filtrar los datos
             fecha_inicio (str, opcional): Fecha de inicio del rango
             fecha_fin (str, opcional): Fecha de fin del rango
             clase_triage (str, opcional): Clase de triage para filtrar (1-5)
@@ -608,68 +524,7 @@ class ModeloMetricas:
         Returns:
             dict: Diccionario con estadísticas de tiempo de revaloración
         """
-        try:
-            conn = cls.conectar()
-            cursor = conn.cursor()
-            
-            # Construir condiciones del WHERE
-            condiciones = []
-            params = []
-            
-            # Solo considerar pacientes con RV realizado y timestamps correspondientes
-            condiciones.append("rv = 'Realizado' AND rv_no_realizado_timestamp IS NOT NULL AND rv_realizado_timestamp IS NOT NULL")
-            
-            if area:
-                condiciones.append("ubicacion LIKE %s")
-                params.append(f"%{area}%")
-            
-            if clase_triage:
-                condiciones.append("triage = %s")
-                params.append(clase_triage)
-            
-            if fecha_inicio:
-                condiciones.append("ingreso >= %s")
-                params.append(fecha_inicio)
-                
-            if fecha_fin:
-                condiciones.append("ingreso <= %s")
-                params.append(fecha_fin)
-            
-            # Construir la consulta
-            query = """
-                SELECT 
-                    TIMESTAMPDIFF(MINUTE, rv_no_realizado_timestamp, rv_realizado_timestamp) as tiempo_rv
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones)
-            
-            # Ejecutar consulta
-            cursor.execute(query, params)
-            resultados = cursor.fetchall()
-            
-            # Extraer tiempos
-            tiempos = [resultado[0] for resultado in resultados if resultado[0] is not None]
-            
-            # Calcular estadísticas
-            estadisticas = cls.calcular_estadisticas(tiempos)
-            
-            conn.close()
-            return {
-                'total_pacientes': len(tiempos),
-                'estadisticas': estadisticas
-            }
-            
-        except Exception as e:
-            print(f"Error al obtener métricas de revaloración: {str(e)}")
-            return {
-                'total_pacientes': 0,
-                'estadisticas': {
-                    'promedio': None,
-                    'mediana': None,
-                    'p90': None
-                }
-            }
+        return cls.obtener_todas_metricas(area, fecha_inicio, fecha_fin, clase_triage)['revaloracion']
 
     @classmethod
     def obtener_metricas_tiempo_total(cls, area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
@@ -677,7 +532,7 @@ class ModeloMetricas:
         Calcula las métricas de tiempo total de atención desde ingreso hasta alta o último timestamp disponible.
         
         Args:
-            area (str, opcional): Área para filtrar los datos
+            area (str | list, opcional): Área o lista de áreas para filtrar los datos
             fecha_inicio (str, opcional): Fecha de inicio del rango
             fecha_fin (str, opcional): Fecha de fin del rango
             clase_triage (str, opcional): Clase de triage para filtrar (1-5)
@@ -685,139 +540,189 @@ class ModeloMetricas:
         Returns:
             dict: Diccionario con estadísticas de tiempo total de atención
         """
-        try:
-            conn = cls.conectar()
-            cursor = conn.cursor()
-            
-            # Construir condiciones del WHERE
-            condiciones = []
-            params = []
-            
-            # Considerar solo pacientes con alta o con algún timestamp final
-            condiciones.append("""
-                (
-                    (conducta = 'De Alta' AND alta_timestamp IS NOT NULL) OR
-                    ci_realizado_timestamp IS NOT NULL OR 
-                    labs_completos_timestamp IS NOT NULL OR 
-                    ix_completos_timestamp IS NOT NULL OR 
-                    inter_realizada_timestamp IS NOT NULL OR 
-                    rv_realizado_timestamp IS NOT NULL
-                )
-            """)
-            
-            if area:
-                condiciones.append("ubicacion LIKE %s")
-                params.append(f"%{area}%")
-            
-            if clase_triage:
-                condiciones.append("triage = %s")
-                params.append(clase_triage)
-            
-            if fecha_inicio:
-                condiciones.append("ingreso >= %s")
-                params.append(fecha_inicio)
-                
-            if fecha_fin:
-                condiciones.append("ingreso <= %s")
-                params.append(fecha_fin)
-            
-            # Ejecutar consulta usando GREATEST() para seleccionar el timestamp más reciente
-            query = """
-                SELECT 
-                    TIMESTAMPDIFF(MINUTE, ingreso, 
-                        GREATEST(
-                            COALESCE(alta_timestamp, '1000-01-01'),
-                            COALESCE(observacion_timestamp, '1000-01-01'),
-                            COALESCE(rv_realizado_timestamp, '1000-01-01')
-                        )
-                    ) as tiempo_total
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones)
-            
-            # Ejecutar consulta
-            cursor.execute(query, params)
-            resultados = cursor.fetchall()
-            
-            # Extraer tiempos válidos (mayores que 0)
-            tiempos = [resultado[0] for resultado in resultados if resultado[0] is not None and resultado[0] > 0]
-            
-            # Calcular estadísticas
-            estadisticas = cls.calcular_estadisticas(tiempos)
-            
-            # Calcular métricas adicionales específicas por conducta
-            metricas_por_conducta = {}
-            
-            # Calcular tiempos para pacientes dados de alta
-            query_alta = query.replace(
-                " AND ".join(condiciones),
-                " AND ".join(condiciones + ["conducta = 'De Alta'"])
-            )
-            cursor.execute(query_alta, params)
-            resultados_alta = cursor.fetchall()
-            tiempos_alta = [r[0] for r in resultados_alta if r[0] is not None and r[0] > 0]
-            metricas_por_conducta['alta'] = {
-                'total': len(tiempos_alta),
-                'estadisticas': cls.calcular_estadisticas(tiempos_alta)
-            }
-            
-            # Calcular tiempos para pacientes en observación
-            query_observacion = query.replace(
-                " AND ".join(condiciones),
-                " AND ".join(condiciones + ["conducta = 'Observación'"])
-            )
-            cursor.execute(query_observacion, params)
-            resultados_observacion = cursor.fetchall()
-            tiempos_observacion = [r[0] for r in resultados_observacion if r[0] is not None and r[0] > 0]
-            metricas_por_conducta['observacion'] = {
-                'total': len(tiempos_observacion),
-                'estadisticas': cls.calcular_estadisticas(tiempos_observacion)
-            }
-            
-            # Calcular tiempos para pacientes hospitalizados
-            query_hospitalizacion = query.replace(
-                " AND ".join(condiciones),
-                " AND ".join(condiciones + ["conducta = 'Hospitalización'"])
-            )
-            cursor.execute(query_hospitalizacion, params)
-            resultados_hospitalizacion = cursor.fetchall()
-            tiempos_hospitalizacion = [r[0] for r in resultados_hospitalizacion if r[0] is not None and r[0] > 0]
-            metricas_por_conducta['hospitalizacion'] = {
-                'total': len(tiempos_hospitalizacion),
-                'estadisticas': cls.calcular_estadisticas(tiempos_hospitalizacion)
-            }
+        return cls.obtener_todas_metricas(area, fecha_inicio, fecha_fin, clase_triage)['tiempo_total']
+    
+    @classmethod
+    def _filtros_base(cls, area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
+        """
+        Construye las condiciones comunes de área, clase de triage y rango de ingreso.
+        
+        Returns:
+            tuple: (condiciones, params)
+        """
+        condiciones = []
+        params = []
+        
+        if area:
+            condicion_area, params_area = ModeloPaciente.condicion_areas(area)
+            condiciones.append(condicion_area)
+            params.extend(params_area)
+        
+        if clase_triage:
+            condiciones.append("triage = %s")
+            params.append(clase_triage)
+        
+        if fecha_inicio:
+            condiciones.append("ingreso >= %s")
+            params.append(fecha_inicio)
             
-            conn.close()
-            return {
-                'total_pacientes': len(tiempos),
-                'estadisticas': estadisticas,
-                'por_conducta': metricas_por_conducta
-            }
+        if fecha_fin:
+            condiciones.append("ingreso <= %s")
+            params.append(fecha_fin)
+        
+        return condiciones, params
+    
+    @classmethod
+    def calcular_estadisticas_columnas(cls, matriz):
+        """
+        Calcula promedio, mediana y percentil 90 de todas las columnas de una matriz en una sola pasada.
+        
+        Args:
+            matriz (np.ndarray): Matriz (pacientes x series) con NaN donde el valor no aplica
             
-        except Exception as e:
-            print(f"Error al obtener métricas de tiempo total de atención: {str(e)}")
-            return {
-                'total_pacientes': 0,
-                'estadisticas': {
-                    'promedio': None,
-                    'mediana': None,
-                    'p90': None
-                },
+        Returns:
+            list: Por columna, una tupla (total, estadisticas) con el mismo formato que calcular_estadisticas
+        """
+        conteos = np.count_nonzero(~np.isnan(matriz), axis=0)
+        if matriz.shape[0] == 0:
+            return [(0, cls.calcular_estadisticas([])) for _ in range(matriz.shape[1])]
+        
+        with warnings.catch_warnings():
+            # Las columnas sin valores devuelven NaN; se reportan como None más abajo
+            warnings.simplefilter("ignore", RuntimeWarning)
+            promedios = np.nanmean(matriz, axis=0)
+            medianas, p90 = np.nanpercentile(matriz, [50, 90], axis=0)
+        
+        resultado = []
+        for i, total in enumerate(conteos):
+            if total == 0:
+                resultado.append((0, cls.calcular_estadisticas([])))
+                continue
+            resultado.append((int(total), {
+                'promedio': round(float(promedios[i]), 2),
+                'mediana': round(float(medianas[i]), 2),
+                'p90': round(float(p90[i]), 2)
+            }))
+        return resultado
+    
+    @classmethod
+    def _armar_metricas(cls, claves, estadisticas):
+        """Reparte las estadísticas por serie en los diccionarios que devuelven los obtener_metricas_*"""
+        e = dict(zip(claves, estadisticas))
+        return {
+            'triage': {'total_pacientes': e['triage'][0], 'estadisticas': e['triage'][1]},
+            'consulta_ingreso': {'total_pacientes': e['ci'][0], 'estadisticas': e['ci'][1]},
+            'laboratorios': {
+                'total_pacientes_solicitud': e['labs_solicitud'][0],
+                'estadisticas_solicitud': e['labs_solicitud'][1],
+                'total_pacientes_resultados': e['labs_resultados'][0],
+                'estadisticas_resultados': e['labs_resultados'][1],
+                'total_pacientes_total': e['labs_total'][0],
+                'estadisticas_total': e['labs_total'][1]
+            },
+            'imagenes': {
+                'total_pacientes_solicitud': e['ix_solicitud'][0],
+                'estadisticas_solicitud': e['ix_solicitud'][1],
+                'total_pacientes_resultados': e['ix_resultados'][0],
+                'estadisticas_resultados': e['ix_resultados'][1],
+                'total_pacientes_total': e['ix_total'][0],
+                'estadisticas_total': e['ix_total'][1]
+            },
+            'interconsulta': {
+                'total_pacientes': e['inter_total'][0],
+                'estadisticas_apertura': e['inter_apertura'][1],
+                'estadisticas_realizacion': e['inter_realizacion'][1],
+                'estadisticas_total': e['inter_total'][1]
+            },
+            'revaloracion': {'total_pacientes': e['rv'][0], 'estadisticas': e['rv'][1]},
+            'tiempo_total': {
+                'total_pacientes': e['total'][0],
+                'estadisticas': e['total'][1],
                 'por_conducta': {
-                    'alta': {'total': 0, 'estadisticas': {'promedio': None, 'mediana': None, 'p90': None}},
-                    'observacion': {'total': 0, 'estadisticas': {'promedio': None, 'mediana': None, 'p90': None}},
-                    'hospitalizacion': {'total': 0, 'estadisticas': {'promedio': None, 'mediana': None, 'p90': None}}
+                    'alta': {'total': e['total_alta'][0], 'estadisticas': e['total_alta'][1]},
+                    'observacion': {'total': e['total_observacion'][0], 'estadisticas': e['total_observacion'][1]},
+                    'hospitalizacion': {'total': e['total_hospitalizacion'][0], 'estadisticas': e['total_hospitalizacion'][1]}
                 }
             }
+        }
+    
+    @classmethod
+    def cargar_cohorte(cls, area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
+        """
+        Carga la cohorte filtrada en columnas NumPy con un único recorrido de `pacientes`.
+        
+        Un informe pide métricas, barras y SLA con los mismos filtros casi a la vez, así que la
+        cohorte se reutiliza durante COHORTE_TTL_SEGUNDOS mientras no haya escrituras locales.
+        
+        Returns:
+            CohorteMetricas: Cohorte cargada (vacía si la consulta falla)
+        """
+        clave = (
+            tuple(area) if isinstance(area, (list, tuple)) else area,
+            str(fecha_inicio), str(fecha_fin), clase_triage
+        )
+        ahora = time.monotonic()
+        version = ModeloPaciente.version_escrituras()
+        
+        en_cache = cls._cohortes.get(clave)
+        if en_cache and en_cache[0] == version and ahora - en_cache[1] < cls.COHORTE_TTL_SEGUNDOS:
+            return en_cache[2]
+        
+        try:
+            condiciones, params = cls._filtros_base(area, fecha_inicio, fecha_fin, clase_triage)
+            query = CohorteMetricas.consulta()
+            if condiciones:
+                query += " WHERE " + " AND ".join(condiciones)
             
+            with cls.conectar() as conexion:
+                with conexion.cursor() as cursor:
+                    cursor.execute(query, params)
+                    cohorte = CohorteMetricas(cursor.fetchall())
+        except Exception as e:
+            print(f"Error al obtener la cohorte de métricas: {str(e)}")
+            return CohorteMetricas()
+        
+        # Conservar solo las cohortes vigentes
+        cls._cohortes = {
+            k: v for k, v in cls._cohortes.items()
+            if v[0] == version and ahora - v[1] < cls.COHORTE_TTL_SEGUNDOS
+        }
+        cls._cohortes[clave] = (version, ahora, cohorte)
+        return cohorte
+    
+    @classmethod
+    def _metricas_desde_rollup(cls, area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
+        """Arma las métricas de todas las series con las sumas y los sketches del rollup histórico"""
+        claves = list(CohorteMetricas.SERIES)
+        totales = cls.consultar_rollup(claves, area, fecha_inicio, fecha_fin, clase_triage)
+        cuantiles = cls.consultar_cuantiles(claves, [50, 90], area, fecha_inicio, fecha_fin, clase_triage)
+        
+        estadisticas = []
+        for clave in claves:
+            pacientes, suma, _ = totales[clave]
+            if pacientes == 0:
+                estadisticas.append((0, cls.calcular_estadisticas([])))
+                continue
+            mediana, p90 = cuantiles[clave]
+            estadisticas.append((pacientes, {
+                'promedio': round(suma / pacientes, 2),
+                'mediana': round(mediana, 2) if mediana is not None else None,
+                'p90': round(p90, 2) if p90 is not None else None
+            }))
+        return cls._armar_metricas(claves, estadisticas)
+    
     @classmethod
     def obtener_todas_metricas(cls, area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
         """
         Obtiene todas las métricas disponibles en un solo diccionario.
         
+        Los conteos y promedios salen de las sumas del rollup histórico, y la mediana y el p90
+        de fusionar sus sketches de cuantiles, sin leer los pacientes del rango. Si el rollup no
+        está disponible, se lee la cohorte filtrada con un único recorrido de `pacientes` y se
+        calculan las estadísticas exactas de todas las etapas a la vez con NumPy.
+        
         Args:
-            area (str, opcional): Área para filtrar los datos
+            area (str | list, opcional): Área o lista de áreas para filtrar los datos
             fecha_inicio (str, opcional): Fecha de inicio del rango
             fecha_fin (str, opcional): Fecha de fin del rango
             clase_triage (str, opcional): Clase de triage para filtrar (1-5)
@@ -825,31 +730,291 @@ class ModeloMetricas:
         Returns:
             dict: Diccionario con todas las métricas recopiladas
         """
-        # Recolectar todas las métricas individuales
-        metricas_triage = cls.obtener_metricas_triage(area, fecha_inicio, fecha_fin, clase_triage)
-        metricas_ci = cls.obtener_metricas_consulta_ingreso(area, fecha_inicio, fecha_fin, clase_triage)
-        metricas_labs = cls.obtener_metricas_laboratorios(area, fecha_inicio, fecha_fin, clase_triage)
-        metricas_ix = cls.obtener_metricas_imagenes(area, fecha_inicio, fecha_fin, clase_triage)
-        metricas_ic = cls.obtener_metricas_interconsulta(area, fecha_inicio, fecha_fin, clase_triage)
-        metricas_rv = cls.obtener_metricas_rv(area, fecha_inicio, fecha_fin, clase_triage)
-        metricas_tiempo_total = cls.obtener_metricas_tiempo_total(area, fecha_inicio, fecha_fin, clase_triage)
+        try:
+            metricas = cls._metricas_desde_rollup(area, fecha_inicio, fecha_fin, clase_triage)
+        except Exception as e:
+            print(f"⚠️ Rollup no disponible para las métricas, se consulta pacientes: {str(e)}")
+            cohorte = cls.cargar_cohorte(area, fecha_inicio, fecha_fin, clase_triage)
+            claves, matriz = cohorte.matriz_series()
+            metricas = cls._armar_metricas(claves, cls.calcular_estadisticas_columnas(matriz))
         
         # Crear diccionario consolidado
-        return {
-            'triage': metricas_triage,
-            'consulta_ingreso': metricas_ci,
-            'laboratorios': metricas_labs,
-            'imagenes': metricas_ix,
-            'interconsulta': metricas_ic,
-            'revaloracion': metricas_rv,
-            'tiempo_total': metricas_tiempo_total,
-            'configuracion': {
-                'area': area or 'todas',
-                'fecha_inicio': fecha_inicio,
-                'fecha_fin': fecha_fin,
-                'clase_triage': clase_triage
-            }
+        metricas['configuracion'] = {
+            'area': area or 'todas',
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'clase_triage': clase_triage
         }
+        return metricas
+    
+    @classmethod
+    def obtener_metricas_agrupadas(cls, agrupar_por='area', area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
+        """
+        Obtiene las métricas de todas las etapas para cada área o clase de triage de la cohorte.
+        
+        Args:
+            agrupar_por (str): 'area' o 'triage'
+            area (str | list, opcional): Área o lista de áreas para filtrar los datos
+            fecha_inicio (str, opcional): Fecha de inicio del rango
+            fecha_fin (str, opcional): Fecha de fin del rango
+            clase_triage (str, opcional): Clase de triage para filtrar (1-5)
+            
+        Returns:
+            dict: {valor_del_grupo: métricas con el mismo formato que obtener_todas_metricas}
+        """
+        cohorte = cls.cargar_cohorte(area, fecha_inicio, fecha_fin, clase_triage)
+        columna = cohorte.estados[agrupar_por]
+        claves, matriz = cohorte.matriz_series()
+        
+        grupos = {}
+        for valor in sorted({v for v in columna if v}):
+            estadisticas = cls.calcular_estadisticas_columnas(matriz[columna == valor])
+            grupos[valor] = cls._armar_metricas(claves, estadisticas)
+        return grupos
+
+    @classmethod
+    def actualizar_rollup_paciente(cls, cursor, paciente_id):
+        """
+        Actualiza de forma incremental el rollup histórico con el aporte actual de un paciente.
+        
+        Resta lo que el paciente aportaba antes (metricas_rollup_aportes) y suma su aporte nuevo,
+        dentro de la transacción del cursor recibido. Si el paciente ya no existe, solo retira su aporte.
+        Un fallo deja intactas las tablas del rollup (se deshace hasta el savepoint).
+        
+        Args:
+            cursor: Cursor de la conexión que confirma la transacción
+            paciente_id: ID del paciente
+            
+        Returns:
+            bool: True si el rollup quedó actualizado
+        """
+        try:
+            cursor.execute("SAVEPOINT rollup_paciente")
+            
+            cursor.execute(CohorteMetricas.consulta() + " WHERE id = %s", (paciente_id,))
+            nuevos = CohorteMetricas(cursor.fetchall()).aportes_rollup(cls.SLAS, cls.SLA_POR_DEFECTO)
+            
+            cursor.execute("""
+                SELECT serie, hora, area, clase_triage, minutos, cumple_sla, cubeta
+                FROM metricas_rollup_aportes
+                WHERE paciente_id = %s
+                FOR UPDATE
+            """, (paciente_id,))
+            anteriores = cursor.fetchall()
+            
+            # Diferencia neta por celda del rollup: (pacientes, suma_minutos, cumplen_sla)
+            # y por cubeta del sketch de cuantiles de cada celda
+            deltas = {}
+            deltas_cubetas = {}
+            for signo, aportes in ((-1, [(None,) + tuple(a) for a in anteriores]), (1, nuevos)):
+                for _, serie, hora, area, clase, minutos, cumple, cubeta in aportes:
+                    n, suma, cumplen = deltas.get((serie, hora, area, clase), (0, 0, 0))
+                    deltas[(serie, hora, area, clase)] = (n + signo, suma + signo * minutos, cumplen + signo * cumple)
+                    clave_cubeta = (serie, hora, area, clase, cubeta)
+                    deltas_cubetas[clave_cubeta] = deltas_cubetas.get(clave_cubeta, 0) + signo
+            
+            cursor.execute("DELETE FROM metricas_rollup_aportes WHERE paciente_id = %s", (paciente_id,))
+            if nuevos:
+                cursor.executemany("""
+                    INSERT INTO metricas_rollup_aportes 
+                        (paciente_id, serie, hora, area, clase_triage, minutos, cumple_sla, cubeta)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """, nuevos)
+            
+            cambios = [clave + delta for clave, delta in deltas.items() if delta != (0, 0, 0)]
+            if cambios:
+                cursor.executemany("""
+                    INSERT INTO metricas_rollup 
+                        (serie, hora, area, clase_triage, pacientes, suma_minutos, cumplen_sla)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE 
+                        pacientes = pacientes + VALUES(pacientes),
+                        suma_minutos = suma_minutos + VALUES(suma_minutos),
+                        cumplen_sla = cumplen_sla + VALUES(cumplen_sla)
+                """, cambios)
+            
+            cambios_cubetas = [clave + (delta,) for clave, delta in deltas_cubetas.items() if delta != 0]
+            if cambios_cubetas:
+                cursor.executemany("""
+                    INSERT INTO metricas_rollup_cuantiles 
+                        (serie, hora, area, clase_triage, cubeta, pacientes)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE pacientes = pacientes + VALUES(pacientes)
+                """, cambios_cubetas)
+            
+            cursor.execute("RELEASE SAVEPOINT rollup_paciente")
+            return True
+            
+        except Exception as e:
+            print(f"⚠️ Error al actualizar el rollup de métricas del paciente {paciente_id}: {str(e)}")
+            try:
+                cursor.execute("ROLLBACK TO SAVEPOINT rollup_paciente")
+            except Exception:
+                pass
+            return False
+    
+    @classmethod
+    def reconstruir_rollup(cls):
+        """
+        Recalcula el rollup histórico completo a partir de `pacientes` (un solo recorrido).
+        
+        Se usa para poblarlo la primera vez y tras cambiar los SLAS, que quedan grabados
+        en la marca de cumplimiento de cada aporte.
+        
+        Returns:
+            bool: True si el rollup se reconstruyó correctamente
+        """
+        try:
+            with cls.conectar() as conexion:
+                with conexion.cursor() as cursor:
+                    cursor.execute(CohorteMetricas.consulta())
+                    aportes = CohorteMetricas(cursor.fetchall()).aportes_rollup(cls.SLAS, cls.SLA_POR_DEFECTO)
+                    
+                    cursor.execute("DELETE FROM metricas_rollup_aportes")
+                    cursor.execute("DELETE FROM metricas_rollup")
+                    cursor.execute("DELETE FROM metricas_rollup_cuantiles")
+                    if aportes:
+                        cursor.executemany("""
+                            INSERT INTO metricas_rollup_aportes 
+                                (paciente_id, serie, hora, area, clase_triage, minutos, cumple_sla, cubeta)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                        """, aportes)
+                        cursor.execute("""
+                            INSERT INTO metricas_rollup 
+                                (serie, hora, area, clase_triage, pacientes, suma_minutos, cumplen_sla)
+                            SELECT serie, hora, area, clase_triage, COUNT(*), SUM(minutos), SUM(cumple_sla)
+                            FROM metricas_rollup_aportes
+                            GROUP BY serie, hora, area, clase_triage
+                        """)
+                        cursor.execute("""
+                            INSERT INTO metricas_rollup_cuantiles 
+                                (serie, hora, area, clase_triage, cubeta, pacientes)
+                            SELECT serie, hora, area, clase_triage, cubeta, COUNT(*)
+                            FROM metricas_rollup_aportes
+                            GROUP BY serie, hora, area, clase_triage, cubeta
+                        """)
+                conexion.commit()
+            print(f"✅ Rollup de métricas reconstruido ({len(aportes)} aportes)")
+            return True
+        except Exception as e:
+            print(f"⚠️ Error al reconstruir el rollup de métricas: {str(e)}")
+            return False
+    
+    @classmethod
+    def _asegurar_rollup(cls):
+        """Puebla el rollup la primera vez que se consulta en esta sesión si aún está vacío"""
+        if cls._rollup_verificado:
+            return
+        with cls.conectar() as conexion:
+            with conexion.cursor() as cursor:
+                cursor.execute("""
+                    SELECT 
+                        EXISTS(SELECT 1 FROM metricas_rollup_aportes),
+                        EXISTS(SELECT 1 FROM pacientes)
+                """)
+                con_aportes, con_pacientes = cursor.fetchone()
+        if con_pacientes and not con_aportes:
+            cls.reconstruir_rollup()
+        cls._rollup_verificado = True
+    
+    @classmethod
+    def _filtros_rollup(cls, area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
+        """
+        Equivalente de _filtros_base sobre las celdas del rollup.
+        
+        La hora inicial se trunca para incluir la celda donde cae fecha_inicio; con límites en
+        horas exactas (o terminados en :59:59) el resultado coincide con el filtro por ingreso.
+        
+        Returns:
+            tuple: (condiciones, params)
+        """
+        condiciones = []
+        params = []
+        
+        if area:
+            condicion_area, params_area = ModeloPaciente.condicion_areas(area)
+            condiciones.append(condicion_area)
+            params.extend(params_area)
+        
+        if clase_triage:
+            condiciones.append("clase_triage = %s")
+            params.append(clase_triage)
+        
+        if fecha_inicio:
+            condiciones.append("hora >= DATE_FORMAT(%s, '%%Y-%%m-%%d %%H:00:00')")
+            params.append(fecha_inicio)
+            
+        if fecha_fin:
+            condiciones.append("hora <= %s")
+            params.append(fecha_fin)
+        
+        return condiciones, params
+    
+    @classmethod
+    def consultar_rollup(cls, series, area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
+        """
+        Suma las celdas del rollup de cada serie dentro de los filtros.
+        
+        Args:
+            series (list): Series a consultar
+            
+        Returns:
+            dict: {serie: (pacientes, suma_minutos, cumplen_sla)}
+        """
+        cls._asegurar_rollup()
+        condiciones, params = cls._filtros_rollup(area, fecha_inicio, fecha_fin, clase_triage)
+        condiciones.insert(0, f"serie IN ({', '.join(['%s'] * len(series))})")
+        params = list(series) + params
+        
+        query = """
+            SELECT serie, SUM(pacientes), SUM(suma_minutos), SUM(cumplen_sla)
+            FROM metricas_rollup
+            WHERE """ + " AND ".join(condiciones) + """
+            GROUP BY serie
+        """
+        with cls.conectar() as conexion:
+            with conexion.cursor() as cursor:
+                cursor.execute(query, params)
+                filas = cursor.fetchall()
+        
+        totales = {serie: (0, 0, 0) for serie in series}
+        for serie, pacientes, suma, cumplen in filas:
+            totales[serie] = (int(pacientes or 0), float(suma or 0), int(cumplen or 0))
+        return totales
+    
+    @classmethod
+    def consultar_cuantiles(cls, series, percentiles, area=None, fecha_inicio=None, fecha_fin=None, clase_triage=None):
+        """
+        Fusiona en la base los sketches de las celdas del rollup y estima los percentiles de cada serie.
+        
+        Args:
+            series (list): Series a consultar
+            percentiles (list): Percentiles a estimar (0-100)
+            
+        Returns:
+            dict: {serie: [valor por percentil]} (ver SketchCuantiles para la cota de error)
+        """
+        cls._asegurar_rollup()
+        condiciones, params = cls._filtros_rollup(area, fecha_inicio, fecha_fin, clase_triage)
+        condiciones.insert(0, f"serie IN ({', '.join(['%s'] * len(series))})")
+        params = list(series) + params
+        
+        query = """
+            SELECT serie, cubeta, SUM(pacientes)
+            FROM metricas_rollup_cuantiles
+            WHERE """ + " AND ".join(condiciones) + """
+            GROUP BY serie, cubeta
+            HAVING SUM(pacientes) > 0
+        """
+        with cls.conectar() as conexion:
+            with conexion.cursor() as cursor:
+                cursor.execute(query, params)
+                filas = cursor.fetchall()
+        
+        sketches = {serie: {} for serie in series}
+        for serie, cubeta, pacientes in filas:
+            sketches[serie][int(cubeta)] = int(pacientes)
+        return {serie: SketchCuantiles.cuantiles(sketch, percentiles) for serie, sketch in sketches.items()}
 
     @classmethod
     def generar_datos_linea_tiempo(cls, area=None, fecha_inicio=None, fecha_fin=None):
@@ -864,54 +1029,84 @@ class ModeloMetricas:
                 grouping = "hourly"
                 format_str = "%H:%M"
                 sql_format = "%H"
-                group_by = "HOUR(ingreso)"
+                group_by = "HOUR({columna})"
             elif days_difference > 2 and days_difference <= 31:  # Up to a month: show daily
                 grouping = "daily"
                 format_str = "%d %b"
                 sql_format = "%Y-%m-%d"
-                group_by = "DATE(ingreso)"
+                group_by = "DATE({columna})"
             elif days_difference > 31 and days_difference <= 92:  # Up to 3 months: show weekly
                 grouping = "weekly"
                 format_str = "Sem %U"
                 sql_format = "%Y%U"
-                group_by = "YEARWEEK(ingreso, 1)"
+                group_by = "YEARWEEK({columna}, 1)"
             elif days_difference > 92 and days_difference <= 365:  # Up to a year: show monthly
                 grouping = "monthly"
                 format_str = "%b %Y"
                 sql_format = "%Y-%m"
-                group_by = "DATE_FORMAT(ingreso, '%%Y-%%m')"
+                group_by = "DATE_FORMAT({columna}, '%%Y-%%m')"
             else:  # More than a year: show quarterly
                 grouping = "quarterly"
                 format_str = "Q%q %Y"
                 sql_format = "%Y-%q"
-                group_by = "CONCAT(YEAR(ingreso), '-', QUARTER(ingreso))"
-            
-            # Create SQL query with dynamic grouping
-            query = f"""
-                    SELECT 
-                        {group_by} AS date_group,
-                        AVG(TIMESTAMPDIFF(MINUTE, ingreso, alta_timestamp)) AS avg_time
-                    FROM 
-                        pacientes
-                    WHERE 
-                        ingreso BETWEEN %s AND %s
-                        AND alta_timestamp IS NOT NULL
-                        {" AND ubicacion LIKE %s" if area else ""}
-                    GROUP BY 
-                        date_group
-                    ORDER BY 
-                        date_group
-                """
+                group_by = "CONCAT(YEAR({columna}), '-', QUARTER({columna}))"
+            
+            condicion_area, params_area = ModeloPaciente.condicion_areas(area)
+            filtro_area = " AND " + condicion_area if condicion_area else ""
+            
+            try:
+                # Promedio de estancia por grupo a partir del rollup histórico (serie 'estancia')
+                cls._asegurar_rollup()
+                condiciones, params = cls._filtros_rollup(area, fecha_inicio, fecha_fin)
+                condiciones.insert(0, "serie = 'estancia'")
+                query = f"""
+                        SELECT 
+                            {group_by.format(columna='hora')} AS date_group,
+                            SUM(suma_minutos) / SUM(pacientes) AS avg_time
+                        FROM 
+                            metricas_rollup
+                        WHERE 
+                            {" AND ".join(condiciones)}
+                        GROUP BY 
+                            date_group
+                        HAVING 
+                            SUM(pacientes) > 0
+                        ORDER BY 
+                            date_group
+                    """
                 
-            params = [fecha_inicio, fecha_fin]
-            if area:
-                params.append(f"%{area}%")
+                with cls.conectar() as conexion:
+                    with conexion.cursor() as cursor:
+                        cursor.execute(query, params)
+                        results = cursor.fetchall()
+                        
+            except Exception as e:
+                print(f"⚠️ Rollup no disponible para la línea temporal, se consulta pacientes: {str(e)}")
                 
-            # Execute query
-            with cls.conectar() as conexion:
-                with conexion.cursor() as cursor:
-                    cursor.execute(query, params)
-                    results = cursor.fetchall()
+                # Create SQL query with dynamic grouping
+                query = f"""
+                        SELECT 
+                            {group_by.format(columna='ingreso')} AS date_group,
+                            AVG(TIMESTAMPDIFF(MINUTE, ingreso, alta_timestamp)) AS avg_time
+                        FROM 
+                            pacientes
+                        WHERE 
+                            ingreso BETWEEN %s AND %s
+                            AND alta_timestamp IS NOT NULL
+                            {filtro_area}
+                        GROUP BY 
+                            date_group
+                        ORDER BY 
+                            date_group
+                    """
+                    
+                params = [fecha_inicio, fecha_fin] + params_area
+                    
+                # Execute query
+                with cls.conectar() as conexion:
+                    with conexion.cursor() as cursor:
+                        cursor.execute(query, params)
+                        results = cursor.fetchall()
             
             # Depuración
             print(f"Resultados de la consulta: {results}")
@@ -993,7 +1188,7 @@ class ModeloMetricas:
         Genera datos para el gráfico de barras de tiempos promedios por etapa.
         
         Args:
-            area (str, opcional): Área para filtrar los datos
+            area (str | list, opcional): Área o lista de áreas para filtrar los datos
             fecha_inicio (str, opcional): Fecha de inicio del rango
             fecha_fin (str, opcional): Fecha de fin del rango
             clase_triage (str, opcional): Clase de triage para filtrar (1-5)
@@ -1002,19 +1197,31 @@ class ModeloMetricas:
             dict: Diccionario con etiquetas y datos para el gráfico
         """
         try:
-            # Obtener métricas de todas las etapas
-            metricas = cls.obtener_todas_metricas(area, fecha_inicio, fecha_fin, clase_triage)
-            
-            # Extraer los datos relevantes para el gráfico
             etiquetas = ['Triage', 'Consulta de Ingreso', 'Laboratorios', 'Imágenes', 'Interconsulta', 'Revaloración']
-            datos = [
-                metricas['triage'].get('estadisticas', {}).get('promedio', 0) or 0,
-                metricas['consulta_ingreso'].get('estadisticas', {}).get('promedio', 0) or 0,
-                metricas['laboratorios'].get('estadisticas_total', {}).get('promedio', 0) or 0,
-                metricas['imagenes'].get('estadisticas_total', {}).get('promedio', 0) or 0,
-                metricas['interconsulta'].get('estadisticas_total', {}).get('promedio', 0) or 0,
-                metricas['revaloracion'].get('estadisticas', {}).get('promedio', 0) or 0
-            ]
+            series = ['triage', 'ci', 'labs_total', 'ix_total', 'inter_total', 'rv']
+            
+            try:
+                # Promedios por etapa a partir de las sumas y conteos del rollup histórico
+                totales = cls.consultar_rollup(series, area, fecha_inicio, fecha_fin, clase_triage)
+                datos = [
+                    round(totales[serie][1] / totales[serie][0], 2) if totales[serie][0] else 0
+                    for serie in series
+                ]
+            except Exception as e:
+                print(f"⚠️ Rollup no disponible para las barras comparativas, se consulta pacientes: {str(e)}")
+                
+                # Obtener métricas de todas las etapas
+                metricas = cls.obtener_todas_metricas(area, fecha_inicio, fecha_fin, clase_triage)
+                
+                # Extraer los datos relevantes para el gráfico
+                datos = [
+                    metricas['triage'].get('estadisticas', {}).get('promedio', 0) or 0,
+                    metricas['consulta_ingreso'].get('estadisticas', {}).get('promedio', 0) or 0,
+                    metricas['laboratorios'].get('estadisticas_total', {}).get('promedio', 0) or 0,
+                    metricas['imagenes'].get('estadisticas_total', {}).get('promedio', 0) or 0,
+                    metricas['interconsulta'].get('estadisticas_total', {}).get('promedio', 0) or 0,
+                    metricas['revaloracion'].get('estadisticas', {}).get('promedio', 0) or 0
+                ]
             
             return {
                 'etiquetas': etiquetas,
@@ -1034,7 +1241,7 @@ class ModeloMetricas:
         Calcula las métricas de cumplimiento de SLA para cada etapa.
         
         Args:
-            area (str, opcional): Área para filtrar los datos
+            area (str | list, opcional): Área o lista de áreas para filtrar los datos
             fecha_inicio (str, opcional): Fecha de inicio del rango
             fecha_fin (str, opcional): Fecha de fin del rango
             clase_triage (str, opcional): Clase de triage para filtrar (1-5)
@@ -1043,184 +1250,18 @@ class ModeloMetricas:
             dict: Diccionario con porcentajes de cumplimiento para cada etapa
         """
         try:
-            conn = cls.conectar()
-            cursor = conn.cursor()
-            
-            # Definir SLAs objetivo (en minutos) para cada etapa y clase de triage
-            slas = {
-                # Formato: {clase_triage: tiempo_objetivo_en_minutos}
-                'triage': {'1': 0, '2': 30, '3': 120, '4': 30, '5': 60},
-                'ci': {'1': 210, '2': 210, '3': 360, '4': 420, '5': 420},
-                'labs': {'1': 360, '2': 360, '3': 360, '4': 360, '5': 360},
-                'ix': {'1': 360, '2': 360, '3': 360, '4': 360, '5': 360},
-                'inter': {'1': 30, '2': 45, '3': 60, '4': 120, '5': 180},
-                'rv': {'1': 30, '2': 60, '3': 120, '4': 240, '5': 360}
-            }
-            
-            # Construir condiciones de filtro comunes
-            condiciones_base = []
-            params_base = []
-            
-            if area:
-                condiciones_base.append("ubicacion LIKE %s")
-                params_base.append(f"%{area}%")
-            
-            if clase_triage:
-                condiciones_base.append("triage = %s")
-                params_base.append(clase_triage)
-            
-            if fecha_inicio:
-                condiciones_base.append("ingreso >= %s")
-                params_base.append(fecha_inicio)
-                
-            if fecha_fin:
-                condiciones_base.append("ingreso <= %s")
-                params_base.append(fecha_fin)
-            
-            # Calcular cumplimiento para cada etapa
-            resultados = {}
-            
-            # Triaje
-            condiciones = condiciones_base.copy() + ["triage IN ('1', '2', '3', '4', '5') AND triage_timestamp IS NOT NULL"]
-            params = params_base.copy()
-            
-            query = """
-                SELECT 
-                    triage,
-                    TIMESTAMPDIFF(MINUTE, ingreso, triage_timestamp) as tiempo_triage
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones)
-            
-            cursor.execute(query, params)
-            triage_data = cursor.fetchall()
-            
-            # Calcular cumplimiento
-            total_triage = len(triage_data)
-            if total_triage > 0:
-                cumplidos_triage = sum(1 for t, tiempo in triage_data if tiempo <= slas['triage'].get(t, 30))
-                resultados['triage'] = round((cumplidos_triage / total_triage) * 100)
-            else:
-                resultados['triage'] = 0
-            
-            # Consulta de Ingreso (CI)
-            condiciones = condiciones_base.copy() + ["ci = 'Realizado' AND ci_no_realizado_timestamp IS NOT NULL AND ci_realizado_timestamp IS NOT NULL"]
-            params = params_base.copy()
-            
-            query = """
-                SELECT 
-                    triage,
-                    TIMESTAMPDIFF(MINUTE, ci_no_realizado_timestamp, ci_realizado_timestamp) as tiempo_ci
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones)
-            
-            cursor.execute(query, params)
-            ci_data = cursor.fetchall()
-            
-            total_ci = len(ci_data)
-            if total_ci > 0:
-                cumplidos_ci = sum(1 for t, tiempo in ci_data if tiempo <= slas['ci'].get(t, 60))
-                resultados['ci'] = round((cumplidos_ci / total_ci) * 100)
-            else:
-                resultados['ci'] = 0
-            
-            # Laboratorios
-            condiciones = condiciones_base.copy() + ["labs = 'Resultados completos' AND labs_solicitados_timestamp IS NOT NULL AND labs_completos_timestamp IS NOT NULL"]
-            params = params_base.copy()
-            
-            query = """
-                SELECT 
-                    triage,
-                    TIMESTAMPDIFF(MINUTE, labs_solicitados_timestamp, labs_completos_timestamp) as tiempo_labs
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones)
-            
-            cursor.execute(query, params)
-            labs_data = cursor.fetchall()
-            
-            total_labs = len(labs_data)
-            if total_labs > 0:
-                cumplidos_labs = sum(1 for t, tiempo in labs_data if tiempo <= slas['labs'].get(t, 90))
-                resultados['labs'] = round((cumplidos_labs / total_labs) * 100)
-            else:
-                resultados['labs'] = 0
-            
-            # Imágenes (IX)
-            condiciones = condiciones_base.copy() + ["ix = 'Resultados completos' AND ix_solicitados_timestamp IS NOT NULL AND ix_completos_timestamp IS NOT NULL"]
-            params = params_base.copy()
-            
-            query = """
-                SELECT 
-                    triage,
-                    TIMESTAMPDIFF(MINUTE, ix_solicitados_timestamp, ix_completos_timestamp) as tiempo_ix
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones)
-            
-            cursor.execute(query, params)
-            ix_data = cursor.fetchall()
-            
-            total_ix = len(ix_data)
-            if total_ix > 0:
-                cumplidos_ix = sum(1 for t, tiempo in ix_data if tiempo <= slas['ix'].get(t, 90))
-                resultados['ix'] = round((cumplidos_ix / total_ix) * 100)
-            else:
-                resultados['ix'] = 0
-            
-            # Interconsulta
-            condiciones = condiciones_base.copy() + ["inter = 'Realizada' AND inter_abierta_timestamp IS NOT NULL AND inter_realizada_timestamp IS NOT NULL"]
-            params = params_base.copy()
-            
-            query = """
-                SELECT 
-                    triage,
-                    TIMESTAMPDIFF(MINUTE, inter_abierta_timestamp, inter_realizada_timestamp) as tiempo_inter
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones)
-            
-            cursor.execute(query, params)
-            inter_data = cursor.fetchall()
-            
-            total_inter = len(inter_data)
-            if total_inter > 0:
-                cumplidos_inter = sum(1 for t, tiempo in inter_data if tiempo <= slas['inter'].get(t, 60))
-                resultados['inter'] = round((cumplidos_inter / total_inter) * 100)
-            else:
-                resultados['inter'] = 0
-            
-            # Revaloración (RV)
-            condiciones = condiciones_base.copy() + ["rv = 'Realizado' AND rv_no_realizado_timestamp IS NOT NULL AND rv_realizado_timestamp IS NOT NULL"]
-            params = params_base.copy()
-            
-            query = """
-                SELECT 
-                    triage,
-                    TIMESTAMPDIFF(MINUTE, rv_no_realizado_timestamp, rv_realizado_timestamp) as tiempo_rv
-                FROM 
-                    pacientes
-                WHERE 
-                    """ + " AND ".join(condiciones)
-            
-            cursor.execute(query, params)
-            rv_data = cursor.fetchall()
-            
-            total_rv = len(rv_data)
-            if total_rv > 0:
-                cumplidos_rv = sum(1 for t, tiempo in rv_data if tiempo <= slas['rv'].get(t, 120))
-                resultados['rv'] = round((cumplidos_rv / total_rv) * 100)
-            else:
-                resultados['rv'] = 0
-            
-            conn.close()
-            return resultados
+            etapas = list(cls.SLAS)
+            try:
+                # Conteos de cumplimiento ya marcados en el rollup histórico ('sla_<etapa>')
+                totales = cls.consultar_rollup([f"sla_{etapa}" for etapa in etapas], area, fecha_inicio, fecha_fin, clase_triage)
+                return {
+                    etapa: round((totales[f"sla_{etapa}"][2] / totales[f"sla_{etapa}"][0]) * 100) if totales[f"sla_{etapa}"][0] else 0
+                    for etapa in etapas
+                }
+            except Exception as e:
+                print(f"⚠️ Rollup no disponible para el cumplimiento de SLA, se consulta pacientes: {str(e)}")
+                cohorte = cls.cargar_cohorte(area, fecha_inicio, fecha_fin, clase_triage)
+                return cohorte.cumplimiento_sla(cls.SLAS, cls.SLA_POR_DEFECTO)
             
         except Exception as e:
             print(f"Error al calcular métricas de cumplimiento SLA: {str(e)}")
@@ -1276,15 +1317,8 @@ class ModeloMetricas:
             fecha_fin = (fecha_ingreso + timedelta(days=30)).strftime("%Y-%m-%d")
             
             # Obtener métricas del área para comparación usando el mismo rango de fechas
-            metricas_area = {
-                'triage': cls.obtener_metricas_triage(area=area, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin),
-                'consulta_ingreso': cls.obtener_metricas_consulta_ingreso(area=area, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin),
-                'laboratorios': cls.obtener_metricas_laboratorios(area=area, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin),
-                'imagenes': cls.obtener_metricas_imagenes(area=area, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin),
-                'interconsulta': cls.obtener_metricas_interconsulta(area=area, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin),
-                'revaloracion': cls.obtener_metricas_rv(area=area, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin),
-                'tiempo_total': cls.obtener_metricas_tiempo_total(area=area, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
-            }
+            metricas_area = cls.obtener_todas_metricas(area=area, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+            metricas_area.pop('configuracion', None)
             
             # Obtener métricas del paciente desde la tabla metricas_pacientes
             cursor.execute("""
@@ -0,0 +1,148 @@
+import getpass
+from datetime import datetime
+from Back_end.Manejo_DB import ModeloAutenticacion, ModeloPaciente
+
+class TestPendientes:
+    """
+    Clase para verificar contra la base de datos que los pendientes manuales
+    se conservan al editar un paciente desde los formularios.
+    """
+
+    UBICACION_PRUEBA = "Sala de espera - Prueba"
+
+    @staticmethod
+    def imprimir_titulo(texto):
+        """Imprime un título formateado en la consola"""
+        print("\n" + "="*80)
+        print(f" {texto} ".center(80, "="))
+        print("="*80 + "\n")
+
+    @staticmethod
+    def imprimir_resultado(descripcion, esperado, obtenido):
+        """Muestra si un valor obtenido coincide con el esperado"""
+        if esperado == obtenido:
+            print(f"✅ {descripcion}")
+        else:
+            print(f"❌ {descripcion}")
+            print(f"   Esperado: {esperado}")
+            print(f"   Obtenido: {obtenido}")
+        return esperado == obtenido
+
+    @staticmethod
+    def iniciar_sesion():
+        """Abre la sesión con la que el modelo obtiene sus conexiones"""
+        ModeloAutenticacion.establecer_servidor(input("Servidor de la base de datos: "))
+        valido, mensaje = ModeloAutenticacion.validar_credenciales(
+            input("Usuario: "), getpass.getpass("Contraseña: ")
+        )
+        print(mensaje)
+        return valido
+
+    @staticmethod
+    def obtener_manuales(modelo, paciente_id):
+        """Lee los pendientes manuales guardados para un paciente, en orden de creación"""
+        conn = modelo.conectar()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT texto FROM pacientes_pendientes
+            WHERE paciente_id = %s AND origen = 'manual'
+            ORDER BY id
+        """, (paciente_id,))
+        manuales = [fila[0] for fila in cursor.fetchall()]
+        conn.close()
+        return manuales
+
+    @classmethod
+    def probar_extraccion(cls):
+        """
+        Prueba la interpretación del texto de pendientes de los formularios
+        """
+        cls.imprimir_titulo("PRUEBA DE EXTRACCIÓN DE PENDIENTES MANUALES")
+
+        separador = f"{ModeloPaciente.SEPARADOR_PENDIENTES} "
+        texto = separador.join([
+            "Llamar a familiar, hija",
+            "Revisar IMG de tórax",
+            "Realizar RV",
+            "Labs pendientes: HEMOGRAMA, PCR",
+            "IMG pendientes: RX TÓRAX",
+        ])
+        manuales = [pendiente[2] for pendiente in ModeloPaciente.extraer_pendientes_manuales(texto)]
+        return cls.imprimir_resultado(
+            "Se conservan las comas y el texto libre; se descartan automáticos y resúmenes",
+            ["Llamar a familiar, hija", "Revisar IMG de tórax"], manuales
+        )
+
+    @classmethod
+    def probar_edicion_conserva_manuales(cls):
+        """
+        Crea un paciente de prueba con pendientes manuales, lo edita como lo hacen los
+        formularios (con el registro de obtener_registro_por_documento) y verifica que
+        los pendientes manuales se conservan. El paciente se elimina al terminar.
+        """
+        cls.imprimir_titulo("PRUEBA DE EDICIÓN CON PENDIENTES MANUALES")
+
+        modelo = ModeloPaciente()
+        separador = f"{ModeloPaciente.SEPARADOR_PENDIENTES} "
+        manuales = ["Llamar a familiar, hija", "Revisar IMG de tórax"]
+        datos = {
+            'nombre': "Paciente Prueba Pendientes",
+            'documento': f"PRUEBA-{datetime.now():%Y%m%d%H%M%S}",
+            'triage': "3", 'ci': "No realizado", 'labs': "", 'ix': "",
+            'inter': "", 'rv': "", 'conducta': "",
+            'pendientes': separador.join(manuales),
+        }
+
+        resultado = modelo.insertar_en_db(datos, cls.UBICACION_PRUEBA)
+        if not resultado[0]:
+            print(f"❌ No se pudo crear el paciente de prueba: {resultado[1]}")
+            return False
+        paciente_id = resultado[2]
+
+        exito = True
+        try:
+            modelo.recalcular_pendientes(paciente_id)
+            registro = modelo.obtener_registro_por_documento(datos['documento'])[0]
+            exito &= cls.imprimir_resultado(
+                "El formulario de edición recibe solo los pendientes manuales",
+                separador.join(manuales), registro[9]
+            )
+
+            # Edición de otro campo dejando el campo de pendientes como lo cargó el formulario
+            modelo.datos_actualizar_paciente(dict(datos, triage="2", pendientes=registro[9]),
+                                             cls.UBICACION_PRUEBA, registro)
+            modelo.recalcular_pendientes(paciente_id)
+            exito &= cls.imprimir_resultado(
+                "Los pendientes manuales se conservan tras editar otro campo",
+                manuales, cls.obtener_manuales(modelo, paciente_id)
+            )
+
+            # Edición que quita un pendiente manual
+            registro = modelo.obtener_registro_por_documento(datos['documento'])[0]
+            modelo.datos_actualizar_paciente(dict(datos, triage="2", pendientes=manuales[1]),
+                                             cls.UBICACION_PRUEBA, registro)
+            exito &= cls.imprimir_resultado(
+                "Quitar un pendiente del formulario elimina solo ese pendiente",
+                manuales[1:], cls.obtener_manuales(modelo, paciente_id)
+            )
+        finally:
+            conn = modelo.conectar()
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM pacientes WHERE id = %s", (paciente_id,))
+            conn.commit()
+            conn.close()
+            print(f"\nPaciente de prueba {paciente_id} eliminado")
+
+        return exito
+
+# Función para ejecutar pruebas desde la línea de comandos
+if __name__ == "__main__":
+    print("Sistema de prueba de pendientes manuales")
+    print("----------------------------------------")
+
+    if TestPendientes.iniciar_sesion():
+        resultados = [
+            TestPendientes.probar_extraccion(),
+            TestPendientes.probar_edicion_conserva_manuales(),
+        ]
+        print("\n✅ Todas las pruebas pasaron" if all(resultados) else "\n❌ Hay pruebas fallidas")
@@ -0,0 +1,55 @@
+from Back_end.Manejo_DB import ModeloTrazabilidad
+from Back_end.PendientesTest import TestPendientes
+
+class TestTrazabilidad:
+    """
+    Clase para verificar contra la base de datos que la búsqueda de la trazabilidad con
+    el índice FULLTEXT (parser ngram) devuelve las mismas filas que la búsqueda con LIKE.
+    """
+
+    # Términos en español que la lista de stopwords por defecto dejaría fuera del índice
+    TERMINOS_PRUEBA = ["de", "maria", "paciente", "editar paciente"]
+
+    # Límite alto para comparar todas las filas que coinciden, no solo la primera página
+    LIMITE_COMPARACION = 100000
+
+    @staticmethod
+    def buscar_ids(terminos, texto_completo):
+        """Ejecuta la búsqueda por uno de los dos caminos y devuelve los IDs encontrados"""
+        anterior = ModeloTrazabilidad._indice_texto_completo
+        ModeloTrazabilidad._indice_texto_completo = texto_completo
+        try:
+            acciones = ModeloTrazabilidad.obtener_acciones(terminos, limite=TestTrazabilidad.LIMITE_COMPARACION)
+        finally:
+            ModeloTrazabilidad._indice_texto_completo = anterior
+        return [accion[-1] for accion in acciones]
+
+    @classmethod
+    def probar_busqueda_texto_completo(cls):
+        """
+        Compara, término por término, las filas del camino FULLTEXT con las del camino LIKE
+        """
+        TestPendientes.imprimir_titulo("PRUEBA DE BÚSQUEDA EN TRAZABILIDAD (FULLTEXT vs LIKE)")
+
+        exito = True
+        for termino in cls.TERMINOS_PRUEBA:
+            terminos = termino.split()
+            por_like = cls.buscar_ids(terminos, texto_completo=False)
+            por_indice = cls.buscar_ids(terminos, texto_completo=True)
+            exito &= TestPendientes.imprimir_resultado(
+                f"'{termino}': {len(por_like)} filas con LIKE, {len(por_indice)} con el índice",
+                por_like, por_indice
+            )
+
+        if not exito:
+            print("\n⚠️ Revise que ft_trazabilidad se haya creado con innodb_ft_enable_stopword = OFF")
+        return exito
+
+# Función para ejecutar pruebas desde la línea de comandos
+if __name__ == "__main__":
+    print("Sistema de prueba de búsqueda en trazabilidad")
+    print("---------------------------------------------")
+
+    if TestPendientes.iniciar_sesion():
+        resultado = TestTrazabilidad.probar_busqueda_texto_completo()
+        print("\n✅ Todas las pruebas pasaron" if resultado else "\n❌ Hay pruebas fallidas")
@@ -1,7 +1,9 @@
 import os
 import pymysql
 import configparser
-from Back_end.Manejo_DB import ModeloConfiguracion
+import threading
+import time
+from Back_end.Manejo_DB import ModeloConfiguracion, PoolConexiones
 
 class ModeloUsuarios:
     # Definir constantes para los tipos de privilegios
@@ -16,6 +18,122 @@ class ModeloUsuarios:
     PRIVILEGIOS_GLOBALES_ADMIN = ['CREATE USER', 'GRANT OPTION', 'RELOAD']
     PRIVILEGIOS_MYSQL_DB = ['SELECT']
     
+    # Caché de identidades de la sesión: username -> {'id', 'nombre_completo', 'rol', 'estado'}
+    TTL_IDENTIDADES = 300  # Segundos antes de volver a consultar una identidad
+    _identidades = {}
+    _identidades_cargadas_en = {}  # username -> momento de la carga
+    _lock_identidades = threading.Lock()
+    
+    @staticmethod
+    def _rol_principal(rol_admin, rol_medico, rol_visitante):
+        """Rol principal a partir de las banderas de la tabla usuarios"""
+        if rol_admin:
+            return 'admin'
+        elif rol_medico:
+            return 'medico'
+        elif rol_visitante:
+            return 'visitante'
+        return None
+    
+    @staticmethod
+    def _guardar_identidades(filas):
+        """Guarda en la caché filas (id, username, nombre_completo, rol_admin, rol_medico, rol_visitante, estado)"""
+        ahora = time.monotonic()
+        with ModeloUsuarios._lock_identidades:
+            for user_id, username, nombre_completo, rol_admin, rol_medico, rol_visitante, estado in filas:
+                ModeloUsuarios._identidades[username] = {
+                    'id': user_id,
+                    'nombre_completo': nombre_completo,
+                    'rol': ModeloUsuarios._rol_principal(rol_admin, rol_medico, rol_visitante),
+                    'estado': estado
+                }
+                ModeloUsuarios._identidades_cargadas_en[username] = ahora
+    
+    @staticmethod
+    def cargar_identidades():
+        """
+        Carga en la caché todas las identidades de la tabla usuarios con una sola consulta
+        (se llama al iniciar sesión)
+        
+        Returns:
+            int: Número de identidades cargadas
+        """
+        try:
+            conn = ModeloUsuarios.conectar_db()
+            if not conn:
+                return 0
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT id, username, nombre_completo, rol_admin, rol_medico, rol_visitante, estado
+                    FROM usuarios
+                """)
+                filas = cursor.fetchall()
+            ModeloUsuarios.invalidar_identidades()
+            ModeloUsuarios._guardar_identidades(filas)
+            print(f"✅ Caché de identidades cargada ({len(filas)} usuarios)")
+            return len(filas)
+        except Exception as e:
+            print(f"Error al cargar identidades de usuarios: {str(e)}")
+            return 0
+    
+    @staticmethod
+    def invalidar_identidades(username=None):
+        """
+        Descarta identidades de la caché
+        
+        Args:
+            username: Usuario a descartar (si es None, se vacía toda la caché)
+        """
+        with ModeloUsuarios._lock_identidades:
+            if username is None:
+                ModeloUsuarios._identidades = {}
+                ModeloUsuarios._identidades_cargadas_en = {}
+            else:
+                ModeloUsuarios._identidades.pop(username, None)
+                ModeloUsuarios._identidades_cargadas_en.pop(username, None)
+    
+    @staticmethod
+    def obtener_identidad(username):
+        """
+        Obtiene la identidad de un usuario desde la caché, consultándola si no está o caducó
+        
+        Args:
+            username: Nombre de usuario
+            
+        Returns:
+            dict: {'id', 'nombre_completo', 'rol', 'estado'} o None si no está en la tabla usuarios
+            
+        Raises:
+            ConnectionError: Si la identidad no está en caché y no hay conexión disponible
+        """
+        if not username:
+            return None
+        
+        with ModeloUsuarios._lock_identidades:
+            cargada_en = ModeloUsuarios._identidades_cargadas_en.get(username)
+            if cargada_en is not None and time.monotonic() - cargada_en < ModeloUsuarios.TTL_IDENTIDADES:
+                return ModeloUsuarios._identidades[username]
+        
+        conn = ModeloUsuarios.conectar_db()
+        if not conn:
+            raise ConnectionError("No se pudo conectar a la base de datos")
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, username, nombre_completo, rol_admin, rol_medico, rol_visitante, estado
+                FROM usuarios
+                WHERE username = %s
+            """, (username,))
+            fila = cursor.fetchone()
+        
+        if not fila:
+            ModeloUsuarios.invalidar_identidades(username)
+            return None
+        ModeloUsuarios._guardar_identidades([fila])
+        with ModeloUsuarios._lock_identidades:
+            return ModeloUsuarios._identidades.get(username)
+    
     @staticmethod
     def get_admin_credentials():
         """
@@ -165,6 +283,7 @@ class ModeloUsuarios:
                 
                 conn_app.commit()
                 conn_app.close()
+                ModeloUsuarios.invalidar_identidades(username)
             except Exception as e:
                 print(f"Error al actualizar tabla usuarios: {str(e)}")
             
@@ -416,6 +535,7 @@ class ModeloUsuarios:
             
             conn_app.commit()
             conn_app.close()
+            ModeloUsuarios.invalidar_identidades(username)
             
             # Ahora eliminar el usuario de MySQL
             conn_mysql = pymysql.connect(
@@ -741,6 +861,9 @@ class ModeloUsuarios:
                     usuarios.append((user_id, username, 'inactivo', rol))
             
             conn.close()
+            
+            # La sincronización con MySQL puede haber cambiado estados y altas de usuarios
+            ModeloUsuarios.invalidar_identidades()
             return usuarios
             
         except Exception as e:
@@ -805,6 +928,7 @@ class ModeloUsuarios:
             
             conn.commit()
             conn.close()
+            ModeloUsuarios.invalidar_identidades(username)
             
             return True
             
@@ -816,7 +940,7 @@ class ModeloUsuarios:
     def verificar_rol_admin(username):
         """
         Verifica si un usuario tiene rol de administrador
-        consultando directamente la tabla usuarios
+        consultando la caché de identidades
         
         Args:
             username: Nombre del usuario a verificar
@@ -830,7 +954,7 @@ class ModeloUsuarios:
     def verificar_rol_medico(username):
         """
         Verifica si un usuario tiene rol de médico
-        consultando directamente la tabla usuarios
+        consultando la caché de identidades
         
         Args:
             username: Nombre del usuario a verificar
@@ -842,7 +966,7 @@ class ModeloUsuarios:
                  
     @staticmethod
     def conectar_db():
-        """Establece conexión con la base de datos"""
+        """Obtiene una conexión del pool de la sesión; close() la devuelve al pool"""
         try:
             host_config = ModeloConfiguracion.cargar_configuracion()
             
@@ -853,7 +977,7 @@ class ModeloUsuarios:
             # Si no hay credenciales disponibles, usar admin_credentials como fallback
             if not credenciales.get('usuario') or not credenciales.get('contrasena'):
                 admin_credentials = ModeloUsuarios.get_admin_credentials()
-                conn = pymysql.connect(
+                conn = PoolConexiones.obtener(
                     host=host_config,
                     user=admin_credentials['user'],
                     password=admin_credentials['password'],
@@ -861,7 +985,7 @@ class ModeloUsuarios:
                 )
             else:
                 # Usar las credenciales del usuario autenticado
-                conn = pymysql.connect(
+                conn = PoolConexiones.obtener(
                     host=host_config,
                     user=credenciales['usuario'],
                     password=credenciales['contrasena'],
@@ -875,7 +999,7 @@ class ModeloUsuarios:
     @staticmethod
     def obtener_rol_usuario(username):
         """
-        Obtiene el rol de un usuario directamente de la tabla usuarios.
+        Obtiene el rol de un usuario desde la caché de identidades (tabla usuarios).
         
         Args:
             username: Nombre de usuario
@@ -887,35 +1011,12 @@ class ModeloUsuarios:
             return 'visitante'  # Default role if no username provided
             
         try:
-            # Conexión a la BD
-            conn = ModeloUsuarios.conectar_db()
-            if not conn:
-                return 'visitante'  # Default role if connection fails
-                
-            cursor = conn.cursor()
+            # Consulta en memoria (la caché se carga al iniciar sesión)
+            identidad = ModeloUsuarios.obtener_identidad(username)
             
-            # Consultar los valores de los roles del usuario
-            cursor.execute("""
-                SELECT rol_admin, rol_medico, rol_visitante 
-                FROM usuarios 
-                WHERE username = %s
-            """, (username,))
-            
-            resultado = cursor.fetchone()
-            conn.close()
-            
-            # Si el usuario existe en la tabla, determinar su rol principal
-            if resultado:
-                rol_admin, rol_medico, rol_visitante = resultado
-                
-                if rol_admin:
-                    return 'admin'
-                elif rol_medico:
-                    return 'medico'
-                elif rol_visitante:
-                    return 'visitante'
-                else:
-                    return 'visitante'  # Default to visitante if no role is set
+            # Si el usuario existe en la tabla, devolver su rol principal
+            if identidad:
+                return identidad['rol'] or 'visitante'  # Default to visitante if no role is set
                     
             # Si no está en la tabla usuarios, intentar detectar privilegios y crearlo
             # Este es un caso de recuperación para usuarios antiguos
@@ -1074,4 +1074,159 @@ VALUES
 
 SET SQL_SAFE_UPDATES = 0;
 DELETE FROM trazabilidad;
-SET SQL_SAFE_UPDATES = 1
\ No newline at end of file
+SET SQL_SAFE_UPDATES = 1;
+
+-- Marca de último cambio por paciente: las vistas sondean COUNT(*) y MAX(updated_at) por área
+-- y solo releen las filas modificadas en lugar de recargar toda la tabla
+ALTER TABLE pacientes ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6) COMMENT 'Momento de la última modificación del registro' AFTER alta_timestamp;
+CREATE INDEX idx_pacientes_updated_at ON pacientes(updated_at);
+CREATE INDEX idx_pacientes_ubicacion_updated_at ON pacientes(ubicacion, updated_at);
+
+-- Censo activo: las vistas en vivo excluyen a los pacientes dados de alta filtrando por conducta y área
+CREATE INDEX idx_pacientes_censo ON pacientes(conducta, ubicacion, ingreso);
+
+-- Área normalizada: columna generada a partir de ubicacion ('Área - Cubículo') para filtrar con
+-- `area IN (...)` sobre un índice en lugar de `ubicacion LIKE '%area%'`, que obliga a recorrer toda la tabla.
+-- Va al final de la tabla para no desplazar las posiciones que leen los SELECT * existentes
+ALTER TABLE pacientes ADD COLUMN area VARCHAR(50) GENERATED ALWAYS AS (TRIM(SUBSTRING_INDEX(ubicacion, ' - ', 1))) STORED COMMENT 'Área derivada de ubicacion';
+CREATE INDEX idx_pacientes_area_ingreso ON pacientes(area, ingreso);
+DROP INDEX idx_pacientes_ubicacion_updated_at ON pacientes;
+CREATE INDEX idx_pacientes_area_updated_at ON pacientes(area, updated_at);
+DROP INDEX idx_pacientes_censo ON pacientes;
+CREATE INDEX idx_pacientes_censo ON pacientes(conducta, area, ingreso);
+
+-- Rollup histórico de métricas por hora de ingreso, área, clase de triage y serie (etapa, estancia o población de SLA).
+-- Se actualiza de forma incremental en cada cálculo de métricas, así los gráficos de línea temporal, barras y SLA
+-- leen unas pocas celdas agregadas en lugar de recorrer la historia de pacientes
+CREATE TABLE metricas_rollup (
+    serie VARCHAR(30) NOT NULL,
+    hora DATETIME NOT NULL COMMENT 'Hora de ingreso truncada',
+    area VARCHAR(50) NOT NULL DEFAULT '',
+    clase_triage VARCHAR(5) NOT NULL DEFAULT '',
+    pacientes INT NOT NULL DEFAULT 0,
+    suma_minutos BIGINT NOT NULL DEFAULT 0,
+    cumplen_sla INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (serie, hora, area, clase_triage)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Aporte vigente de cada paciente al rollup: permite restar el valor anterior cuando cambian sus tiempos
+CREATE TABLE metricas_rollup_aportes (
+    paciente_id INT NOT NULL,
+    serie VARCHAR(30) NOT NULL,
+    hora DATETIME NOT NULL,
+    area VARCHAR(50) NOT NULL DEFAULT '',
+    clase_triage VARCHAR(5) NOT NULL DEFAULT '',
+    minutos INT NOT NULL,
+    cumple_sla TINYINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (paciente_id, serie)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Sketch de cuantiles por celda del rollup: conteo de valores por cubeta logarítmica (error relativo < 1 %).
+-- Fusionar el sketch de cualquier rango es sumar conteos por cubeta, sin leer los tiempos de cada paciente
+ALTER TABLE metricas_rollup_aportes ADD COLUMN cubeta SMALLINT NOT NULL DEFAULT 0 COMMENT 'Cubeta del sketch de cuantiles en que cae minutos';
+CREATE TABLE metricas_rollup_cuantiles (
+    serie VARCHAR(30) NOT NULL,
+    hora DATETIME NOT NULL,
+    area VARCHAR(50) NOT NULL DEFAULT '',
+    clase_triage VARCHAR(5) NOT NULL DEFAULT '',
+    cubeta SMALLINT NOT NULL,
+    pacientes INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (serie, hora, area, clase_triage, cubeta)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Versión de los catálogos de laboratorios e imágenes. La aplicación guarda los catálogos en memoria
+-- durante la sesión y solo los vuelve a leer cuando cambia esta versión (los triggers la incrementan)
+CREATE TABLE catalogo_version (
+    catalogo VARCHAR(30) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 1
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+INSERT INTO catalogo_version (catalogo, version) VALUES ('laboratorios', 1), ('imagenes', 1);
+
+CREATE TRIGGER trg_laboratorios_version_ins AFTER INSERT ON laboratorios FOR EACH ROW
+    UPDATE catalogo_version SET version = version + 1 WHERE catalogo = 'laboratorios';
+CREATE TRIGGER trg_laboratorios_version_upd AFTER UPDATE ON laboratorios FOR EACH ROW
+    UPDATE catalogo_version SET version = version + 1 WHERE catalogo = 'laboratorios';
+CREATE TRIGGER trg_laboratorios_version_del AFTER DELETE ON laboratorios FOR EACH ROW
+    UPDATE catalogo_version SET version = version + 1 WHERE catalogo = 'laboratorios';
+CREATE TRIGGER trg_imagenes_version_ins AFTER INSERT ON imagenes FOR EACH ROW
+    UPDATE catalogo_version SET version = version + 1 WHERE catalogo = 'imagenes';
+CREATE TRIGGER trg_imagenes_version_upd AFTER UPDATE ON imagenes FOR EACH ROW
+    UPDATE catalogo_version SET version = version + 1 WHERE catalogo = 'imagenes';
+CREATE TRIGGER trg_imagenes_version_del AFTER DELETE ON imagenes FOR EACH ROW
+    UPDATE catalogo_version SET version = version + 1 WHERE catalogo = 'imagenes';
+
+-- Identificador único de cada registro de trazabilidad. La aplicación escribe la trazabilidad en lotes
+-- desde una cola local y puede reintentar un lote ya escrito: el índice único evita filas duplicadas
+ALTER TABLE trazabilidad
+    ADD COLUMN id_registro CHAR(32) NULL,
+    ADD UNIQUE INDEX idx_id_registro (id_registro);
+
+-- Índice compuesto para la paginación por cursor de la trazabilidad (ORDER BY fecha_hora DESC, id DESC)
+ALTER TABLE trazabilidad ADD INDEX idx_fecha_id (fecha_hora, id);
+
+-- Índice de texto completo para la búsqueda de la trazabilidad. El parser ngram indexa subcadenas,
+-- así que MATCH ... AGAINST (+"término" IN BOOLEAN MODE) sustituye a LIKE %término% sin recorrer la tabla.
+-- Las stopwords se desactivan al crear el índice: con la lista por defecto (inglés) el parser ngram
+-- descarta todo bigrama que contenga "a", "i", "de", "en", "la"... y la mayoría de las palabras en
+-- español quedarían sin indexar. Si el índice se reconstruye, repetir el SET antes del ALTER/OPTIMIZE
+SET SESSION innodb_ft_enable_stopword = OFF;
+ALTER TABLE trazabilidad
+    ADD FULLTEXT INDEX ft_trazabilidad (usuario, paciente_afectado, detalles_cambio) WITH PARSER ngram;
+SET SESSION innodb_ft_enable_stopword = ON;
+
+-- Pendientes estructurados: una fila por pendiente en lugar del texto separado por comas de
+-- pacientes.pendientes. La aplicación arma el texto que muestran las vistas al leer y recalcula los
+-- pendientes automáticos sin interpretar cadenas. La columna pacientes.pendientes ya no se lee ni se
+-- escribe; queda solo como respaldo del texto anterior a la migración
+CREATE TABLE pacientes_pendientes (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    paciente_id INT NOT NULL,
+    tipo VARCHAR(20) NOT NULL COMMENT 'manual, triage, ci, inter, rv, laboratorio o imagen',
+    origen VARCHAR(20) NOT NULL DEFAULT 'automatico' COMMENT 'automatico (reglas) o manual (formulario)',
+    codigo_ref VARCHAR(50) NULL COMMENT 'Código del laboratorio o imagen pendiente',
+    texto VARCHAR(255) NULL COMMENT 'Texto del pendiente; NULL en laboratorios e imágenes',
+    creado_en DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE,
+    INDEX idx_pendientes_paciente (paciente_id, tipo),
+    INDEX idx_pendientes_referencia (tipo, codigo_ref)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Migración de los pendientes manuales: el texto anterior no se puede separar de forma fiable
+-- (los pendientes y los nombres de exámenes pueden contener comas), así que se conserva como un único
+-- pendiente manual, sin los pendientes automáticos y sin los resúmenes "Labs pendientes:" /
+-- "IMG pendientes:", que el formato anterior siempre dejaba al final
+INSERT INTO pacientes_pendientes (paciente_id, tipo, origen, texto)
+SELECT id, 'manual', 'manual', LEFT(texto, 255)
+FROM (
+    SELECT id, REGEXP_REPLACE(
+        REGEXP_REPLACE(
+            REGEXP_REPLACE(pendientes, '(^|, )(Labs|IMG) pendientes: .*$', ''),
+            '(^|, )(Realizar triage|Valoración CI|Abrir Interconsulta|Respuesta Interconsulta|Realizar RV)(?=, |$)', ''),
+        '^[, ]+|[, ]+$', '') AS texto
+    FROM pacientes
+    WHERE pendientes IS NOT NULL AND pendientes <> ''
+) legado
+WHERE texto <> '';
+
+-- Pendientes automáticos de los pacientes existentes, con las mismas reglas que aplica la aplicación
+INSERT INTO pacientes_pendientes (paciente_id, tipo, origen, texto)
+SELECT id, 'triage', 'automatico', 'Realizar triage' FROM pacientes
+    WHERE triage IN ('', 'No realizado')
+UNION ALL
+SELECT id, 'ci', 'automatico', 'Valoración CI' FROM pacientes
+    WHERE triage NOT IN ('', 'No realizado') AND ci = 'No realizado'
+UNION ALL
+SELECT id, 'inter', 'automatico', IF(inter = 'No se ha abierto', 'Abrir Interconsulta', 'Respuesta Interconsulta') FROM pacientes
+    WHERE ci = 'Realizado' AND inter IN ('No se ha abierto', 'Abierta')
+UNION ALL
+SELECT id, 'rv', 'automatico', 'Realizar RV' FROM pacientes
+    WHERE ci = 'Realizado' AND rv = 'No realizado';
+
+INSERT INTO pacientes_pendientes (paciente_id, tipo, origen, codigo_ref)
+SELECT p.id, 'laboratorio', 'automatico', pl.codigo_lab
+FROM pacientes p JOIN pacientes_laboratorios pl ON pl.paciente_id = p.id
+WHERE p.ci = 'Realizado' AND p.labs IN ('No se ha realizado', 'En espera de resultados')
+UNION ALL
+SELECT p.id, 'imagen', 'automatico', pi.codigo_ix
+FROM pacientes p JOIN pacientes_ixs pi ON pi.paciente_id = p.id
+WHERE p.ci = 'Realizado' AND p.ix IN ('No se ha realizado', 'En espera de resultados');
\ No newline at end of file
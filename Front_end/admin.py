@@ -1,5 +1,5 @@
 from PyQt5.QtWidgets import (QMainWindow, QComboBox, QWidget, QVBoxLayout, QHBoxLayout, 
-                           QTableWidget, QTableWidgetItem, QPushButton, 
+                           QTableWidget, QTableWidgetItem, QAbstractItemView, QPushButton, 
                            QLabel, QMessageBox, QMenu, QFrame, QLayout,
                            QLineEdit, QFormLayout, QDialog, QListWidget, QListWidgetItem,
                            QHeaderView, QSizePolicy, QDesktopWidget, QApplication, QToolTip, 
@@ -17,7 +17,7 @@ from Front_end.styles.animation_components import SplashScreen, FadeAnimation
 from Front_end.styles.styles import TABLE_STYLES_UPDATED, SCROLLBAR_STYLE
 from Front_end.styles.components import StyledMessageBox, StyledButton, StyledDialog, FormField
 # Importar componentes de tablas
-from Front_end.styles.table_components import Estado_delegado_circulo, TextDelegate, Personalizado_Columnas, configurar_tabla_estandar
+from Front_end.styles.table_components import Estado_delegado_circulo, TextDelegate, TablaPacientes, VistaCensoMixin
 # Importar componentes de header
 from Front_end.styles.header_components import HeaderCombinado
 # Importar el nuevo menú lateral
@@ -29,11 +29,14 @@ from Front_end.styles.font_utils import aplicar_fuentes_sistema
 from Front_end.styles.Frontend_utils import DialogoFiltrar, LabsSelector, IxsSelector
 from Front_end.styles.styles import COLORS, BORDER_RADIUS, MENU_STYLES
 
-class VistaAdmins(QMainWindow):
+class VistaAdmins(VistaCensoMixin, QMainWindow):
     def __init__(self, login_interface):
         super().__init__()
         self.login_interface = login_interface
         self.modelo = ModeloPaciente()
+        
+        # Programador de alarmas: despierta solo cuando vence el próximo plazo
+        self.iniciar_alarmas()
         self.setWindowFlags(Qt.FramelessWindowHint)
         self.setAttribute(Qt.WA_TranslucentBackground)
         
@@ -129,10 +132,8 @@ class VistaAdmins(QMainWindow):
         # Cerrar la pantalla de carga antes de mostrar la interfaz principal
         self.splash.accept()
         
-        # Ahora que la interfaz está creada, inicializar el timer
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.actualizar_tabla)
-        self.timer.start(5000)
+        # Ahora que la interfaz está creada, inicializar el timer de sondeo adaptativo
+        self.iniciar_sondeo()
         
         # Animación de entrada
         self.animation = QPropertyAnimation(self.opacity_effect, b"opacity")
@@ -144,7 +145,7 @@ class VistaAdmins(QMainWindow):
         
         # Actualizar tabla por primera vez después de que la interfaz está completa
         self.actualizar_tabla()
-        self.modelo.datos_actualizados.connect(self.actualizar_tabla)
+        self.modelo.datos_actualizados.connect(self.sondear_cambios)
         
         # Después de crear_interfaz o al final de init
         self.configurar_menu_lateral()
@@ -356,19 +357,15 @@ class VistaAdmins(QMainWindow):
         
         # Iterar sobre todas las filas de la tabla
         for i in range(self.tabla.rowCount()):
-            # Verificar si hay datos en las celdas relevantes
-            nombre_item = self.tabla.item(i, 0)
-            documento_item = self.tabla.item(i, 1)
+            # Leer el texto de las celdas relevantes directamente del modelo
+            nombre = self.tabla.texto(i, 0).lower()
+            documento = self.tabla.texto(i, 1).lower()
             
-            if nombre_item and documento_item:
-                nombre = nombre_item.text().lower()
-                documento = documento_item.text().lower()
-                
-                # Mostrar fila si el texto de búsqueda está en el nombre o documento
-                if self.texto_busqueda_actual in nombre or self.texto_busqueda_actual in documento:
-                    self.tabla.setRowHidden(i, False)
-                else:
-                    self.tabla.setRowHidden(i, True)
+            # Mostrar fila si el texto de búsqueda está en el nombre o documento
+            if self.texto_busqueda_actual in nombre or self.texto_busqueda_actual in documento:
+                self.tabla.setRowHidden(i, False)
+            else:
+                self.tabla.setRowHidden(i, True)
 
     def crear_header_combinado(self):
         # Crear un contenedor combinado para el título y el logo
@@ -478,9 +475,7 @@ class VistaAdmins(QMainWindow):
         contenedor_tabla = TablaContainer(self, 0.96, 0.638)
         
         # Crear la tabla
-        self.tabla = QTableWidget()
-        self.tabla.setColumnCount(len(self.headers))
-        self.tabla.setHorizontalHeaderLabels(self.headers)
+        self.tabla = TablaPacientes(self.headers)
         self.tabla.setContextMenuPolicy(Qt.CustomContextMenu)
         self.tabla.customContextMenuRequested.connect(self.mostrar_menu_contextual)
         
@@ -508,16 +503,15 @@ class VistaAdmins(QMainWindow):
                 self.tabla.setItemDelegateForColumn(col, text_delegate)
         
         # Enable smooth scrolling
-        self.tabla.setVerticalScrollMode(QTableWidget.ScrollPerPixel)
-        self.tabla.setHorizontalScrollMode(QTableWidget.ScrollPerPixel)
+        self.tabla.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.tabla.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
         
         # Style settings for the table
         self.tabla.setAlternatingRowColors(False)
-        self.tabla.setSelectionBehavior(QTableWidget.SelectRows)
-        self.tabla.setSelectionMode(QTableWidget.SingleSelection)
-        self.tabla.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tabla.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.tabla.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.tabla.clearSelection()
-        self.tabla.setCurrentCell(-1, -1)
         
         # Usar la nueva fuente para la tabla
         self.tabla.setFont(QFont("Segoe UI", 10))
@@ -529,6 +523,9 @@ class VistaAdmins(QMainWindow):
         
         self.tabla.setWordWrap(True)
         
+        # Altura fija para todas las filas basada en el tamaño del círculo
+        self.tabla.establecer_altura_filas(circle_delegate.circle_size + 20)  # +20 para padding adicional
+        
         # Agregar la tabla al contenedor
         contenedor_tabla.set_tabla(self.tabla)
         
@@ -543,6 +540,7 @@ class VistaAdmins(QMainWindow):
         """Sobrescribir el evento de cierre para detener el timer"""
         if hasattr(self, 'timer'):
             self.timer.stop()
+        self.alarmas.detener()
         # Continuar con el cierre normal sin mostrar pantalla de carga
         super().closeEvent(event)
     
@@ -550,7 +548,7 @@ class VistaAdmins(QMainWindow):
     
     def iniciar_actualizacion_periodica(self):
         self.timer = QTimer()
-        self.timer.timeout.connect(self.actualizar_tabla)
+        self.timer.timeout.connect(self.sondear_cambios)
 
     def configurar_anchos_columnas(self):
         """Configura los anchos de las columnas de la tabla para asegurar consistencia"""
@@ -622,6 +620,12 @@ class VistaAdmins(QMainWindow):
         self.login_interface.reiniciar_login()
             
     def actualizar_tabla(self):
+        """
+        Actualiza la tabla con los pacientes del filtro actual.
+        
+        Returns:
+            bool: True si los datos cambiaron desde la última actualización
+        """
         try:
             # Verificar que la tabla exista antes de intentar usarla
             if not hasattr(self, 'tabla'):
@@ -640,81 +644,33 @@ class VistaAdmins(QMainWindow):
             if self.filtro_fecha_activo and self.fecha_inicio and self.fecha_fin:
                 fecha_inicio_str = self.fecha_inicio.toString("yyyy-MM-dd HH:mm:ss")
                 fecha_fin_str = self.fecha_fin.toString("yyyy-MM-dd HH:mm:ss")
-                datos = self.modelo.obtener_datos_pacientes_filtrados(
+                datos, hubo_cambios = self.modelo.obtener_cambios_pacientes(
                     self.areas_filtradas, 
                     fecha_inicio_str,
                     fecha_fin_str
                 )
             else:
-                datos = self.modelo.obtener_datos_pacientes_filtrados(self.areas_filtradas)
+                # Sin rango de fechas se muestra el censo activo (sin pacientes dados de alta)
+                datos, hubo_cambios = self.modelo.obtener_cambios_pacientes(self.areas_filtradas, solo_activos=True)
             
-            self.tabla.setRowCount(0)
+            # Sin cambios en la base de datos no hay nada que hacer: el programador avisa
+            # por su cuenta cuando vence una alarma
+            if not hubo_cambios and not self.primera_carga:
+                return False
             
-            # Obtener celdas con alarma desde el modelo
-            alarm_cells = self.modelo.verificar_alarmas(datos)
-            conducta_alarm_cells = self.modelo.verificar_alarma_conducta(datos)
-            indice_triage = self.headers.index('Triage')
-            indice_pendientes = self.headers.index('Pendientes')  # Índice de la columna pendientes
-            indice_conducta = self.headers.index('Conducta')  # Índice de la columna conducta
+            # Aplicar solo las diferencias: filas nuevas, eliminadas y celdas que cambiaron
+            indice_id = ModeloPaciente.COLUMNAS_VISTA.index('id')
+            self.tabla.sincronizar(
+                [(fila[indice_id], [str(valor) for valor in fila[:12]]) for fila in datos]  # Primeros 12 campos para la tabla
+            )
+            
+            # Actualizar alarmas de CI y conducta; con el censo vacío se apagan las anteriores
+            self.actualizar_alarmas(datos)
             
             if datos:
-                for row_idx, fila in enumerate(datos):
-                    fila_actual = list(fila[:12])  # Primeros 12 campos para la tabla
-                    
-                    # Insertar fila en la tabla
-                    self.tabla.insertRow(row_idx)
-                    for col, valor in enumerate(fila_actual):
-                        # Verificar si es una columna que debe usar el delegado especial
-                        if col == indice_triage or col == self.headers.index('CI') or \
-                           col == self.headers.index('Labs') or col == self.headers.index('IMG') or \
-                           col == self.headers.index('Interconsulta') or col == self.headers.index('RV') or \
-                           col == self.headers.index('Conducta'):
-                            # Usar un ítem personalizado para que funcione con el delegado
-                            item = Personalizado_Columnas("", str(valor))
-                            self.tabla.setItem(row_idx, col, item)
-                            
-                            # Centrar específicamente el texto de la columna Conducta
-                            if col == indice_conducta:
-                                item.setTextAlignment(Qt.AlignCenter)
-                        # elif col == indice_pendientes:
-                        #     # Para la columna de pendientes, asegurarse de que se muestre exactamente como viene de la BD
-                        #     # sin ningún procesamiento adicional
-                        #     pendientes_texto = str(valor) if valor is not None else ""
-                        #     item = QTableWidgetItem(pendientes_texto)
-                        #     item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)  # Alineación a la izquierda para mejor legibilidad
-                        #     self.tabla.setItem(row_idx, col, item)
-                        else:
-                            # Para texto normal
-                            item = QTableWidgetItem(str(valor))
-                            item.setTextAlignment(Qt.AlignCenter | Qt.AlignVCenter)
-                            self.tabla.setItem(row_idx, col, item)
-                
-                # Actualizar alarmas en el delegate para CI
-                ci_col = self.headers.index('CI')
-                delegate = self.tabla.itemDelegateForColumn(ci_col)
-                if isinstance(delegate, Estado_delegado_circulo):
-                    delegate.set_alarm_cells(alarm_cells)
-                
-                # Actualizar alarmas de conducta
-                conducta_col = self.headers.index('Conducta')
-                delegate = self.tabla.itemDelegateForColumn(conducta_col)
-                if isinstance(delegate, Estado_delegado_circulo):
-                    delegate.set_conducta_alarm_cells(conducta_alarm_cells)
-                
                 # Aplicar configuración de anchos de columna después de cargar datos
                 self.configurar_anchos_columnas()
                 
-                # Establecer una altura fija para todas las filas basada en el tamaño del círculo
-                circle_delegate = self.tabla.itemDelegateForColumn(indice_triage)
-                if isinstance(circle_delegate, Estado_delegado_circulo):
-                    row_height = circle_delegate.circle_size + 20  # +20 para padding adicional
-                    for row in range(self.tabla.rowCount()):
-                        self.tabla.setRowHeight(row, row_height)
-                
-                # Aplicar colores a filas específicas
-                for row_idx, fila in enumerate(datos):
-                    self.colorear_fila(row_idx, fila)
-                
             # Después de actualizar la tabla, volver a aplicar el filtro si hay texto de búsqueda
             if hasattr(self, 'texto_busqueda_actual') and self.texto_busqueda_actual:
                 self.aplicar_filtro_busqueda()
@@ -724,29 +680,13 @@ class VistaAdmins(QMainWindow):
                 self.primera_carga = False
                 if 'splash' in locals():
                     splash.accept()
+            return True
         except Exception as e:
             self.mostrar_mensaje_informacion("Error", f"Error al actualizar la tabla: {str(e)}", QMessageBox.Critical)
+            return False
         finally:
             self.modelo.cierre_db()
 
-    def colorear_fila(self, fila, datos):
-        columnas_estados = {
-            'Triage': self.headers.index('Triage'),
-            'CI': self.headers.index('CI'),
-            'Labs': self.headers.index('Labs'),
-            'IMG': self.headers.index('IMG'),  # Corregido de 'IX' a 'IMG'
-            'Interconsulta': self.headers.index('Interconsulta'),
-            'RV': self.headers.index('RV')
-        }
-        
-        for campo, indice in columnas_estados.items():
-            try:
-                valor = datos[indice]
-                custom_item = Personalizado_Columnas("", valor)
-                self.tabla.setItem(fila, indice, custom_item)
-            except Exception as e:
-                self.mostrar_mensaje_informacion("Error", f"Error al colorear celda {campo}: {str(e)}", QMessageBox.Critical)
-
     def hex_to_qcolor(self, hex_color):
         hex_color = hex_color.lstrip('#')
         return QColor(int(hex_color[:2], 16), 
@@ -1108,6 +1048,8 @@ class VistaAdmins(QMainWindow):
                 label_text, key, es_requerido, valor_inicial = campo
                 label, entrada = FormField.create_line_edit(label_text, es_requerido, False, valor_inicial)
                 self.entradas[key] = entrada
+                if key == "pendientes":
+                    entrada.setPlaceholderText(f"Separe los pendientes con {ModeloPaciente.SEPARADOR_PENDIENTES}")
                 form_layout.addRow(label, entrada)
         
         # Ubicación (área y cubículo)
@@ -1339,27 +1281,11 @@ class VistaAdmins(QMainWindow):
             exito, mensaje, paciente_id = self.modelo.datos_guardar_paciente(datos=datos, ubicacion=ubicacion)
             
             if exito and paciente_id:
-                # Actualizar timestamps para estados iniciales (que no sean vacíos)
-                if datos['triage']:
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'triage', datos['triage'])
-                    
-                if datos['ci']:
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'ci', datos['ci'])
-                    
-                if datos['labs']:
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'labs', datos['labs'])
-                    
-                if datos['ix']:
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'ix', datos['ix'])
-                    
-                if datos['inter']:
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'inter', datos['inter'])
-                    
-                if datos['rv']:
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'rv', datos['rv'])
-                    
-                if datos['conducta']:
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'conducta', datos['conducta'])
+                # Sellar los timestamps de los estados iniciales (que no sean vacíos) en un solo UPDATE
+                self.modelo.actualizar_estados_con_timestamp(
+                    paciente_id,
+                    {campo: datos[campo] for campo in self.modelo.CAMPOS_ESTADO if datos.get(campo)}
+                )
                 # Actualizar la tabla y mostrar mensaje de éxito
                 dialogo.close()
                 self.actualizar_tabla()
@@ -1394,7 +1320,7 @@ class VistaAdmins(QMainWindow):
 
     def iniciar_edicion_por_menu_contextual(self, fila):
         if fila >= 0:
-            documento = self.tabla.item(fila, 1).text()
+            documento = self.tabla.texto(fila, 1)
             
             registros = self.modelo.obtener_registro_por_documento(documento=documento)
             if not registros:
@@ -1493,6 +1419,8 @@ class VistaAdmins(QMainWindow):
                 valor_actual = registro[index] if registro[index] else ""
                 label, entrada = FormField.create_line_edit(label_text, es_requerido, readonly, valor_actual)
                 self.entradas[key] = entrada
+                if key == "pendientes":
+                    entrada.setPlaceholderText(f"Separe los pendientes con {ModeloPaciente.SEPARADOR_PENDIENTES}")
                 form_layout.addRow(label, entrada)
         
         # Ubicación (área y cubículo)
@@ -1756,84 +1684,62 @@ class VistaAdmins(QMainWindow):
             ):
                 return
 
-            # Actualizar en la base de datos
-            exito, mensaje = self.modelo.datos_actualizar_paciente(datos=datos, ubicacion=ubicacion, registro=registro_original)
+            # Actualizar en la base de datos: datos, estados, laboratorios, imágenes, pendientes,
+            # métricas y trazabilidad comparten una conexión y se confirman en un solo commit.
+            # Los avisos se muestran al terminar para no dejar la transacción abierta en un diálogo.
+            avisos = []
+            with self.modelo.transaccion():
+                exito, mensaje = self.modelo.datos_actualizar_paciente(datos=datos, ubicacion=ubicacion, registro=registro_original)
+                
+                if exito:
+                    paciente_id = registro_original[13]  # ID en la posición 13
+                    
+                    # Obtener laboratorios originales
+                    labs_actuales = self.modelo.obtener_laboratorios_paciente(paciente_id)
+                    labs_actuales_codigos = [lab[0] for lab in labs_actuales] if labs_actuales else []
+                    
+                    # Comprobar si los laboratorios han cambiado
+                    labs_cambiados = set(nuevos_labs) != set(labs_actuales_codigos)
+                    
+                    # Solo guardar laboratorios si han cambiado o si triage y CI están realizados
+                    if labs_cambiados:
+                        if datos['triage'] in ["1", "2", "3", "4", "5"] and datos['ci'] == "Realizado":
+                            labs_exito, labs_mensaje = self.modelo.guardar_laboratorios_paciente(paciente_id, nuevos_labs)
+                            if not labs_exito:
+                                avisos.append(("Error en laboratorios", labs_mensaje, QMessageBox.Critical))
+                        else:
+                            # Si triage o CI no están realizados y hay laboratorios nuevos, mostrar mensaje
+                            if nuevos_labs:
+                                avisos.append(("Información", "Los laboratorios no se pueden guardar hasta que el triage y CI estén realizados", None))
+                    
+                    # Obtener imágenes originales
+                    imgs_actuales = self.modelo.obtener_imagenes_paciente(paciente_id)
+                    imgs_actuales_codigos = [img[0] for img in imgs_actuales] if imgs_actuales else []
+                    
+                    # Comprobar si las imágenes han cambiado
+                    imgs_cambiadas = set(nuevas_imgs) != set(imgs_actuales_codigos)
+                    
+                    # Solo guardar imágenes si han cambiado o si triage y CI están realizados
+                    if imgs_cambiadas:
+                        if datos['triage'] in ["1", "2", "3", "4", "5"] and datos['ci'] == "Realizado":
+                            img_exito, img_mensaje = self.modelo.guardar_imagenes_paciente(paciente_id, nuevas_imgs)
+                            if not img_exito:
+                                avisos.append(("Error en imágenes", img_mensaje, QMessageBox.Critical))
+                        else:
+                            # Si triage o CI no están realizados y hay imágenes nuevas, mostrar mensaje
+                            if nuevas_imgs:
+                                avisos.append(("Información", "Las imágenes no se pueden guardar hasta que el triage y CI estén realizados", None))
+                    
+                    # Recalcular los pendientes automáticos con el estado ya guardado
+                    self.modelo.recalcular_pendientes(paciente_id)
+            
+            for titulo, texto, icono in avisos:
+                if icono is None:
+                    self.mostrar_mensaje_advertencia(titulo, texto)
+                else:
+                    self.mostrar_mensaje_informacion(titulo, texto, icono)
             
             if exito:
-                paciente_id = registro_original[13]  # ID en la posición 13
-                
-                # Actualizar cada estado con su timestamp correspondiente
-                if datos['triage'] != registro_original[2]:  # Si cambió el triage
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'triage', datos['triage'])
-                
-                if datos['ci'] != registro_original[4]:  # Si cambió CI
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'ci', datos['ci'])
-                
-                if datos['labs'] != registro_original[5]:  # Si cambió Labs
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'labs', datos['labs'])
-                
-                if datos['ix'] != registro_original[6]:  # Si cambió IMG (ix)
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'ix', datos['ix'])
-                
-                if datos['inter'] != registro_original[7]:  # Si cambió Interconsulta
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'inter', datos['inter'])
-                
-                if datos['rv'] != registro_original[8]:  # Si cambió RV
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'rv', datos['rv'])
-                
-                if datos['conducta'] != registro_original[10]:  # Si cambió Conducta
-                    self.modelo.actualizar_estado_con_timestamp(paciente_id, 'conducta', datos['conducta'])
-                
-                # Obtener laboratorios originales
-                labs_actuales = self.modelo.obtener_laboratorios_paciente(paciente_id)
-                labs_actuales_codigos = [lab[0] for lab in labs_actuales] if labs_actuales else []
-                
-                # Comprobar si los laboratorios han cambiado
-                labs_cambiados = set(nuevos_labs) != set(labs_actuales_codigos)
-                
-                # Solo guardar laboratorios si han cambiado o si triage y CI están realizados
-                if labs_cambiados:
-                    if datos['triage'] in ["1", "2", "3", "4", "5"] and datos['ci'] == "Realizado":
-                        labs_exito, labs_mensaje = self.modelo.guardar_laboratorios_paciente(paciente_id, nuevos_labs)
-                        if not labs_exito:
-                            self.mostrar_mensaje_informacion("Error en laboratorios", labs_mensaje, QMessageBox.Critical)
-                    else:
-                        # Si triage o CI no están realizados y hay laboratorios nuevos, mostrar mensaje
-                        if nuevos_labs:
-                            self.mostrar_mensaje_advertencia(
-                                "Información",
-                                "Los laboratorios no se pueden guardar hasta que el triage y CI estén realizados"
-                            )
-                
-                # Obtener imágenes originales
-                imgs_actuales = self.modelo.obtener_imagenes_paciente(paciente_id)
-                imgs_actuales_codigos = [img[0] for img in imgs_actuales] if imgs_actuales else []
-                
-                # Comprobar si las imágenes han cambiado
-                imgs_cambiadas = set(nuevas_imgs) != set(imgs_actuales_codigos)
-                
-                # Solo guardar imágenes si han cambiado o si triage y CI están realizados
-                if imgs_cambiadas:
-                    if datos['triage'] in ["1", "2", "3", "4", "5"] and datos['ci'] == "Realizado":
-                        img_exito, img_mensaje = self.modelo.guardar_imagenes_paciente(paciente_id, nuevas_imgs)
-                        if not img_exito:
-                            self.mostrar_mensaje_informacion("Error en imágenes", img_mensaje, QMessageBox.Critical)
-                    else:
-                        # Si triage o CI no están realizados y hay imágenes nuevas, mostrar mensaje
-                        if nuevas_imgs:
-                            self.mostrar_mensaje_advertencia(
-                                "Información",
-                                "Las imágenes no se pueden guardar hasta que el triage y CI estén realizados"
-                            )
-                
-                # Actualizar todos los pendientes según los diferentes estados
-                self.modelo.actualizar_pendientes_segun_triage(paciente_id, datos['triage'])
-                self.modelo.actualizar_pendientes_segun_ci(paciente_id, datos['ci'])
-                self.modelo.actualizar_pendientes_segun_labs(paciente_id, datos['labs'])
-                self.modelo.actualizar_pendientes_segun_ix(paciente_id, datos['ix'])
-                self.modelo.actualizar_pendientes_segun_inter(paciente_id, datos['inter'])
-                self.modelo.actualizar_pendientes_segun_rv(paciente_id, datos['rv'])
-                
                 dialogo.close()
                 self.actualizar_tabla()
                 self.mostrar_mensaje_informacion("Éxito", "Paciente actualizado correctamente")
@@ -1920,7 +1826,7 @@ class VistaAdmins(QMainWindow):
             if accion == editar_accion:
                 self.iniciar_edicion_por_menu_contextual(fila)
             elif accion == eliminar_accion:
-                documento = self.tabla.item(fila, 1).text()
+                documento = self.tabla.texto(fila, 1)
                 
                 registros = self.modelo.obtener_registro_por_documento(documento=documento)
                 if len(registros) > 1:
@@ -1,5 +1,5 @@
 from PyQt5.QtWidgets import (QMainWindow, QHeaderView, QWidget, QVBoxLayout, QHBoxLayout, 
-                           QTableWidget, QTableWidgetItem, QPushButton, 
+                           QAbstractItemView, QPushButton, 
                            QLabel, QMessageBox, QFrame, QDesktopWidget, 
                            QApplication, QGraphicsOpacityEffect, QCheckBox,
                            QGroupBox, QComboBox, QDialog, QSizePolicy, QGridLayout)
@@ -14,7 +14,7 @@ from Front_end.styles.animation_components import SplashScreen
 from Front_end.styles.styles import *
 from Front_end.styles.components import StyledMessageBox, StyledButton, StyledDialog
 # Importar componentes de tablas - Actualizado para usar los mismos estilos de Front_end.py
-from Front_end.styles.table_components import Estado_delegado_circulo, TextDelegate, Personalizado_Columnas, configurar_tabla_estandar
+from Front_end.styles.table_components import Estado_delegado_circulo, TextDelegate, TablaPacientes, VistaCensoMixin
 # Importar componentes de header
 from Front_end.styles.header_components import HeaderCombinado
 # Importar widgets personalizados
@@ -25,7 +25,7 @@ from Front_end.styles.font_utils import aplicar_fuentes_sistema
 from Front_end.styles.lateral_menu import LateralMenu, MenuToggleButton
 
 
-class VistaSalaEspera(QMainWindow):
+class VistaSalaEspera(VistaCensoMixin, QMainWindow):
     def __init__(self, login_interface):
         super().__init__()
         self.login_interface = login_interface
@@ -34,6 +34,9 @@ class VistaSalaEspera(QMainWindow):
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.pagina_actual = 0
         
+        # Programador de alarmas del censo completo; cada página muestra las de sus filas
+        self.iniciar_alarmas()
+        
         # Nuevas variables para el modo presentación
         self.modo_presentacion_activo = False  # Se activará más adelante
         self.timer_presentacion = QTimer(self)
@@ -128,10 +131,8 @@ class VistaSalaEspera(QMainWindow):
         # Cerrar la pantalla de carga antes de mostrar la interfaz principal
         self.splash.accept()
         
-        # Inicializar el timer para actualización automática
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.actualizar_tabla)
-        self.timer.start(5000)
+        # Inicializar el timer para actualización automática con sondeo adaptativo
+        self.iniciar_sondeo()
         
         # Animación de entrada
         self.animation = QPropertyAnimation(self.opacity_effect, b"opacity")
@@ -356,9 +357,7 @@ class VistaSalaEspera(QMainWindow):
         contenedor_tabla = TablaContainer(self, 0.96, 0.705)  # Aumentado de 0.75, 0.55 para hacer la tabla más grande
         
         # Crear la tabla
-        self.tabla = QTableWidget()
-        self.tabla.setColumnCount(len(self.headers))
-        self.tabla.setHorizontalHeaderLabels(self.headers)
+        self.tabla = TablaPacientes(self.headers)
         
         # Aplicar estilos de tabla mejorados - usando los mismos de Front_end.py
         self.tabla.setStyleSheet(TABLE_STYLES_UPDATED["main"] + SCROLLBAR_STYLE)
@@ -387,16 +386,15 @@ class VistaSalaEspera(QMainWindow):
                 delegate.conducta_alarm_cells = set()  # Inicializar también este conjunto
         
         # Habilitar desplazamiento suave
-        self.tabla.setVerticalScrollMode(QTableWidget.ScrollPerPixel)
-        self.tabla.setHorizontalScrollMode(QTableWidget.ScrollPerPixel)
+        self.tabla.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.tabla.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
         
         # Configuración de estilo para la tabla
         self.tabla.setAlternatingRowColors(False)
-        self.tabla.setSelectionBehavior(QTableWidget.SelectRows)
-        self.tabla.setSelectionMode(QTableWidget.SingleSelection)
-        self.tabla.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tabla.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.tabla.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.tabla.clearSelection()
-        self.tabla.setCurrentCell(-1, -1)
         
         # Usar la misma fuente que en Front_end.py para consistencia
         self.tabla.setFont(QFont("Segoe UI", 10))
@@ -408,6 +406,9 @@ class VistaSalaEspera(QMainWindow):
         
         self.tabla.setWordWrap(True)
         
+        # Altura fija para todas las filas basada en el tamaño del círculo
+        self.tabla.establecer_altura_filas(circle_delegate.circle_size + 20)  # +20 para padding adicional
+        
         # Agregar la tabla al contenedor
         contenedor_tabla.set_tabla(self.tabla)
         
@@ -532,12 +533,18 @@ class VistaSalaEspera(QMainWindow):
         dialogo.exec_()
 
     def actualizar_datos_presentacion(self):
-        """Actualiza los datos para el modo presentación"""
-        # Obtener datos usando el modelo con filtro de áreas
-        self.registros_totales = self.modelo.obtener_datos_pacientes_filtrados(self.areas_filtradas)
+        """
+        Actualiza los datos para el modo presentación
         
-        # Verificar y guardar las celdas con alarma - Asegurando que se apliquen correctamente
-        self.alarm_cells_global = self.modelo.verificar_alarmas(self.registros_totales)
+        Returns:
+            bool: True si los datos cambiaron desde la última actualización
+        """
+        # Obtener el censo activo con filtro de áreas (solo se leen las filas que cambiaron)
+        self.registros_totales, hubo_cambios = self.modelo.obtener_cambios_pacientes(self.areas_filtradas, solo_activos=True)
+        
+        # Programar las alarmas de todo el censo (solo cambian los plazos distintos); las que
+        # se activen o apaguen se aplican a la página visible por la señal del programador
+        self.alarmas.sincronizar(self.registros_totales)
         
         # Calcular el número total de páginas
         if self.registros_por_pagina > 0:
@@ -550,10 +557,24 @@ class VistaSalaEspera(QMainWindow):
             self.pagina_actual = self.pagina_actual % self.total_paginas
         else:
             self.pagina_actual = 0
+        
+        return hubo_cambios
+
+    def filas_visibles(self, registros):
+        """Convierte registros en tuplas (id, textos por columna) con nombre y documento enmascarados"""
+        indice_id = self.modelo.COLUMNAS_VISTA.index('id')
+        return [
+            (fila[indice_id],
+             [str(self.enmascarar_nombre(fila[0])), str(self.enmascarar_documento(fila[1]))]
+             + [str(valor) for valor in fila[2:len(self.headers)]])  # Hasta Ubicación
+            for fila in registros
+        ]
 
     def mostrar_pagina_actual(self):
         """Muestra la página actual de registros"""
         if not self.registros_totales:
+            self.tabla.sincronizar([])
+            self.asignar_filas_alarma([])
             return
         
         # Calcular índices de inicio y fin para la página actual
@@ -563,58 +584,11 @@ class VistaSalaEspera(QMainWindow):
         # Obtener registros para esta página
         registros_pagina = self.registros_totales[inicio:fin]
         
-        # Limpiar tabla
-        self.tabla.setRowCount(0)
-        
-        # Obtener celdas con alarma para los registros de esta página
-        # Usamos directamente el método del modelo como en Front_end.py
-        alarm_cells = self.modelo.verificar_alarmas(registros_pagina)
-        indice_triage = self.headers.index('Triage')
-        indice_ci = self.headers.index('CI')
-        
-        # Mostrar registros en la tabla
-        if registros_pagina:
-            for row_idx, fila in enumerate(registros_pagina):
-                # Procesar solo los datos que vamos a mostrar
-                fila_actual = []
-                for i in range(len(fila)):
-                    if i == 0:  # Nombre
-                        fila_actual.append(self.enmascarar_nombre(fila[i]))
-                    elif i == 1:  # Documento
-                        fila_actual.append(self.enmascarar_documento(fila[i]))
-                    elif i < 10:  # Hasta Pendientes
-                        fila_actual.append(fila[i])
-                    elif i == 11:  # Ubicación (saltamos Conducta que está en índice 10)
-                        fila_actual.append(fila[i])
-                
-                # Insertar fila en la tabla
-                self.tabla.insertRow(row_idx)
-                for col, valor in enumerate(fila_actual):
-                    if col == indice_triage or col == self.headers.index('CI') or \
-                    col == self.headers.index('Labs') or col == self.headers.index('IMG') or \
-                    col == self.headers.index('Interconsulta') or col == self.headers.index('RV'):
-                        # Usar Personalizado_Columnas para que funcione con el delegado
-                        item = Personalizado_Columnas("", str(valor))
-                        self.tabla.setItem(row_idx, col, item)
-                    else:
-                        item = QTableWidgetItem(str(valor))
-                        item.setTextAlignment(Qt.AlignCenter)
-                        self.tabla.setItem(row_idx, col, item)
-            
-            # Actualizar alarmas en el delegate para CI - Asegurando que se apliquen correctamente
-            ci_col = self.headers.index('CI')
-            delegate = self.tabla.itemDelegateForColumn(ci_col)
-            if isinstance(delegate, Estado_delegado_circulo):
-                delegate.set_alarm_cells(alarm_cells)
-                # También establecer un conjunto vacío para alarmas de conducta
-                delegate.set_conducta_alarm_cells(set())
-            
-            # Establecer altura fija para todas las filas
-            circle_delegate = self.tabla.itemDelegateForColumn(indice_triage)
-            if isinstance(circle_delegate, Estado_delegado_circulo):
-                row_height = circle_delegate.circle_size + 20  # +20 para padding
-                for row in range(self.tabla.rowCount()):
-                    self.tabla.setRowHeight(row, row_height)
+        # Reescribir solo las celdas que cambian respecto a lo que ya se muestra
+        self.tabla.sincronizar(self.filas_visibles(registros_pagina))
+        
+        # Celdas con alarma de esta página a partir de las alarmas programadas del censo completo
+        self.asignar_filas_alarma(registros_pagina)
 
     def activar_modo_presentacion(self):
         """Activa el modo presentación según la configuración seleccionada"""
@@ -688,7 +662,12 @@ class VistaSalaEspera(QMainWindow):
                     self.mostrar_pagina_actual()
 
     def actualizar_tabla(self):
-        """Actualiza la tabla con los datos actuales"""
+        """
+        Actualiza la tabla con los datos actuales
+        
+        Returns:
+            bool: True si los datos cambiaron desde la última actualización
+        """
         try:
             # Verificar que la tabla exista antes de intentar usarla
             if not hasattr(self, 'tabla'):
@@ -703,91 +682,46 @@ class VistaSalaEspera(QMainWindow):
                 splash.opacity_animation.start()
                 QApplication.processEvents()
             
+            # Si el modo presentación está activo, actualizar la vista de presentación
+            if self.modo_presentacion_activo:
+                hubo_cambios = self.actualizar_datos_presentacion()
+                # Sin cambios el programador avisa por su cuenta cuando vence una alarma
+                if hubo_cambios:
+                    self.mostrar_pagina_actual()
+                return hubo_cambios
+            
             # Obtener datos usando el modelo con filtro de áreas
-            datos = self.modelo.obtener_datos_pacientes_filtrados(self.areas_filtradas)
+            datos, hubo_cambios = self.modelo.obtener_cambios_pacientes(self.areas_filtradas, solo_activos=True)
             
             # Guardar los datos para el modo presentación
             self.registros_totales = datos
             
-            # Si el modo presentación está activo, actualizar la vista de presentación
-            if self.modo_presentacion_activo:
-                self.actualizar_datos_presentacion()
-                self.mostrar_pagina_actual()
-                return
+            # Sin cambios en la base de datos no hay nada que hacer: el programador avisa
+            # por su cuenta cuando vence una alarma
+            if not hubo_cambios and not self.primera_carga:
+                return False
                 
             # Si no está en modo presentación, mostrar todos los datos (no debería ocurrir)
-            self.tabla.setRowCount(0)
+            self.tabla.sincronizar(self.filas_visibles(datos))
             
-            # Obtener celdas con alarma desde el modelo - Usando el método correcto del modelo
-            alarm_cells = self.modelo.verificar_alarmas(datos)
-            conducta_alarm_cells = set()  # Inicializar conjunto vacío para la sala de espera
-            indice_triage = self.headers.index('Triage')
-            indice_pendientes = self.headers.index('Pendientes')  # Índice de la columna pendientes
+            # Actualizar alarmas de CI; con el censo vacío se apagan las anteriores
+            self.actualizar_alarmas(datos)
             
             if datos:
-                for row_idx, fila in enumerate(datos):
-                    # Procesar solo los datos que vamos a mostrar (excluimos Conducta e Ingreso)
-                    fila_actual = []
-                    for i in range(len(fila)):
-                        if i == 0:  # Nombre
-                            fila_actual.append(self.enmascarar_nombre(fila[i]))
-                        elif i == 1:  # Documento
-                            fila_actual.append(self.enmascarar_documento(fila[i]))
-                        elif i < 10:  # Hasta Pendientes
-                            fila_actual.append(fila[i])
-                        elif i == 11:  # Ubicación (saltamos Conducta que está en índice 10)
-                            fila_actual.append(fila[i])
-                    
-                    # Insertar fila en la tabla
-                    self.tabla.insertRow(row_idx)
-                    for col, valor in enumerate(fila_actual):
-                        # Verificar si es una columna que debe usar el delegado especial
-                        if col == indice_triage or col == self.headers.index('CI') or \
-                            col == self.headers.index('Labs') or col == self.headers.index('IMG') or \
-                            col == self.headers.index('Interconsulta') or col == self.headers.index('RV'):
-                            # Usar un ítem personalizado para que funcione con el delegado
-                            item = Personalizado_Columnas("", str(valor))
-                            self.tabla.setItem(row_idx, col, item)
-                            
-                        elif col == indice_pendientes:
-                            # Para la columna de pendientes, asegurarse de que se muestre exactamente como viene de la BD
-                            # sin ningún procesamiento adicional
-                            pendientes_texto = str(valor) if valor is not None else ""
-                            item = QTableWidgetItem(pendientes_texto)
-                            item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)  # Alineación a la izquierda para mejor legibilidad
-                            self.tabla.setItem(row_idx, col, item)
-                        else:
-                            # Para texto normal
-                            item = QTableWidgetItem(str(valor))
-                            item.setTextAlignment(Qt.AlignCenter | Qt.AlignVCenter)
-                            self.tabla.setItem(row_idx, col, item)
-                
-                # Actualizar alarmas en el delegado para CI - Asegurando que se apliquen correctamente
-                ci_col = self.headers.index('CI')
-                delegate = self.tabla.itemDelegateForColumn(ci_col)
-                if isinstance(delegate, Estado_delegado_circulo):
-                    delegate.set_alarm_cells(alarm_cells)
-                    # También establecer el conjunto vacío de alarmas de conducta
-                    delegate.set_conducta_alarm_cells(conducta_alarm_cells)
-                
                 # Configurar anchos de columna
                 self.configurar_anchos_columnas()
-                
-                # Establecer altura fija para todas las filas
-                circle_delegate = self.tabla.itemDelegateForColumn(indice_triage)
-                if isinstance(circle_delegate, Estado_delegado_circulo):
-                    row_height = circle_delegate.circle_size + 20  # +20 para padding
-                    for row in range(self.tabla.rowCount()):
-                        self.tabla.setRowHeight(row, row_height)
             
             # Cerrar la pantalla de carga si es la primera vez
             if self.primera_carga:
                 self.primera_carga = False
                 if 'splash' in locals():
                     splash.accept()
+            
+            return True
                 
         except Exception as e:
             self.mostrar_mensaje_informacion("Error", f"Error al actualizar la tabla: {str(e)}", QMessageBox.Critical)
+            return False
         finally:
             self.modelo.cierre_db()
             
@@ -1023,6 +957,7 @@ class VistaSalaEspera(QMainWindow):
         # Detener el timer antes de cerrar
         if hasattr(self, 'timer'):
             self.timer.stop()
+        self.alarmas.detener()
         
         # Detener los timers antes de cerrar
         if hasattr(self, 'timer_presentacion'):
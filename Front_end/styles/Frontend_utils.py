@@ -5,7 +5,7 @@ from PyQt5.QtWidgets import (QCompleter, QWidget, QVBoxLayout, QHBoxLayout, QPus
 from PyQt5.QtCore import Qt, QTimer, QRect, QSize, QStringListModel, QPoint, QDateTime, QTime
 from Front_end.styles.styles import *
 from Front_end.styles.components import StyledDialog
-from Back_end.Manejo_DB import ModeloPaciente
+from Back_end.Manejo_DB import CatalogoExamenes, IndiceBusqueda
 import sys
 import os
 
@@ -664,7 +664,10 @@ class LabsSelector(QWidget):
         """)
         self.completer = QCompleter([])
         self.completer.setCaseSensitivity(Qt.CaseInsensitive)
-        self.completer.setFilterMode(Qt.MatchContains)
+        # El índice del catálogo ya filtra y ordena: el completer muestra sus resultados tal cual
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.modelo_sugerencias = QStringListModel()
+        self.completer.setModel(self.modelo_sugerencias)
         
         # Estilo mejorado para el popup de autocompletado
         completer_popup = QListView()
@@ -683,6 +686,7 @@ class LabsSelector(QWidget):
         """)
         self.completer.setPopup(completer_popup)
         self.search_input.setCompleter(self.completer)
+        self.search_input.textEdited.connect(self.actualizar_sugerencias)
         
         self.add_button = QPushButton("Agregar")
         self.add_button.setCursor(Qt.PointingHandCursor)
@@ -848,48 +852,45 @@ class LabsSelector(QWidget):
 
     def cargar_laboratorios(self):
         try:
-            # Obtener la lista de laboratorios de la base de datos
-            conn = ModeloPaciente().conectar()
-            cursor = conn.cursor()
-            cursor.execute("SELECT codigo_lab, nombre_lab FROM laboratorios ORDER BY nombre_lab")
-            self.laboratorios = cursor.fetchall()
-            conn.close()
+            # Obtener la lista de laboratorios del catálogo en caché de la sesión
+            self.laboratorios = CatalogoExamenes.filas('laboratorios')
             
-            # Crear lista para el autocompletado
-            items = [f"{lab[0]} - {lab[1]}" for lab in self.laboratorios]
-            
-            # Actualizar el completer
-            model = QStringListModel()
-            model.setStringList(items)
-            self.completer.setModel(model)
+            # Índice de autocompletado (se construye una vez por versión del catálogo)
+            self.indice = CatalogoExamenes.indice('laboratorios')
             
         except Exception as e:
             print(f"Error al cargar laboratorios: {str(e)}")
             self.laboratorios = []
+            self.indice = IndiceBusqueda([])
+
+    def actualizar_sugerencias(self, texto):
+        # Consulta del índice en cada pulsación; solo se muestran las mejores coincidencias
+        resultados = self.indice.buscar(texto) if texto.strip() else []
+        self.modelo_sugerencias.setStringList([f"{codigo} - {nombre}" for codigo, nombre, _ in resultados])
+        if resultados:
+            self.completer.complete()
 
     def agregar_laboratorio(self):
         texto = self.search_input.text().strip()
         if not texto:
             return
             
-        # Buscar si existe el laboratorio
-        encontrado = False
-        for codigo, nombre in self.laboratorios:
-            if texto.startswith(codigo) or codigo in texto or nombre.lower() in texto.lower():
-                encontrado = True
-                # Verificar que no esté ya agregado
-                if not any(lab[0] == codigo for lab in self.labs_seleccionados):
-                    self.labs_seleccionados.append([codigo, nombre])
-                    self.crear_etiqueta(codigo, nombre)
-                    self.search_input.clear()
-                    # Hacer focus en el input para continuar agregando
-                    self.search_input.setFocus()
-                else:
-                    self.mostrar_error(f"El laboratorio '{nombre}' ya ha sido agregado")
-                break
-                
-        if not encontrado:
+        # Buscar en el índice del catálogo (código, 'código - nombre' o nombre)
+        encontrado = self.indice.resolver(texto)
+        if encontrado is None:
             self.mostrar_error("El laboratorio ingresado no existe en la base de datos.")
+            return
+            
+        codigo, nombre = encontrado
+        # Verificar que no esté ya agregado
+        if not any(item[0] == codigo for item in self.labs_seleccionados):
+            self.labs_seleccionados.append([codigo, nombre])
+            self.crear_etiqueta(codigo, nombre)
+            self.search_input.clear()
+            # Hacer focus en el input para continuar agregando
+            self.search_input.setFocus()
+        else:
+            self.mostrar_error(f"El laboratorio '{nombre}' ya ha sido agregado")
 
     def crear_etiqueta(self, codigo, nombre):
         # Crear widget para la etiqueta con ancho completo
@@ -1054,7 +1055,10 @@ class IxsSelector(QWidget):
         """)
         self.completer = QCompleter([])
         self.completer.setCaseSensitivity(Qt.CaseInsensitive)
-        self.completer.setFilterMode(Qt.MatchContains)
+        # El índice del catálogo ya filtra y ordena: el completer muestra sus resultados tal cual
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.modelo_sugerencias = QStringListModel()
+        self.completer.setModel(self.modelo_sugerencias)
         
         # Estilo mejorado para el popup de autocompletado
         completer_popup = QListView()
@@ -1073,6 +1077,7 @@ class IxsSelector(QWidget):
         """)
         self.completer.setPopup(completer_popup)
         self.search_input.setCompleter(self.completer)
+        self.search_input.textEdited.connect(self.actualizar_sugerencias)
         
         self.add_button = QPushButton("Agregar")
         self.add_button.setCursor(Qt.PointingHandCursor)
@@ -1238,48 +1243,45 @@ class IxsSelector(QWidget):
 
     def cargar_imagenes(self):
         try:
-            # Obtener la lista de imágenes de la base de datos
-            conn = ModeloPaciente().conectar()
-            cursor = conn.cursor()
-            cursor.execute("SELECT codigo_ix, nombre_ix FROM imagenes ORDER BY nombre_ix")
-            self.imagenes = cursor.fetchall()
-            conn.close()
+            # Obtener la lista de imágenes del catálogo en caché de la sesión
+            self.imagenes = CatalogoExamenes.filas('imagenes')
             
-            # Crear lista para el autocompletado
-            items = [f"{img[0]} - {img[1]}" for img in self.imagenes]
-            
-            # Actualizar el completer
-            model = QStringListModel()
-            model.setStringList(items)
-            self.completer.setModel(model)
+            # Índice de autocompletado (se construye una vez por versión del catálogo)
+            self.indice = CatalogoExamenes.indice('imagenes')
             
         except Exception as e:
             print(f"Error al cargar imágenes: {str(e)}")
             self.imagenes = []
+            self.indice = IndiceBusqueda([])
+
+    def actualizar_sugerencias(self, texto):
+        # Consulta del índice en cada pulsación; solo se muestran las mejores coincidencias
+        resultados = self.indice.buscar(texto) if texto.strip() else []
+        self.modelo_sugerencias.setStringList([f"{codigo} - {nombre}" for codigo, nombre, _ in resultados])
+        if resultados:
+            self.completer.complete()
 
     def agregar_imagen(self):
         texto = self.search_input.text().strip()
         if not texto:
             return
             
-        # Buscar si existe la imagen
-        encontrado = False
-        for codigo, nombre in self.imagenes:
-            if texto.startswith(codigo) or codigo in texto or nombre.lower() in texto.lower():
-                encontrado = True
-                # Verificar que no esté ya agregada
-                if not any(img[0] == codigo for img in self.ixs_seleccionados):
-                    self.ixs_seleccionados.append([codigo, nombre])
-                    self.crear_etiqueta(codigo, nombre)
-                    self.search_input.clear()
-                    # Hacer focus en el input para continuar agregando
-                    self.search_input.setFocus()
-                else:
-                    self.mostrar_error(f"La imagen '{nombre}' ya ha sido agregada")
-                break
-                
-        if not encontrado:
+        # Buscar en el índice del catálogo (código, 'código - nombre' o nombre)
+        encontrado = self.indice.resolver(texto)
+        if encontrado is None:
             self.mostrar_error("La imagen ingresada no existe en la base de datos.")
+            return
+            
+        codigo, nombre = encontrado
+        # Verificar que no esté ya agregado
+        if not any(item[0] == codigo for item in self.ixs_seleccionados):
+            self.ixs_seleccionados.append([codigo, nombre])
+            self.crear_etiqueta(codigo, nombre)
+            self.search_input.clear()
+            # Hacer focus en el input para continuar agregando
+            self.search_input.setFocus()
+        else:
+            self.mostrar_error(f"La imagen '{nombre}' ya ha sido agregada")
 
     def crear_etiqueta(self, codigo, nombre):
         # Crear widget para la etiqueta con ancho completo
@@ -280,7 +280,7 @@ TABLE_STYLES = {
 
 TABLE_STYLES_UPDATED = {
     "main": f"""
-        QTableWidget {{
+        QTableView {{
             background-color: {COLORS['background_white']};
             gridline-color: {COLORS['border_light']};
             border: none;
@@ -288,11 +288,11 @@ TABLE_STYLES_UPDATED = {
             padding: 3px;
             selection-background-color: #E3F2FD; /* Color más claro para selección */
         }}
-        QTableWidget::item:selected {{
+        QTableView::item:selected {{
             background-color: #E3F2FD; /* Color más claro para selección */
             color: {COLORS['text_primary']};
         }}
-        QTableWidget::item:hover {{
+        QTableView::item:hover {{
             background-color: #F5F9FF; /* Color muy ligero para hover */
         }}
         QHeaderView::section {{
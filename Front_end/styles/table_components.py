@@ -1,8 +1,114 @@
-from PyQt5.QtWidgets import (QTableWidget, QTableWidgetItem, QStyledItemDelegate, QToolTip,
-                           QHeaderView, QAbstractItemView, QStyleOptionViewItem)
-from PyQt5.QtCore import Qt, QTimer, QRectF, QSize, QEvent
-from PyQt5.QtGui import QPainter, QColor, QBrush, QFont
-from Back_end.Manejo_DB import ModeloPaciente
+from PyQt5.QtWidgets import (QTableView, QStyledItemDelegate, QToolTip,
+                           QHeaderView, QStyleOptionViewItem)
+from PyQt5.QtCore import Qt, QTimer, QRectF, QSize, QEvent, QAbstractTableModel, QModelIndex, QObject
+from PyQt5.QtGui import QPainter, QColor, QBrush, QFont, QRegion
+from PyQt5 import sip
+import weakref
+from Back_end.Manejo_DB import ModeloPaciente, ProgramadorAlarmas
+
+class RelojParpadeo(QObject):
+    """
+    Reloj de parpadeo único para toda la aplicación. En cada tic repinta solo las celdas
+    con alarma que están dentro del viewport, con una sola actualización de región por
+    tabla, y se detiene mientras ninguna tabla con alarmas esté a la vista (ventana oculta
+    o minimizada).
+    """
+    
+    INTERVALO_MS = 500
+    _instancia = None
+    
+    @classmethod
+    def instancia(cls):
+        """Devuelve el reloj compartido, creándolo la primera vez"""
+        if cls._instancia is None:
+            cls._instancia = cls()
+        return cls._instancia
+    
+    def __init__(self):
+        super().__init__()
+        self.encendido = False
+        self._delegados = weakref.WeakSet()
+        self._vistas_observadas = weakref.WeakSet()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._tic)
+    
+    def registrar(self, delegado):
+        """
+        Agrega un delegado al reloj y observa la visibilidad de su tabla.
+        
+        Args:
+            delegado: Estado_delegado_circulo cuyo padre es la tabla
+        """
+        self._delegados.add(delegado)
+        vista = delegado.parent()
+        if vista is not None and vista not in self._vistas_observadas:
+            self._vistas_observadas.add(vista)
+            vista.installEventFilter(self)
+    
+    def eventFilter(self, obj, event):
+        """Reanuda o pausa el reloj cuando una tabla se muestra, se oculta o se minimiza"""
+        if event.type() in (QEvent.Show, QEvent.Hide, QEvent.WindowStateChange):
+            QTimer.singleShot(0, self.actualizar)
+        return False
+    
+    def actualizar(self):
+        """Arranca el reloj si hay celdas con alarma a la vista y lo detiene si no"""
+        if self._vistas_con_alarma():
+            if not self._timer.isActive():
+                self._timer.start(self.INTERVALO_MS)
+        else:
+            self._detener()
+    
+    def _detener(self):
+        self._timer.stop()
+        self.encendido = False
+    
+    def _vistas_con_alarma(self):
+        """Agrupa por tabla los delegados con alarmas cuyas tablas están a la vista"""
+        vistas = {}
+        for delegado in list(self._delegados):
+            if sip.isdeleted(delegado):
+                self._delegados.discard(delegado)
+                continue
+            if not (delegado.alarm_cells or delegado.conducta_alarm_cells):
+                continue
+            vista = delegado.parent()
+            if vista is None or sip.isdeleted(vista) or not vista.isVisible() or vista.window().isMinimized():
+                continue
+            vistas.setdefault(vista, []).append(delegado)
+        return vistas
+    
+    def _tic(self):
+        """Alterna el parpadeo y repinta las celdas con alarma visibles de cada tabla"""
+        vistas = self._vistas_con_alarma()
+        if not vistas:
+            self._detener()
+            return
+        
+        self.encendido = not self.encendido
+        for vista, delegados in vistas.items():
+            modelo = vista.model()
+            viewport = vista.viewport()
+            area_visible = viewport.rect()
+            
+            # Rango de filas dentro del viewport
+            primera = vista.rowAt(area_visible.top())
+            if primera < 0:
+                continue
+            ultima = vista.rowAt(area_visible.bottom())
+            if ultima < 0:
+                ultima = modelo.rowCount() - 1
+            
+            region = QRegion()
+            for delegado in delegados:
+                for fila, columna in delegado.alarm_cells | delegado.conducta_alarm_cells:
+                    if primera <= fila <= ultima:
+                        rect = vista.visualRect(modelo.index(fila, columna))
+                        if rect.intersects(area_visible):
+                            region = region.united(rect)
+            
+            if not region.isEmpty():
+                viewport.update(region)
 
 class Estado_delegado_circulo(QStyledItemDelegate):
     """Delegado para renderizar estados como círculos coloreados con alarmas."""
@@ -13,28 +119,24 @@ class Estado_delegado_circulo(QStyledItemDelegate):
         self.circle_size = 50
         self.alarm_cells = set()
         self.conducta_alarm_cells = set()
-        self.blink_state = False
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.toggle_blink)
-        self.timer.start(500)
+        # El parpadeo lo marca el reloj compartido de la aplicación
+        self.reloj = RelojParpadeo.instancia()
+        self.reloj.registrar(self)
     
-    def toggle_blink(self):
-        """Alterna el estado de parpadeo para las celdas con alarma."""
-        self.blink_state = not self.blink_state
-        if self.alarm_cells:
-            for row, col in self.alarm_cells:
-                self.parent().update(self.parent().model().index(row, col))
-        if self.conducta_alarm_cells:
-            for row, col in self.conducta_alarm_cells:
-                self.parent().update(self.parent().model().index(row, col))
+    @property
+    def blink_state(self):
+        """Fase actual del parpadeo (compartida por todas las tablas)."""
+        return self.reloj.encendido
 
     def set_alarm_cells(self, alarm_cells):
         """Define qué celdas tienen alarma estándar."""
         self.alarm_cells = alarm_cells
+        self.reloj.actualizar()
         
     def set_conducta_alarm_cells(self, conducta_alarm_cells):
         """Define qué celdas tienen alarma de conducta."""
         self.conducta_alarm_cells = conducta_alarm_cells
+        self.reloj.actualizar()
         
     def sizeHint(self, option, index):
         """Tamaño recomendado para las celdas con círculos."""
@@ -353,92 +455,297 @@ class TextDelegate(QStyledItemDelegate):
         
         return super().editorEvent(event, model, option, index)
 
-class Personalizado_Columnas(QTableWidgetItem):
-    """Ítem personalizado para mostrar círculos de colores en celdas."""
-    def __init__(self, text, state=None):
-        super().__init__(text)
-        self.state = state
-        self.modelo = ModeloPaciente()
-        self.colors = self.modelo.obtener_colores()
-        self.setData(Qt.DisplayRole, state)
-
-def configurar_tabla_estandar(tabla, headers, delegate_columns=None, text_delegate_columns=None, 
-                           font_name="ABeeZee", row_height=70):
+class ModeloTablaPacientes(QAbstractTableModel):
     """
-    Configura una tabla con estilo y delegados estándar.
+    Modelo de la grilla de pacientes compartido por las vistas de médicos, administradores y sala de espera.
     
-    Args:
-        tabla: QTableWidget a configurar
-        headers: Lista de encabezados de columna
-        delegate_columns: Diccionario de {nombre_columna: delegado} para columnas especiales
-        text_delegate_columns: Lista de nombres de columna para aplicar TextDelegate
-        font_name: Nombre de la fuente a usar
-        row_height: Altura de las filas
+    Cada fila se guarda como una tupla de textos junto a su clave (el id del paciente) y un
+    índice {clave: fila}, así data() y la búsqueda por id son O(1) sin un objeto por celda.
+    sincronizar() aplica solo las diferencias con la lista nueva y emite inserciones,
+    eliminaciones y movimientos por bloques, y dataChanged por rangos de filas contiguas.
     """
-    # Configuración básica
-    tabla.setColumnCount(len(headers))
-    tabla.setHorizontalHeaderLabels(headers)
-    tabla.verticalHeader().setVisible(False)
-    
-    # Estilos y comportamiento
-    tabla.setAlternatingRowColors(False)
-    tabla.setSelectionBehavior(QTableWidget.SelectRows)
-    tabla.setSelectionMode(QTableWidget.SingleSelection)
-    tabla.setEditTriggers(QTableWidget.NoEditTriggers)
-    tabla.clearSelection()
-    tabla.setCurrentCell(-1, -1)
-    
-    # Fuente
-    font = QFont(font_name)
-    tabla.setFont(font)
-    
-    # Encabezados en negrita
-    header_font = QFont(font_name)
-    header_font.setBold(True)
-    tabla.horizontalHeader().setFont(header_font)
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self._claves = []
+        self._filas = []
+        self._posiciones = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._filas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            fila = self._filas[index.row()]
+            return fila[index.column()] if index.column() < len(fila) else None
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and section < len(self.headers):
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def clave_en(self, fila):
+        """Devuelve la clave de la fila indicada o None si no existe"""
+        if 0 <= fila < len(self._claves):
+            return self._claves[fila]
+        return None
+
+    def fila_de(self, clave):
+        """Devuelve la fila de la clave indicada o None si no está en el modelo"""
+        return self._posiciones.get(clave)
+
+    def texto(self, fila, columna):
+        """Devuelve el texto mostrado en una celda"""
+        return self._filas[fila][columna]
+
+    def sincronizar(self, filas):
+        """
+        Args:
+            filas: Lista ordenada de tuplas (clave, valores) con los textos de cada columna
+        """
+        raiz = QModelIndex()
+        claves_nuevas = {clave for clave, _ in filas}
+        cambios = {}  # clave -> (primera, última) columna modificada
+        destino = 0
+        
+        while destino < len(filas):
+            clave, valores = filas[destino]
+            valores = tuple(valores)
+            actual = self.clave_en(destino)
+            
+            if actual == clave:
+                self._registrar_cambio(cambios, clave, self._filas[destino], valores)
+                self._filas[destino] = valores
+            elif clave in self._posiciones:
+                # La fila ya existe más abajo (cambió el orden): moverla a su posición
+                origen = self._posiciones[clave]
+                self.beginMoveRows(raiz, origen, origen, raiz, destino)
+                self._claves.insert(destino, self._claves.pop(origen))
+                anterior = self._filas.pop(origen)
+                self._filas.insert(destino, valores)
+                self._reindexar(destino, origen + 1)
+                self.endMoveRows()
+                self._registrar_cambio(cambios, clave, anterior, valores)
+            elif actual is not None and actual not in claves_nuevas:
+                # Reutilizar la fila de un registro que ya no está
+                del self._posiciones[actual]
+                self._registrar_cambio(cambios, clave, self._filas[destino], valores)
+                self._claves[destino] = clave
+                self._filas[destino] = valores
+                self._posiciones[clave] = destino
+            else:
+                # Insertar de una vez el bloque de filas nuevas consecutivas
+                fin = destino + 1
+                while fin < len(filas) and filas[fin][0] not in self._posiciones:
+                    fin += 1
+                self.beginInsertRows(raiz, destino, fin - 1)
+                self._claves[destino:destino] = [c for c, _ in filas[destino:fin]]
+                self._filas[destino:destino] = [tuple(v) for _, v in filas[destino:fin]]
+                self._reindexar(destino, len(self._claves))
+                self.endInsertRows()
+                destino = fin
+                continue
+            destino += 1
+        
+        # Eliminar las filas sobrantes desde el final en un solo bloque
+        if len(self._filas) > len(filas):
+            self.beginRemoveRows(raiz, len(filas), len(self._filas) - 1)
+            for clave in self._claves[len(filas):]:
+                del self._posiciones[clave]
+            del self._claves[len(filas):]
+            del self._filas[len(filas):]
+            self.endRemoveRows()
+        
+        self._emitir_cambios(cambios)
+
+    def _reindexar(self, desde, hasta):
+        for fila in range(desde, min(hasta, len(self._claves))):
+            self._posiciones[self._claves[fila]] = fila
+
+    def _registrar_cambio(self, cambios, clave, anteriores, valores):
+        columnas = [col for col in range(len(valores))
+                    if col >= len(anteriores) or anteriores[col] != valores[col]]
+        if columnas:
+            cambios[clave] = (columnas[0], columnas[-1])
+
+    def _emitir_cambios(self, cambios):
+        """Emite un dataChanged por cada bloque de filas contiguas modificadas"""
+        filas = sorted((self._posiciones[clave], rango) for clave, rango in cambios.items())
+        inicio = None
+        for fila, (primera, ultima) in filas:
+            if inicio is not None and fila == fin + 1:
+                fin = fila
+                col_min, col_max = min(col_min, primera), max(col_max, ultima)
+                continue
+            if inicio is not None:
+                self.dataChanged.emit(self.index(inicio, col_min), self.index(fin, col_max))
+            inicio = fin = fila
+            col_min, col_max = primera, ultima
+        if inicio is not None:
+            self.dataChanged.emit(self.index(inicio, col_min), self.index(fin, col_max))
+
+class TablaPacientes(QTableView):
+    """
+    Vista de la grilla de pacientes sobre ModeloTablaPacientes.
     
-    # Ajuste de texto
-    tabla.setWordWrap(True)
+    Al sincronizar conserva por clave la fila seleccionada y la fila visible en la parte
+    superior, de modo que las actualizaciones no mueven el scroll ni la selección.
+    """
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.modelo_filas = ModeloTablaPacientes(headers, self)
+        self.setModel(self.modelo_filas)
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+
+    def rowCount(self):
+        return self.modelo_filas.rowCount()
+
+    def columnCount(self):
+        return self.modelo_filas.columnCount()
+
+    def texto(self, fila, columna):
+        """Devuelve el texto mostrado en una celda"""
+        return self.modelo_filas.texto(fila, columna)
+
+    def clave_en(self, fila):
+        """Devuelve la clave (id del paciente) de la fila indicada"""
+        return self.modelo_filas.clave_en(fila)
+
+    def establecer_altura_filas(self, altura):
+        """Altura uniforme para todas las filas, sin recorrerlas una a una"""
+        self.verticalHeader().setMinimumSectionSize(1)
+        self.verticalHeader().setDefaultSectionSize(altura)
+
+    def sincronizar(self, filas):
+        """
+        Aplica la nueva lista de filas conservando selección y scroll.
+        
+        Args:
+            filas: Lista ordenada de tuplas (clave, valores) con los textos de cada columna
+        """
+        actual = self.currentIndex()
+        clave_seleccionada = self.clave_en(actual.row()) if actual.isValid() else None
+        fila_ancla = self.rowAt(0)
+        clave_ancla = self.clave_en(fila_ancla)
+        desfase_ancla = self.rowViewportPosition(fila_ancla) if clave_ancla is not None else 0
+        
+        self.modelo_filas.sincronizar(filas)
+        
+        if clave_seleccionada is not None:
+            fila = self.modelo_filas.fila_de(clave_seleccionada)
+            if fila is None:
+                self.clearSelection()
+                self.setCurrentIndex(QModelIndex())
+            elif fila != self.currentIndex().row():
+                self.selectRow(fila)
+        fila = self.modelo_filas.fila_de(clave_ancla)
+        if fila is not None:
+            barra = self.verticalScrollBar()
+            barra.setValue(barra.value() + self.rowViewportPosition(fila) - desfase_ancla)
+
+class VistaCensoMixin:
+    """
+    Sondeo adaptativo y alarmas compartidos por las vistas del censo (médicos, administrador
+    y sala de espera). La vista define self.modelo, self.tabla, self.headers y
+    actualizar_tabla(), que devuelve True si los datos cambiaron. Las alarmas las programa
+    un ProgramadorAlarmas, que avisa al vencer un plazo sin esperar al próximo sondeo.
+    """
     
-    # Scroll suave
-    tabla.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
-    tabla.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
+    # Intervalo del primer sondeo (milisegundos); luego se adapta entre los límites del modelo
+    INTERVALO_SONDEO_INICIAL = 5000
     
-    # Aplicar delegados si se proporcionan
-    if delegate_columns:
-        for column_name, delegate in delegate_columns.items():
-            if column_name in headers:
-                col_index = headers.index(column_name)
-                tabla.setItemDelegateForColumn(col_index, delegate)
+    def iniciar_alarmas(self):
+        """Crea el programador de alarmas de la vista (antes de la primera actualización)"""
+        self.alarmas = ProgramadorAlarmas(self.modelo.COLUMNAS_VISTA, self)
+        self.alarmas.alarmas_cambiadas.connect(self.aplicar_alarmas)
+        self.filas_alarma = {}
     
-    # Aplicar delegado de texto para columnas especificadas
-    if text_delegate_columns:
-        text_delegate = TextDelegate(tabla)
-        for column_name in text_delegate_columns:
-            if column_name in headers:
-                col_index = headers.index(column_name)
-                tabla.setItemDelegateForColumn(col_index, text_delegate)
+    def iniciar_sondeo(self):
+        """Arranca el timer de sondeo adaptativo"""
+        self.version_escrituras = self.modelo.version_escrituras()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.sondear_cambios)
+        self.timer.start(self.INTERVALO_SONDEO_INICIAL)
     
-    # Altura de filas uniforme
-    for row in range(tabla.rowCount()):
-        tabla.setRowHeight(row, row_height)
+    def sondear_cambios(self):
+        """Refresca la tabla si hubo cambios y ajusta el intervalo del próximo sondeo"""
+        hubo_cambios = self.actualizar_tabla()
+        self.ajustar_intervalo_sondeo(hubo_cambios)
+
+    def ajustar_intervalo_sondeo(self, hubo_cambios):
+        """Acorta el sondeo tras una edición (propia o de otro equipo) y lo alarga mientras nada cambie"""
+        version = self.modelo.version_escrituras()
+        if hubo_cambios or version != self.version_escrituras:
+            intervalo = self.modelo.INTERVALO_SONDEO_MIN
+        else:
+            intervalo = min(int(self.timer.interval() * 1.5), self.modelo.INTERVALO_SONDEO_MAX)
+        self.version_escrituras = version
+        self.timer.setInterval(intervalo)
+
+    def actualizar_alarmas(self, datos, filas=None):
+        """
+        Entrega el censo al programador de alarmas, que solo reprograma los plazos que cambiaron.
+        
+        Args:
+            datos: Tuplas de la vista de todo el censo
+            filas: Tuplas que muestra la tabla, en orden (por defecto datos)
+        """
+        self.alarmas.sincronizar(datos, emitir=False)
+        self.asignar_filas_alarma(datos if filas is None else filas)
+
+    def asignar_filas_alarma(self, filas):
+        """Registra qué paciente ocupa cada fila de la tabla y vuelve a aplicar las alarmas"""
+        indice_id = self.modelo.COLUMNAS_VISTA.index('id')
+        self.filas_alarma = {fila[indice_id]: row_idx for row_idx, fila in enumerate(filas)}
+        self.aplicar_alarmas()
+
+    def aplicar_alarmas(self, pacientes_ids=None):
+        """Traduce las alarmas activas del programador a celdas de los delegados de CI y conducta"""
+        ci_col = self.headers.index('CI')
+        alarm_cells = {(self.filas_alarma[paciente_id], ci_col)
+                       for paciente_id in self.alarmas.activas('ci') if paciente_id in self.filas_alarma}
+        
+        # Actualizar alarmas en el delegate para CI
+        delegate = self.tabla.itemDelegateForColumn(ci_col)
+        if isinstance(delegate, Estado_delegado_circulo):
+            delegate.set_alarm_cells(alarm_cells)
+        
+        # Actualizar alarmas de conducta (la sala de espera no muestra la conducta)
+        if 'Conducta' not in self.headers:
+            if isinstance(delegate, Estado_delegado_circulo):
+                delegate.set_conducta_alarm_cells(set())
+            return
+        conducta_col = self.headers.index('Conducta')
+        conducta_alarm_cells = {(self.filas_alarma[paciente_id], conducta_col)
+                                for paciente_id in self.alarmas.activas('observacion') if paciente_id in self.filas_alarma}
+        delegate = self.tabla.itemDelegateForColumn(conducta_col)
+        if isinstance(delegate, Estado_delegado_circulo):
+            delegate.set_conducta_alarm_cells(conducta_alarm_cells)
 
 def configurar_anchos_columnas(tabla, headers, columnas_especiales=None):
     """
     Configura los anchos de columnas de manera proporcional con algunas columnas especiales.
     
     Args:
-        tabla: QTableWidget a configurar
+        tabla: TablaPacientes (QTableView) a configurar
         headers: Lista de encabezados de columna
         columnas_especiales: Diccionario de {nombre_columna: factor_ancho} para columnas con ancho especial
     """
     # Guardar el modo de ajuste actual de las columnas
     modos_actuales = []
-    for col in range(tabla.columnCount()):
+    for col in range(len(headers)):
         modos_actuales.append(tabla.horizontalHeader().sectionResizeMode(col))
     
     # Establecer todas las columnas en modo stretch temporalmente
-    for col in range(tabla.columnCount()):
+    for col in range(len(headers)):
         tabla.horizontalHeader().setSectionResizeMode(col, QHeaderView.Stretch)
     
     # Actualizar el tamaño de la tabla para que se ajuste correctamente
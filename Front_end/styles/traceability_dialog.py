@@ -126,6 +126,10 @@ class TraceabilityDialogStyles:
 class TraceabilityDialog(QDialog):
     _config_path_printed = False  # Class variable to track if the config path has been printed
     
+    # Filas por página y distancia (en pasos del scroll) al final de la tabla para pedir la siguiente
+    TAMANO_PAGINA = 200
+    UMBRAL_SCROLL = 5
+    
     def __init__(self, parent=None, ruta_base=None):
         super().__init__(parent)
         
@@ -161,6 +165,13 @@ class TraceabilityDialog(QDialog):
         # Almacenar términos de búsqueda para búsqueda por palabras
         self.search_terms = []
         
+        # Estado de la paginación por cursor: cada consulta nueva invalida las páginas en curso
+        self.cursor_pagina = None
+        self.hay_mas = False
+        self.cargando_pagina = False
+        self.generacion_consulta = 0
+        self.table.verticalScrollBar().valueChanged.connect(self.verificar_scroll)
+        
         # Contador para la animación de la barra de progreso
         self.progress_value = 0
         self.progress_timer = QTimer(self)
@@ -489,15 +500,65 @@ class TraceabilityDialog(QDialog):
         self.search_timer.start(300)
     
     def actualizar_tabla_con_resultados(self, datos):
-        """Actualiza la tabla con los datos recibidos del worker"""
+        """Actualiza la tabla con los datos recibidos del worker (primera página)"""
         # Ocultar spinner
         self.spinner_container.hide()
         
         # Mostrar tabla
         self.table.show()
         
+        # Preparar el cursor para la página siguiente
+        self.cursor_pagina = ModeloTrazabilidad.cursor_siguiente(datos)
+        self.hay_mas = len(datos) >= self.TAMANO_PAGINA
+        self.cargando_pagina = False
+        
         # Mostrar los datos en la tabla
         self.mostrar_datos_en_tabla(datos)
+        self.table.scrollToTop()
+        QTimer.singleShot(0, lambda: self.verificar_scroll(self.table.verticalScrollBar().value()))
+    
+    def canFetchMore(self):
+        """Indica si quedan acciones más antiguas por cargar para la consulta actual"""
+        return self.hay_mas and not self.cargando_pagina
+    
+    def fetchMore(self):
+        """Pide en segundo plano la página siguiente a la última fila mostrada"""
+        if not self.canFetchMore():
+            return
+        self.cargando_pagina = True
+        generacion = self.generacion_consulta
+        filtro_rol = self.role_filter.currentText()
+        
+        self.page_thread = QThread()
+        self.page_worker = FilterWorker(self.search_terms, filtro_rol,
+                                        limite=self.TAMANO_PAGINA, despues_de=self.cursor_pagina)
+        self.page_worker.moveToThread(self.page_thread)
+        
+        self.page_thread.started.connect(self.page_worker.run)
+        self.page_worker.finished.connect(lambda datos: self.agregar_pagina(datos, generacion))
+        self.page_worker.finished.connect(self.page_thread.quit)
+        self.page_worker.finished.connect(self.page_worker.deleteLater)
+        self.page_thread.finished.connect(self.page_thread.deleteLater)
+        
+        self.threads.append(self.page_thread)
+        self.page_thread.start()
+    
+    def agregar_pagina(self, datos, generacion):
+        """Agrega al final de la tabla una página cargada por fetchMore"""
+        # Descartar páginas de una búsqueda o filtro que ya cambió
+        if generacion != self.generacion_consulta:
+            return
+        self.cargando_pagina = False
+        self.cursor_pagina = ModeloTrazabilidad.cursor_siguiente(datos) or self.cursor_pagina
+        self.hay_mas = len(datos) >= self.TAMANO_PAGINA
+        self.mostrar_datos_en_tabla(datos, agregar=True)
+        QTimer.singleShot(0, lambda: self.verificar_scroll(self.table.verticalScrollBar().value()))
+    
+    def verificar_scroll(self, valor):
+        """Carga la página siguiente cuando el scroll llega cerca del final de la tabla"""
+        barra = self.table.verticalScrollBar()
+        if valor >= barra.maximum() - self.UMBRAL_SCROLL and self.canFetchMore():
+            self.fetchMore()
     
     def realizar_busqueda_diferida(self):
         """Procesa el texto de búsqueda y realiza la búsqueda"""
@@ -534,9 +595,13 @@ class TraceabilityDialog(QDialog):
         # Iniciar timer de animación con intervalo más largo para progresión más lenta
         self.progress_timer.start(70)  # Aumentado de 50ms a 70ms para una animación más lenta
         
+        # Una consulta nueva descarta las páginas que estuvieran cargándose
+        self.generacion_consulta += 1
+        self.hay_mas = False
+        
         # Crear un hilo para cargar los datos
         self.thread = QThread()
-        self.worker = DataWorker()
+        self.worker = DataWorker(limite=self.TAMANO_PAGINA)
         self.worker.moveToThread(self.thread)
         
         # Conectar señales
@@ -600,9 +665,13 @@ class TraceabilityDialog(QDialog):
         # Obtener criterios de filtrado
         filtro_rol = self.role_filter.currentText()
         
+        # Una consulta nueva descarta las páginas que estuvieran cargándose
+        self.generacion_consulta += 1
+        self.hay_mas = False
+        
         # Crear un worker para el filtrado
         self.filter_thread = QThread()
-        self.filter_worker = FilterWorker(self.search_terms, filtro_rol)
+        self.filter_worker = FilterWorker(self.search_terms, filtro_rol, limite=self.TAMANO_PAGINA)
         self.filter_worker.moveToThread(self.filter_thread)
         
         # Conectar señales
@@ -655,103 +724,44 @@ class TraceabilityDialog(QDialog):
         except Exception as e:
             print(f"Error al cargar datos de trazabilidad: {str(e)}")
     
-    def obtener_nombre_usuario(self, username):
-        """Obtiene el nombre completo del usuario desde la base de datos"""
-        try:
-            from Back_end.Usuarios.ModeloUsuarios import ModeloUsuarios
-            
-            # Conectar a la base de datos
-            conn = ModeloUsuarios.conectar_db()
-            if not conn:
-                return username  # Si no puede conectar, devuelve el username como fallback
-                
-            cursor = conn.cursor()
-            
-            # Consultar el nombre del usuario
-            cursor.execute("""
-                SELECT nombre_completo FROM usuarios 
-                WHERE username = %s
-            """, (username,))
-            
-            resultado = cursor.fetchone()
-            conn.close()
-            
-            if resultado and resultado[0]:
-                return resultado[0]
-            else:
-                return "Usuario del Sistema"  # Nombre genérico si no tiene nombre registrado
-                
-        except Exception as e:
-            print(f"Error al obtener nombre de usuario: {str(e)}")
-            return username  # En caso de error, usar el username como fallback
-    
-    def verificar_usuario_activo(self, username):
+    def mostrar_datos_en_tabla(self, datos, agregar=False):
         """
-        Verifica si un usuario está activo en la base de datos
+        Muestra los datos en la tabla de trazabilidad.
+        Cada fila ya trae el nombre, el estado y el rol del usuario (ver
+        ModeloTrazabilidad.obtener_acciones), así que no se consulta la base de datos aquí.
         
         Args:
-            username: Nombre del usuario a verificar
-            
-        Returns:
-            bool: True si el usuario está activo, False si está inactivo o no existe
+            datos: Filas devueltas por obtener_acciones
+            agregar: Si es True, las filas se añaden al final (página siguiente)
         """
-        try:
-            from Back_end.Usuarios.ModeloUsuarios import ModeloUsuarios
-            
-            # Conectar a la base de datos
-            conn = ModeloUsuarios.conectar_db()
-            if not conn:
-                return True  # Si hay error de conexión, asumimos activo por defecto
-                
-            cursor = conn.cursor()
-            
-            # Consultar el estado del usuario
-            cursor.execute("""
-                SELECT estado FROM usuarios 
-                WHERE username = %s
-            """, (username,))
-            
-            resultado = cursor.fetchone()
-            conn.close()
-            
-            # Si no hay resultado o el estado no es 'activo', retornar False
-            if not resultado or resultado[0] != 'activo':
-                return False
-                
-            return True
-            
-        except Exception as e:
-            print(f"Error al verificar estado del usuario: {str(e)}")
-            return True  # En caso de error, asumimos que está activo
-    
-    def mostrar_datos_en_tabla(self, datos):
-        """Muestra los datos en la tabla de trazabilidad"""
+        timer = QElapsedTimer()
+        timer.start()
+        
         # Limpiar tabla
-        self.table.setRowCount(0)
+        if not agregar:
+            self.table.setRowCount(0)
         
         if not datos:
             return
         
-        # Configurar número de filas
-        self.table.setRowCount(len(datos))
+        # Sin repintar ni reordenar mientras se llena la tabla
+        self.table.setUpdatesEnabled(False)
+        ordenamiento = self.table.isSortingEnabled()
+        self.table.setSortingEnabled(False)
         
-        # Importar ModeloUsuarios para obtener roles correctamente
-        from Back_end.Usuarios.ModeloUsuarios import ModeloUsuarios
+        # Configurar número de filas
+        inicio = self.table.rowCount()
+        self.table.setRowCount(inicio + len(datos))
         
         # Llenar tabla con datos
-        for i, fila in enumerate(datos):
+        for i, fila in enumerate(datos, start=inicio):
             # Columnas a mostrar
             columnas = [0, 2, 3, 4, 5]  # Índices originales de la base de datos
             
-            # Agregar nombre de usuario (columna adicional al inicio)
-            username = fila[0] if len(fila) > 0 and fila[0] is not None else ""
-            nombre_usuario = self.obtener_nombre_usuario(username)
-            
-            # Verificar si el usuario está activo
-            esta_activo = self.verificar_usuario_activo(username)
-            
-            # Obtener rol del usuario para aplicar formato correcto
-            rol = ModeloUsuarios.obtener_rol_usuario(username)
+            # Nombre, estado y rol del usuario unidos en la consulta (índices 7, 8 y 9)
+            nombre_usuario = fila[7] if len(fila) > 7 and fila[7] else "Usuario del Sistema"
+            esta_activo = bool(fila[8]) if len(fila) > 8 else True
+            rol = fila[9] if len(fila) > 9 else 'visitante'
             
             # Crear el ítem para el nombre
             nombre_item = QTableWidgetItem(nombre_usuario)
@@ -789,9 +799,6 @@ class TraceabilityDialog(QDialog):
                     if j == 0:  # Columna Usuario (ahora es la columna 1 en la tabla)
                         item.setTextAlignment(Qt.AlignCenter)
                         
-                        # Obtener el nombre de usuario para consultar su rol
-                        username = str(valor)
-                        
                         # Si el usuario no está activo, aplicar tachado también al username con color según rol
                         if not esta_activo:
                             font = item.font()
@@ -808,8 +815,6 @@ class TraceabilityDialog(QDialog):
                             else:
                                 item.setForeground(QColor("#fd7e14"))  # Gris por defecto
                         
-                        # Usar ModeloUsuarios.obtener_rol_usuario directamente
-                        
                         # Aplicar colores según rol
                         if rol == 'admin':
                             if esta_activo:  # Solo aplicar color si está activo
@@ -865,9 +870,14 @@ class TraceabilityDialog(QDialog):
                         item.setTextAlignment(Qt.AlignLeft | Qt.AlignTop)
                 
                 self.table.setItem(i, table_col, item)
-            
-            # Ajustar altura de la fila según el contenido de la columna de detalles
+        
+        # Ajustar la altura de las filas nuevas según el contenido de la columna de detalles
+        for i in range(inicio, inicio + len(datos)):
             self.table.resizeRowToContents(i)
+        self.table.setSortingEnabled(ordenamiento)
+        self.table.setUpdatesEnabled(True)
+        
+        print(f"Tiempo de renderizado de trazabilidad: {timer.elapsed()} ms ({len(datos)} filas)")
     
     def filtrar_datos(self):
         """Filtra los datos según los criterios de búsqueda"""
@@ -891,9 +901,13 @@ class TraceabilityDialog(QDialog):
         # Obtener criterios de filtrado
         filtro_rol = self.role_filter.currentText()
         
+        # Una consulta nueva descarta las páginas que estuvieran cargándose
+        self.generacion_consulta += 1
+        self.hay_mas = False
+        
         # Crear un worker para el filtrado
         self.filter_thread = QThread()
-        self.filter_worker = FilterWorker(self.search_terms, filtro_rol)
+        self.filter_worker = FilterWorker(self.search_terms, filtro_rol, limite=self.TAMANO_PAGINA)
         self.filter_worker.moveToThread(self.filter_thread)
         
         # Conectar señales
@@ -948,10 +962,12 @@ class FilterWorker(QObject):
     finished = pyqtSignal(list)
     progress = pyqtSignal(int)
     
-    def __init__(self, search_terms=None, filtro_rol=None):
+    def __init__(self, search_terms=None, filtro_rol=None, limite=500, despues_de=None):
         super().__init__()
         self.search_terms = search_terms or []
         self.filtro_rol = filtro_rol
+        self.limite = limite
+        self.despues_de = despues_de
     
     def run(self):
         """Filtra los datos en segundo plano"""
@@ -964,7 +980,8 @@ class FilterWorker(QObject):
             datos = ModeloTrazabilidad.obtener_acciones(
                 search_terms=self.search_terms,
                 filtro_rol_usuario=self.filtro_rol if self.filtro_rol != "Todos" else None,
-                limite=500  # Aumentar límite para mostrar más resultados relevantes
+                limite=self.limite,
+                despues_de=self.despues_de  # Cursor de la página anterior (None = primera página)
             )
             
             # Emitir progreso medio
@@ -996,6 +1013,10 @@ class DataWorker(QObject):
     finished = pyqtSignal(list)
     progress = pyqtSignal(int)
     
+    def __init__(self, limite=500):
+        super().__init__()
+        self.limite = limite
+    
     def run(self):
         """Carga los datos de trazabilidad en segundo plano"""
         try:
@@ -1007,7 +1028,7 @@ class DataWorker(QObject):
             timer.start()
             
             # Usar el modelo de trazabilidad para obtener los datos
-            datos = ModeloTrazabilidad.obtener_acciones(limite=500)  # Aumentar límite pero con paginación
+            datos = ModeloTrazabilidad.obtener_acciones(limite=self.limite)  # Primera página; el resto se pide al hacer scroll
             
             # Calcular tiempo transcurrido para estadísticas
             elapsed = timer.elapsed()